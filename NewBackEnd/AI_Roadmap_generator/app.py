@@ -1,20 +1,216 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import json
 
 # Add the current directory to the path so we can import roadmap_generator
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from roadmap_generator import generate_roadmap, get_default_roadmap
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roadmap_generator import admission, model_router, model_warmup, generate_roadmap, generate_roadmap_parallel, generate_roadmap_streaming, get_default_roadmap
+from prerequisite_graph import PrerequisiteGraph
+from common.admission import AdmissionRejected
+from common.responses import too_busy_response
+from common.static_payload import StaticPayload
+from common.item_neighbors import ItemNeighbors
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Track installed models and load them in the background; /health reports ready once they are resident
+model_router.start()
+model_warmup.start()
+
+# Curated roadmap templates
+ROADMAP_TEMPLATES = [
+    {
+        "id": "web-development",
+        "title": "Web Development",
+        "description": "Full-stack web development roadmap",
+        "topics": ["HTML", "CSS", "JavaScript", "React", "Node.js", "Database"],
+        "estimated_time": "6-12 months"
+    },
+    {
+        "id": "python",
+        "title": "Python Programming",
+        "description": "Complete Python learning path",
+        "topics": ["Python Basics", "OOP", "Data Structures", "Web Development", "Data Science"],
+        "estimated_time": "4-8 months"
+    },
+    {
+        "id": "machine-learning",
+        "title": "Machine Learning",
+        "description": "AI and machine learning journey",
+        "topics": ["Python", "Mathematics", "Statistics", "ML Algorithms", "Deep Learning"],
+        "estimated_time": "8-12 months"
+    },
+    {
+        "id": "mobile-development",
+        "title": "Mobile Development",
+        "description": "Mobile app development roadmap",
+        "topics": ["React Native", "Flutter", "iOS", "Android", "App Store"],
+        "estimated_time": "6-10 months"
+    },
+    {
+        "id": "cybersecurity",
+        "title": "Cybersecurity",
+        "description": "Information security and ethical hacking",
+        "topics": ["Networking", "Linux", "Cryptography", "Penetration Testing", "Security Tools"],
+        "estimated_time": "8-12 months"
+    },
+    {
+        "id": "data-science",
+        "title": "Data Science",
+        "description": "Data analysis and visualization",
+        "topics": ["Python", "Statistics", "SQL", "Data Visualization", "Machine Learning"],
+        "estimated_time": "6-10 months"
+    }
+]
+
+TEMPLATE_DETAILS = {
+    "web-development": {
+        "title": "Web Development Roadmap",
+        "description": "A comprehensive guide to becoming a full-stack web developer",
+        "steps": [
+            {
+                "level": 1,
+                "title": "Frontend Fundamentals",
+                "description": "Learn the basics of web development",
+                "topics": ["HTML5", "CSS3", "JavaScript ES6+", "Responsive Design"],
+                "resources": ["MDN Web Docs", "freeCodeCamp", "W3Schools", "CSS-Tricks"]
+            },
+            {
+                "level": 2,
+                "title": "Frontend Framework",
+                "description": "Master a modern JavaScript framework",
+                "topics": ["React.js", "State Management", "Component Architecture", "Hooks"],
+                "resources": ["React Documentation", "React Tutorial", "Redux Toolkit", "React Router"]
+            },
+            {
+                "level": 3,
+                "title": "Backend Development",
+                "description": "Learn server-side development",
+                "topics": ["Node.js", "Express.js", "REST APIs", "Database Design"],
+                "resources": ["Node.js Documentation", "Express.js Guide", "MongoDB Tutorial", "PostgreSQL"]
+            },
+            {
+                "level": 4,
+                "title": "Full-Stack Integration",
+                "description": "Connect frontend and backend",
+                "topics": ["API Integration", "Authentication", "Deployment", "DevOps Basics"],
+                "resources": ["Heroku", "Vercel", "Netlify", "Docker Basics"]
+            }
+        ],
+        "estimated_time": "6-12 months",
+        "prerequisites": ["Basic computer skills", "Logical thinking", "Patience to learn"]
+    },
+    "python": {
+        "title": "Python Programming Roadmap",
+        "description": "Master Python programming from basics to advanced concepts",
+        "steps": [
+            {
+                "level": 1,
+                "title": "Python Basics",
+                "description": "Learn fundamental Python concepts",
+                "topics": ["Variables", "Data Types", "Control Flow", "Functions", "Modules"],
+                "resources": ["Python Official Docs", "Real Python", "W3Schools Python", "Codecademy"]
+            },
+            {
+                "level": 2,
+                "title": "Object-Oriented Programming",
+                "description": "Master OOP concepts in Python",
+                "topics": ["Classes", "Objects", "Inheritance", "Polymorphism", "Encapsulation"],
+                "resources": ["Python OOP Tutorial", "Real Python OOP", "GeeksforGeeks"]
+            },
+            {
+                "level": 3,
+                "title": "Advanced Python",
+                "description": "Explore advanced Python features",
+                "topics": ["Decorators", "Generators", "Context Managers", "Async/Await"],
+                "resources": ["Python Advanced Tutorial", "Real Python Advanced", "Python Cookbook"]
+            },
+            {
+                "level": 4,
+                "title": "Specializations",
+                "description": "Choose your Python path",
+                "topics": ["Web Development (Django/Flask)", "Data Science", "Automation", "API Development"],
+                "resources": ["Django Documentation", "Flask Tutorial", "Pandas", "FastAPI"]
+            }
+        ],
+        "estimated_time": "4-8 months",
+        "prerequisites": ["Basic computer literacy", "Logical thinking", "Mathematics fundamentals"]
+    }
+}
+
+# Template responses are serialized once at startup instead of per request
+templates_payload = StaticPayload({
+    "success": True,
+    "templates": ROADMAP_TEMPLATES,
+    "count": len(ROADMAP_TEMPLATES)
+})
+template_payloads = {
+    template_id: StaticPayload({
+        "success": True,
+        "template": template,
+        "template_id": template_id
+    })
+    for template_id, template in TEMPLATE_DETAILS.items()
+}
+
+# Prerequisite graph of concepts, cached on disk and seeded with the templates
+prerequisite_graph = PrerequisiteGraph()
+template_titles = {template["id"]: template["title"] for template in ROADMAP_TEMPLATES}
+seeded_templates = False
+for template_id, template in TEMPLATE_DETAILS.items():
+    template_topic = template_titles.get(template_id, template["title"])
+    if not prerequisite_graph.has_goal(template_topic):
+        prerequisite_graph.add_roadmap(template, template_topic)
+        seeded_templates = True
+if seeded_templates:
+    prerequisite_graph.save()
+
+# "Learners who studied X next studied Y", precomputed from Quiz_Bot history
+item_neighbors = ItemNeighbors()
+
+def remember_roadmap(topic, roadmap):
+    """Add a generated roadmap to the prerequisite graph (generic fallbacks, whole or per level, are skipped)"""
+    if not roadmap or roadmap == get_default_roadmap(topic):
+        return
+    if any(step.get('fallback') for step in roadmap.get('steps', [])):
+        return
+    prerequisite_graph.add_roadmap(roadmap, topic)
+    prerequisite_graph.save()
+
+def build_roadmap(topic, mode=None, refresh=False):
+    """Reuse a roadmap already in the prerequisite graph, or generate and remember a new one"""
+    if not refresh:
+        cached = prerequisite_graph.get_roadmap(topic)
+        if cached:
+            return cached
+    
+    if mode == 'parallel':
+        roadmap = generate_roadmap_parallel(topic)
+    else:
+        roadmap = generate_roadmap(topic)
+    
+    remember_roadmap(topic, roadmap)
+    return roadmap
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "roadmap_generator"})
+    """Health check endpoint; answers 503 until the roadmap model is warmed up so no traffic reaches a cold instance"""
+    ready = model_warmup.ready
+    return jsonify({
+        "status": "healthy" if ready else "warming_up",
+        "service": "roadmap_generator",
+        "ready": ready,
+        "admission": admission.stats(),
+        "model_router": model_router.stats(),
+        "warmup": model_warmup.stats()
+    }), 200 if ready else 503
 
 @app.route('/api/generate', methods=['POST'])
 def generate_learning_roadmap():
@@ -34,8 +230,8 @@ def generate_learning_roadmap():
                 "error": "Topic cannot be empty"
             }), 400
         
-        # Generate the roadmap
-        roadmap = generate_roadmap(topic)
+        # Generate the roadmap, optionally expanding levels in parallel
+        roadmap = build_roadmap(topic, data.get('mode'), data.get('refresh', False))
         
         if not roadmap:
             return jsonify({
@@ -48,11 +244,52 @@ def generate_learning_roadmap():
             "topic": topic
         })
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         return jsonify({
             "error": f"An error occurred: {str(e)}"
         }), 500
 
+@app.route('/api/generate/stream', methods=['POST'])
+def stream_learning_roadmap():
+    """Generate a roadmap outline first and stream each level as it completes (NDJSON)"""
+    data = request.get_json(silent=True)
+    
+    if not data or 'topic' not in data:
+        return jsonify({
+            "error": "Missing 'topic' field in request body"
+        }), 400
+    
+    topic = data['topic'].strip()
+    
+    if not topic:
+        return jsonify({
+            "error": "Topic cannot be empty"
+        }), 400
+    
+    # Answer 429 before the stream starts when roadmap requests are already queued past their budget
+    retry_after = admission.saturated("roadmap")
+    if retry_after is not None:
+        return too_busy_response(AdmissionRejected("roadmap", retry_after))
+    
+    def generate_events():
+        try:
+            for event in generate_roadmap_streaming(topic):
+                if event['event'] == 'complete' and not event.get('fallback'):
+                    remember_roadmap(topic, event['roadmap'])
+                yield json.dumps(event) + "\n"
+        except AdmissionRejected as e:
+            yield json.dumps({"event": "error", "error": str(e), "retry_after": e.retry_after}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": f"An error occurred: {str(e)}"}) + "\n"
+    
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype='application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/generate/<topic>', methods=['GET'])
 def generate_roadmap_by_topic(topic):
     """Generate a learning roadmap for the given topic via GET request"""
@@ -63,7 +300,7 @@ def generate_roadmap_by_topic(topic):
             }), 400
         
         # Generate the roadmap
-        roadmap = generate_roadmap(topic.strip())
+        roadmap = build_roadmap(topic.strip(), refresh=request.args.get('refresh') == 'true')
         
         if not roadmap:
             return jsonify({
@@ -76,6 +313,8 @@ def generate_roadmap_by_topic(topic):
             "topic": topic.strip()
         })
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         return jsonify({
             "error": f"An error occurred: {str(e)}"
@@ -85,55 +324,45 @@ def generate_roadmap_by_topic(topic):
 def get_roadmap_templates():
     """Get available roadmap templates"""
     try:
-        templates = [
-            {
-                "id": "web-development",
-                "title": "Web Development",
-                "description": "Full-stack web development roadmap",
-                "topics": ["HTML", "CSS", "JavaScript", "React", "Node.js", "Database"],
-                "estimated_time": "6-12 months"
-            },
-            {
-                "id": "python",
-                "title": "Python Programming",
-                "description": "Complete Python learning path",
-                "topics": ["Python Basics", "OOP", "Data Structures", "Web Development", "Data Science"],
-                "estimated_time": "4-8 months"
-            },
-            {
-                "id": "machine-learning",
-                "title": "Machine Learning",
-                "description": "AI and machine learning journey",
-                "topics": ["Python", "Mathematics", "Statistics", "ML Algorithms", "Deep Learning"],
-                "estimated_time": "8-12 months"
-            },
-            {
-                "id": "mobile-development",
-                "title": "Mobile Development",
-                "description": "Mobile app development roadmap",
-                "topics": ["React Native", "Flutter", "iOS", "Android", "App Store"],
-                "estimated_time": "6-10 months"
-            },
-            {
-                "id": "cybersecurity",
-                "title": "Cybersecurity",
-                "description": "Information security and ethical hacking",
-                "topics": ["Networking", "Linux", "Cryptography", "Penetration Testing", "Security Tools"],
-                "estimated_time": "8-12 months"
-            },
-            {
-                "id": "data-science",
-                "title": "Data Science",
-                "description": "Data analysis and visualization",
-                "topics": ["Python", "Statistics", "SQL", "Data Visualization", "Machine Learning"],
-                "estimated_time": "6-10 months"
-            }
-        ]
+        return templates_payload.respond()
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/template/<template_id>', methods=['GET'])
+def get_roadmap_template(template_id):
+    """Get a specific roadmap template"""
+    try:
+        if template_id not in template_payloads:
+            return jsonify({
+                "error": f"Template '{template_id}' not found"
+            }), 404
+        
+        return template_payloads[template_id].respond()
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/graph/order/<topic>', methods=['GET'])
+def get_learning_order(topic):
+    """Get the topological learning order of all concepts needed for a topic"""
+    try:
+        order = prerequisite_graph.learning_order(topic)
+        
+        if order is None:
+            return jsonify({
+                "error": f"Topic '{topic}' is not in the prerequisite graph"
+            }), 404
         
         return jsonify({
             "success": True,
-            "templates": templates,
-            "count": len(templates)
+            "topic": topic,
+            "order": order,
+            "count": len(order)
         })
         
     except Exception as e:
@@ -141,94 +370,34 @@ def get_roadmap_templates():
             "error": f"An error occurred: {str(e)}"
         }), 500
 
-@app.route('/api/template/<template_id>', methods=['GET'])
-def get_roadmap_template(template_id):
-    """Get a specific roadmap template"""
+@app.route('/api/graph/path', methods=['POST'])
+def get_learning_path():
+    """Get the shortest path from concepts the user knows to a goal topic"""
     try:
-        templates = {
-            "web-development": {
-                "title": "Web Development Roadmap",
-                "description": "A comprehensive guide to becoming a full-stack web developer",
-                "steps": [
-                    {
-                        "level": 1,
-                        "title": "Frontend Fundamentals",
-                        "description": "Learn the basics of web development",
-                        "topics": ["HTML5", "CSS3", "JavaScript ES6+", "Responsive Design"],
-                        "resources": ["MDN Web Docs", "freeCodeCamp", "W3Schools", "CSS-Tricks"]
-                    },
-                    {
-                        "level": 2,
-                        "title": "Frontend Framework",
-                        "description": "Master a modern JavaScript framework",
-                        "topics": ["React.js", "State Management", "Component Architecture", "Hooks"],
-                        "resources": ["React Documentation", "React Tutorial", "Redux Toolkit", "React Router"]
-                    },
-                    {
-                        "level": 3,
-                        "title": "Backend Development",
-                        "description": "Learn server-side development",
-                        "topics": ["Node.js", "Express.js", "REST APIs", "Database Design"],
-                        "resources": ["Node.js Documentation", "Express.js Guide", "MongoDB Tutorial", "PostgreSQL"]
-                    },
-                    {
-                        "level": 4,
-                        "title": "Full-Stack Integration",
-                        "description": "Connect frontend and backend",
-                        "topics": ["API Integration", "Authentication", "Deployment", "DevOps Basics"],
-                        "resources": ["Heroku", "Vercel", "Netlify", "Docker Basics"]
-                    }
-                ],
-                "estimated_time": "6-12 months",
-                "prerequisites": ["Basic computer skills", "Logical thinking", "Patience to learn"]
-            },
-            "python": {
-                "title": "Python Programming Roadmap",
-                "description": "Master Python programming from basics to advanced concepts",
-                "steps": [
-                    {
-                        "level": 1,
-                        "title": "Python Basics",
-                        "description": "Learn fundamental Python concepts",
-                        "topics": ["Variables", "Data Types", "Control Flow", "Functions", "Modules"],
-                        "resources": ["Python Official Docs", "Real Python", "W3Schools Python", "Codecademy"]
-                    },
-                    {
-                        "level": 2,
-                        "title": "Object-Oriented Programming",
-                        "description": "Master OOP concepts in Python",
-                        "topics": ["Classes", "Objects", "Inheritance", "Polymorphism", "Encapsulation"],
-                        "resources": ["Python OOP Tutorial", "Real Python OOP", "GeeksforGeeks"]
-                    },
-                    {
-                        "level": 3,
-                        "title": "Advanced Python",
-                        "description": "Explore advanced Python features",
-                        "topics": ["Decorators", "Generators", "Context Managers", "Async/Await"],
-                        "resources": ["Python Advanced Tutorial", "Real Python Advanced", "Python Cookbook"]
-                    },
-                    {
-                        "level": 4,
-                        "title": "Specializations",
-                        "description": "Choose your Python path",
-                        "topics": ["Web Development (Django/Flask)", "Data Science", "Automation", "API Development"],
-                        "resources": ["Django Documentation", "Flask Tutorial", "Pandas", "FastAPI"]
-                    }
-                ],
-                "estimated_time": "4-8 months",
-                "prerequisites": ["Basic computer literacy", "Logical thinking", "Mathematics fundamentals"]
-            }
-        }
+        data = request.get_json()
         
-        if template_id not in templates:
+        if not data or 'goal' not in data:
             return jsonify({
-                "error": f"Template '{template_id}' not found"
+                "error": "Missing 'goal' field in request body"
+            }), 400
+        
+        known = data.get('known', [])
+        if isinstance(known, str):
+            known = [known]
+        
+        path = prerequisite_graph.path_to_goal(known, data['goal'])
+        
+        if path is None:
+            return jsonify({
+                "error": f"Topic '{data['goal']}' is not in the prerequisite graph"
             }), 404
         
         return jsonify({
             "success": True,
-            "template": templates[template_id],
-            "template_id": template_id
+            "goal": data['goal'],
+            "known": known,
+            "path": path,
+            "count": len(path)
         })
         
     except Exception as e:
@@ -236,14 +405,75 @@ def get_roadmap_template(template_id):
             "error": f"An error occurred: {str(e)}"
         }), 500
 
+@app.route('/api/graph/merge', methods=['POST'])
+def merge_learning_roadmaps():
+    """Merge the roadmaps of several topics into one path with shared concepts"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('topics'), list) or not data['topics']:
+            return jsonify({
+                "error": "Missing 'topics' list in request body"
+            }), 400
+        
+        roadmap = prerequisite_graph.merge_roadmaps(data['topics'])
+        
+        if roadmap is None:
+            return jsonify({
+                "error": "None of the topics are in the prerequisite graph"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "roadmap": roadmap,
+            "topics": data['topics']
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/graph/next/<topic>', methods=['GET'])
+def get_next_topics(topic):
+    """Get the topics learners most often studied after this one"""
+    try:
+        limit = request.args.get('limit', 5, type=int)
+        next_topics = item_neighbors.next_items(topic, limit=limit)
+        
+        return jsonify({
+            "success": True,
+            "topic": topic,
+            "next": next_topics,
+            "count": len(next_topics)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/graph/stats', methods=['GET'])
+def get_graph_stats():
+    """Get the size of the prerequisite graph"""
+    return jsonify({
+        "success": True,
+        "stats": prerequisite_graph.stats()
+    })
+
 if __name__ == '__main__':
     print("Starting Roadmap Generator API...")
     print("Available endpoints:")
     print("- GET  /health - Health check")
     print("- POST /api/generate - Generate custom roadmap")
+    print("- POST /api/generate/stream - Stream roadmap levels as they are generated")
     print("- GET  /api/generate/<topic> - Generate roadmap by topic")
     print("- GET  /api/templates - Get available templates")
     print("- GET  /api/template/<id> - Get specific template")
+    print("- GET  /api/graph/order/<topic> - Get learning order for a topic")
+    print("- POST /api/graph/path - Get path from known concepts to a goal")
+    print("- POST /api/graph/merge - Merge roadmaps for several topics")
+    print("- GET  /api/graph/next/<topic> - Get topics learners studied next")
     print("\nServer running on http://localhost:5002")
     
     app.run(host='0.0.0.0', port=5002, debug=True) 
\ No newline at end of file
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+import networkx as nx
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+GRAPH_CACHE_FILE = os.getenv(
+    "ROADMAP_GRAPH_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "roadmap_graph.json")
+)
+MAX_RESOURCES_PER_CONCEPT = 6
+
+
+def normalize_concept(name):
+    """
+    Normalize a concept name so the same concept from different roadmaps maps to one node.
+    """
+    name = re.sub(r'\s+', ' ', str(name)).strip().lower()
+    return name.rstrip('.:;,')
+
+
+class PrerequisiteGraph:
+    """
+    Persistent prerequisite DAG of learning concepts built from roadmaps.
+
+    Nodes are normalized concept names. An edge A -> B means A should be
+    learned before B. Each roadmap contributes its prerequisites, the topics
+    of every level and a goal node for the roadmap topic itself, so concepts
+    shared between roadmaps become shared sub-paths.
+
+    Several processes may share one cache file: save() takes an exclusive
+    lock on a sidecar ".lock" file and merges the graph on disk into this
+    one before writing, so roadmaps saved by other processes are kept.
+    """
+
+    def __init__(self, cache_file=GRAPH_CACHE_FILE):
+        self.cache_file = cache_file
+        self.graph = nx.DiGraph()
+        self._lock = threading.RLock()
+        self._order_cache = {}
+        self.load()
+
+    def _read(self):
+        """The graph in the cache file, or None if there is none yet"""
+        if not os.path.exists(self.cache_file):
+            return None
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        graph = nx.DiGraph()
+        for node in data.get('nodes', []):
+            node_id = node.pop('id')
+            graph.add_node(node_id, **node)
+        graph.add_edges_from(tuple(edge) for edge in data.get('edges', []))
+        return graph
+
+    def load(self):
+        """Load the graph from the on-disk cache, if present"""
+        try:
+            graph = self._read()
+            if graph is None:
+                return
+            with self._lock:
+                self.graph = graph
+                self._order_cache.clear()
+            logger.info(f"Loaded prerequisite graph with {graph.number_of_nodes()} concepts")
+        except Exception as e:
+            logger.error(f"Error loading prerequisite graph: {str(e)}")
+
+    def save(self):
+        """Merge in what other processes saved, then write the graph to the on-disk cache atomically"""
+        tmp_file = None
+        try:
+            # Hold both locks until the file is replaced, so no save from this or another
+            # process lands between reading the file and replacing it
+            with self._lock, open(self.cache_file + '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                on_disk = self._read()
+                if on_disk is not None:
+                    self._merge_graph(on_disk)
+                data = {
+                    "nodes": [{"id": node, **attrs} for node, attrs in self.graph.nodes(data=True)],
+                    "edges": [[u, v] for u, v in self.graph.edges()]
+                }
+                with tempfile.NamedTemporaryFile(
+                    'w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(self.cache_file)),
+                    prefix=os.path.basename(self.cache_file), suffix='.tmp', delete=False
+                ) as f:
+                    tmp_file = f.name
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Error saving prerequisite graph: {str(e)}")
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def _merge_graph(self, other):
+        """Add the concepts and edges of another graph (caller holds the lock)"""
+        for key, attrs in other.nodes(data=True):
+            if key not in self.graph:
+                self.graph.add_node(key, **attrs)
+                continue
+            node = self.graph.nodes[key]
+            self._add_concept(key, attrs['label'], attrs['kind'], attrs['level'])
+            for roadmap_title in attrs.get('roadmaps', []):
+                if roadmap_title not in node['roadmaps']:
+                    node['roadmaps'].append(roadmap_title)
+            self._add_resources(key, attrs.get('resources', []))
+            if 'roadmap' in attrs and 'roadmap' not in node:
+                node['roadmap'] = attrs['roadmap']
+        for before, after in other.edges():
+            self._add_edge(before, after)
+        self._order_cache.clear()
+
+    def has_goal(self, topic):
+        """Check whether a full roadmap for this topic is already in the graph"""
+        key = normalize_concept(topic)
+        with self._lock:
+            return key in self.graph and 'roadmap' in self.graph.nodes[key]
+
+    def get_roadmap(self, topic):
+        """Return the cached roadmap for a topic, or None"""
+        key = normalize_concept(topic)
+        with self._lock:
+            if key in self.graph:
+                return self.graph.nodes[key].get('roadmap')
+        return None
+
+    def add_roadmap(self, roadmap, topic):
+        """
+        Add a roadmap's concepts and ordering to the graph.
+        Edges that would create a cycle are skipped so the graph stays a DAG.
+        """
+        goal = normalize_concept(topic)
+        steps = sorted(roadmap.get('steps', []), key=lambda step: step.get('level', 0))
+
+        with self._lock:
+            self._add_concept(goal, topic, 'goal', len(steps) + 1)
+            self.graph.nodes[goal]['roadmap'] = roadmap
+
+            previous = []
+            for prereq in roadmap.get('prerequisites', []):
+                key = normalize_concept(prereq)
+                self._add_concept(key, prereq, 'prerequisite', 0, roadmap.get('title'))
+                previous.append(key)
+
+            for step in steps:
+                current = []
+                for concept in step.get('topics', []):
+                    key = normalize_concept(concept)
+                    if key == goal:
+                        continue
+                    self._add_concept(key, concept, 'concept', step.get('level', 0), roadmap.get('title'))
+                    self._add_resources(key, step.get('resources', []))
+                    current.append(key)
+
+                if current:
+                    for before in previous:
+                        for after in current:
+                            self._add_edge(before, after)
+                    previous = current
+
+            for before in previous:
+                self._add_edge(before, goal)
+
+            self._order_cache.clear()
+
+    def _add_concept(self, key, label, kind, level, roadmap_title=None):
+        if key not in self.graph:
+            self.graph.add_node(key, label=str(label), kind=kind, level=level, resources=[], roadmaps=[])
+        node = self.graph.nodes[key]
+        # A concept that is a goal elsewhere stays a goal; otherwise keep the earliest level seen
+        if kind == 'goal':
+            node['kind'] = 'goal'
+        if node['kind'] != 'goal':
+            node['level'] = min(node['level'], level)
+        if roadmap_title and roadmap_title not in node['roadmaps']:
+            node['roadmaps'].append(roadmap_title)
+
+    def _add_resources(self, key, resources):
+        node_resources = self.graph.nodes[key]['resources']
+        for resource in resources:
+            if len(node_resources) >= MAX_RESOURCES_PER_CONCEPT:
+                break
+            if resource not in node_resources:
+                node_resources.append(resource)
+
+    def _add_edge(self, before, after):
+        if before == after or self.graph.has_edge(before, after):
+            return
+        if after in self.graph and nx.has_path(self.graph, after, before):
+            return
+        self.graph.add_edge(before, after)
+
+    def _describe(self, key):
+        node = self.graph.nodes[key]
+        return {
+            "concept": node['label'],
+            "kind": node['kind'],
+            "level": node['level']
+        }
+
+    def learning_order(self, topic):
+        """
+        Topological learning order of every concept needed for the topic.
+        Returns None if the topic is not in the graph.
+        """
+        goal = normalize_concept(topic)
+        with self._lock:
+            if goal not in self.graph:
+                return None
+            if goal in self._order_cache:
+                return self._order_cache[goal]
+
+            needed = nx.ancestors(self.graph, goal) | {goal}
+            subgraph = self.graph.subgraph(needed)
+            order = nx.lexicographical_topological_sort(
+                subgraph, key=lambda key: (self.graph.nodes[key]['level'], key)
+            )
+            result = [self._describe(key) for key in order]
+            self._order_cache[goal] = result
+            return result
+
+    def path_to_goal(self, known, topic):
+        """
+        Shortest chain of concepts from anything the learner already knows to the goal.
+        Falls back to the full learning order when no known concept leads to the goal.
+        Returns None if the topic is not in the graph.
+        """
+        goal = normalize_concept(topic)
+        with self._lock:
+            if goal not in self.graph:
+                return None
+
+            sources = {normalize_concept(concept) for concept in known} & set(self.graph.nodes)
+            if goal in sources:
+                return []
+
+            if sources:
+                try:
+                    _, path = nx.multi_source_dijkstra(self.graph, sources, target=goal)
+                    return [self._describe(key) for key in path[1:]]
+                except nx.NetworkXNoPath:
+                    pass
+
+            # Nothing known connects to the goal; everything not already known is required
+            covered = set(sources)
+            for source in sources:
+                covered |= nx.ancestors(self.graph, source)
+            return [
+                step for step in self.learning_order(topic)
+                if normalize_concept(step['concept']) not in covered
+            ]
+
+    def merge_roadmaps(self, topics):
+        """
+        Build one combined roadmap for several topics, sharing common concepts.
+        Concepts are grouped into levels by their depth in the prerequisite graph.
+        Returns None if none of the topics are in the graph.
+        """
+        with self._lock:
+            goals = [normalize_concept(topic) for topic in topics]
+            goals = [goal for goal in goals if goal in self.graph]
+            if not goals:
+                return None
+
+            needed = set(goals)
+            for goal in goals:
+                needed |= nx.ancestors(self.graph, goal)
+            subgraph = self.graph.subgraph(needed)
+
+            depth = {}
+            for key in nx.topological_sort(subgraph):
+                depth[key] = max((depth[pred] + 1 for pred in subgraph.predecessors(key)), default=0)
+
+            prerequisites = []
+            levels = {}
+            for key in nx.lexicographical_topological_sort(subgraph, key=lambda key: (depth[key], key)):
+                node = self.graph.nodes[key]
+                if node['kind'] == 'prerequisite':
+                    prerequisites.append(node['label'])
+                elif key not in goals:
+                    levels.setdefault(depth[key], []).append(node)
+
+            steps = []
+            for index, level_depth in enumerate(sorted(levels), 1):
+                nodes = levels[level_depth]
+                resources = []
+                for node in nodes:
+                    for resource in node['resources']:
+                        if resource not in resources:
+                            resources.append(resource)
+                steps.append({
+                    "level": index,
+                    "title": f"Stage {index}",
+                    "description": f"Concepts shared at stage {index} of the combined path",
+                    "topics": [node['label'] for node in nodes],
+                    "resources": resources[:MAX_RESOURCES_PER_CONCEPT]
+                })
+
+            labels = [self.graph.nodes[goal]['label'] for goal in goals]
+            return {
+                "title": f"Combined Learning Roadmap for {', '.join(labels)}",
+                "description": f"A merged learning path that covers {', '.join(labels)} and reuses shared concepts",
+                "steps": steps,
+                "estimated_time": "Depends on prior knowledge",
+                "prerequisites": prerequisites
+            }
+
+    def stats(self):
+        """Basic size information about the graph"""
+        with self._lock:
+            return {
+                "concepts": self.graph.number_of_nodes(),
+                "edges": self.graph.number_of_edges(),
+                "goals": sum(1 for _, kind in self.graph.nodes(data='kind') if kind == 'goal')
+            }
@@ -1,13 +1,107 @@
 import requests
 import json
 import os
+import sys
 import logging
 import re
+import time
+import concurrent.futures
+
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.admission import AdmissionController, AdmissionRejected
+from common.model_router import ModelRouter
+from common.model_warmup import OLLAMA_KEEP_ALIVE, ModelWarmup
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ollama configuration
+OLLAMA_GENERATE_URL = "http://localhost:11434/api/generate"
+PRIMARY_MODEL = "llama3:latest"
+FALLBACK_MODEL = "mistral:latest"
+
+# Seconds a roadmap request may take before the next model is preferred
+ROADMAP_LATENCY_SLO = float(os.getenv("ROADMAP_LATENCY_SLO", "45"))
+
+# Parallel generation settings
+OUTLINE_LEVELS = 5
+LEVEL_EXPANSION_WORKERS = 5  # Effective only if Ollama runs with OLLAMA_NUM_PARALLEL > 1
+
+# Model calls queue with the other services' ones; roadmaps yield to chat and quizzes
+admission = AdmissionController()
+
+# Requests go to the model that is installed, healthy and fast enough; the other is the fallback
+model_router = ModelRouter({"roadmap": {"models": [PRIMARY_MODEL, FALLBACK_MODEL], "slo": ROADMAP_LATENCY_SLO}})
+
+# Loads the roadmap model when the API starts (see app.py) so the first roadmap does not pay for it
+model_warmup = ModelWarmup(model_router, admission)
+
+def request_ollama(prompt, options=None, timeout=45, json_mode=False, admitted=False):
+    """
+    Send a prompt to Ollama, falling back to the other model on failure.
+    Returns the response text, or None if neither model answered.
+    Raises AdmissionRejected when the model is too busy to take the request,
+    unless the caller already holds a roadmap slot (`admitted`).
+    """
+    payload = {
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": options or {}
+    }
+    if json_mode:
+        payload["format"] = "json"
+    
+    if admitted:
+        return post_to_models(payload, timeout)
+    with admission.slot("roadmap"):
+        return post_to_models(payload, timeout)
+
+def post_to_models(payload, timeout):
+    """Post a generate payload to the routed model, then to the others; returns the response text or None."""
+    for model in model_router.candidates("roadmap"):
+        start = time.time()
+        try:
+            response = requests.post(OLLAMA_GENERATE_URL, json={**payload, "model": model}, timeout=timeout)
+        except requests.RequestException as e:
+            model_router.record(model, "roadmap", time.time() - start, ok=False)
+            logger.warning(f"{model} request failed: {str(e)}")
+            continue
+        
+        if response.status_code == 200:
+            model_router.record(model, "roadmap", time.time() - start)
+            return response.json().get("response", "").strip()
+        
+        model_router.record(model, "roadmap", time.time() - start, ok=False)
+        logger.warning(f"{model} failed with status {response.status_code}")
+    
+    logger.error("Ollama API error: no model produced a response")
+    return None
+
+def parse_json_response(response_text):
+    """
+    Extract a JSON object from a model response, tolerating markdown fences and surrounding text.
+    """
+    # Clean the response text (remove markdown formatting if present)
+    response_text = response_text.replace("```json", "").replace("```", "").strip()
+    
+    try:
+        # First, try to parse as JSON directly
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        # If that fails, try to find JSON within the text
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+    
+    return None
+
 def generate_roadmap(topic):
     """
     Generate a learning roadmap for the given topic using Ollama.
@@ -153,64 +247,21 @@ For each level, provide specific, actionable content that builds upon previous l
 Respond with ONLY the JSON, no other text."""
     
     try:
-        # Try llama3:latest first (better model)
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3:latest",
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "max_tokens": 2000
-                }
-            },
-            timeout=45
-        )
-        
-        if response.status_code != 200:
-            logger.warning(f"llama3:latest failed, trying mistral:latest")
-            # Fallback to mistral:latest
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "mistral:latest",
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
+        response_text = request_ollama(prompt, options={
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "max_tokens": 2000
+        }, timeout=45)
         
-        if response.status_code != 200:
-            logger.error(f"Ollama API error: {response.status_code}")
+        if response_text is None:
             return get_default_roadmap(topic)
         
-        # Parse the response
-        result = response.json()
-        response_text = result.get("response", "").strip()
-        
         logger.info(f"Raw response from Ollama: {response_text[:500]}...")
         
-        # Clean the response text (remove markdown formatting if present)
-        response_text = response_text.replace("```json", "").replace("```", "").strip()
-        
-        # Try to extract JSON from the response
-        try:
-            # First, try to parse as JSON directly
-            roadmap_data = json.loads(response_text)
-        except json.JSONDecodeError:
-            # If that fails, try to find JSON within the text
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                try:
-                    roadmap_data = json.loads(json_match.group())
-                except json.JSONDecodeError:
-                    logger.warning("Could not extract valid JSON from response")
-                    return get_default_roadmap(topic)
-            else:
-                logger.warning("No JSON found in response")
-                return get_default_roadmap(topic)
+        roadmap_data = parse_json_response(response_text)
+        if roadmap_data is None:
+            logger.warning("Could not extract valid JSON from response")
+            return get_default_roadmap(topic)
         
         # Validate the roadmap structure
         if validate_roadmap_structure(roadmap_data):
@@ -221,6 +272,8 @@ Respond with ONLY the JSON, no other text."""
             logger.warning(f"Generated data: {json.dumps(roadmap_data, indent=2)[:500]}...")
             return get_default_roadmap(topic)
             
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Error generating roadmap: {str(e)}")
         return get_default_roadmap(topic)
@@ -258,6 +311,166 @@ def validate_roadmap_structure(roadmap_data):
     except:
         return False
 
+def generate_roadmap_outline(topic):
+    """
+    Generate a compact outline: roadmap metadata plus one title and description per level.
+    """
+    prompt = f"""You are an expert learning path designer with deep knowledge of {topic}. Create a compact outline for a learning roadmap on {topic}.
+
+IMPORTANT: Respond ONLY with valid JSON using this exact structure:
+{{
+    "title": "Learning Roadmap for {topic}",
+    "description": "One sentence describing the roadmap",
+    "levels": [
+        {{
+            "level": 1,
+            "title": "Short level title",
+            "description": "One sentence describing what this level covers"
+        }}
+    ],
+    "estimated_time": "Total time estimate",
+    "prerequisites": ["3-5 short prerequisites"],
+    "learning_tips": ["3-5 short tips specific to {topic}"]
+}}
+
+Provide exactly {OUTLINE_LEVELS} levels that progress from beginner to expert. Keep every string short."""
+    
+    response_text = request_ollama(prompt, options={
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "num_predict": 600
+    }, timeout=30, json_mode=True)
+    
+    if response_text is None:
+        return None
+    
+    outline = parse_json_response(response_text)
+    if not isinstance(outline, dict) or not isinstance(outline.get('levels'), list) or not outline['levels']:
+        logger.warning("Generated outline has invalid structure")
+        return None
+    
+    for index, level in enumerate(outline['levels'], 1):
+        if not isinstance(level, dict) or 'title' not in level:
+            logger.warning("Generated outline has an invalid level")
+            return None
+        level['level'] = index
+        level.setdefault('description', '')
+    
+    return outline
+
+def expand_roadmap_level(topic, outline, level):
+    """
+    Generate the topics and resources for a single outline level.
+    The caller holds the roadmap's admission slot. Falls back to the default
+    roadmap content for that level if generation fails, marking the step
+    with "fallback" so the roadmap is not remembered.
+    """
+    level_list = "\n".join(f"{item['level']}. {item['title']}" for item in outline['levels'])
+    prompt = f"""You are an expert learning path designer building the roadmap "{outline.get('title', topic)}".
+
+The roadmap has these levels:
+{level_list}
+
+Write the details for level {level['level']} only: "{level['title']}" - {level['description']}
+
+IMPORTANT: Respond ONLY with valid JSON using this exact structure:
+{{
+    "topics": ["4-6 concepts specific to {topic} at this level"],
+    "resources": ["4-6 real learning resources, formatted as 'URL - Name' or a book title"]
+}}"""
+    
+    step = {
+        "level": level['level'],
+        "title": level['title'],
+        "description": level['description']
+    }
+    
+    response_text = request_ollama(prompt, options={
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "num_predict": 400
+    }, timeout=30, json_mode=True, admitted=True)
+    details = parse_json_response(response_text) if response_text else None
+    
+    if isinstance(details, dict) and isinstance(details.get('topics'), list) and isinstance(details.get('resources'), list):
+        step['topics'] = details['topics']
+        step['resources'] = details['resources']
+        return step
+    
+    logger.warning(f"Could not expand level {level['level']} for {topic}, using default content")
+    default_steps = get_default_roadmap(topic)['steps']
+    fallback = default_steps[min(level['level'], len(default_steps)) - 1]
+    step['topics'] = fallback['topics']
+    step['resources'] = fallback['resources']
+    step['fallback'] = True
+    return step
+
+def generate_roadmap_streaming(topic):
+    """
+    Generate a roadmap as an outline followed by levels expanded in parallel.
+    
+    Yields events as they become available:
+      {"event": "outline", "roadmap": ...}  roadmap with placeholder steps
+      {"event": "step", "step": ...}        one fully expanded level, in completion order
+      {"event": "complete", "roadmap": ...} the assembled, validated roadmap
+
+    If the assembled roadmap fails validation, the complete event carries the
+    default roadmap instead and "fallback": true.
+    """
+    logger.info(f"Generating roadmap outline for topic: {topic}")
+    outline = generate_roadmap_outline(topic)
+    
+    if outline is None:
+        logger.warning("Outline generation failed, using default roadmap")
+        roadmap = get_default_roadmap(topic)
+        yield {"event": "outline", "roadmap": roadmap}
+        yield {"event": "complete", "roadmap": roadmap}
+        return
+    
+    roadmap = {
+        "title": outline.get('title', f"Learning Roadmap for {topic}"),
+        "description": outline.get('description', ''),
+        "steps": [
+            {**level, "topics": [], "resources": []}
+            for level in outline['levels']
+        ],
+        "estimated_time": outline.get('estimated_time', ''),
+        "prerequisites": outline.get('prerequisites', [])
+    }
+    if outline.get('learning_tips'):
+        roadmap['learning_tips'] = outline['learning_tips']
+    
+    yield {"event": "outline", "roadmap": roadmap}
+    
+    # All levels run under one admission ticket, so the roadmap is admitted as a whole
+    # rather than level by level behind its own earlier levels
+    with admission.slot("roadmap"), concurrent.futures.ThreadPoolExecutor(max_workers=LEVEL_EXPANSION_WORKERS) as executor:
+        futures = [
+            executor.submit(expand_roadmap_level, topic, outline, level)
+            for level in outline['levels']
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            step = future.result()
+            roadmap['steps'][step['level'] - 1] = step
+            yield {"event": "step", "step": step}
+    
+    if not validate_roadmap_structure(roadmap):
+        logger.warning("Assembled roadmap has invalid structure, using default")
+        yield {"event": "complete", "roadmap": get_default_roadmap(topic), "fallback": True}
+        return
+    logger.info(f"Successfully generated parallel roadmap for {topic}")
+    yield {"event": "complete", "roadmap": roadmap}
+
+def generate_roadmap_parallel(topic):
+    """
+    Generate a roadmap with per-level parallel expansion and return the final result.
+    """
+    roadmap = None
+    for event in generate_roadmap_streaming(topic):
+        if event['event'] == 'complete':
+            roadmap = event['roadmap']
+    return roadmap
+
 def get_default_roadmap(topic):
     """
     Return a topic-specific default roadmap structure with actual links.
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+
+# Add the current directory to the path so we can import the service modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prerequisite_graph import PrerequisiteGraph
+
+PYTHON_ROADMAP = {
+    "title": "Python",
+    "prerequisites": ["Basic computer skills"],
+    "steps": [
+        {"level": 1, "topics": ["Syntax", "Variables"], "resources": ["python docs"]},
+        {"level": 2, "topics": ["Functions"], "resources": []},
+    ]
+}
+
+ML_ROADMAP = {
+    "title": "Machine Learning",
+    "prerequisites": ["Basic computer skills"],
+    "steps": [
+        {"level": 1, "topics": ["Python"], "resources": []},
+        {"level": 2, "topics": ["Linear algebra", "Statistics"], "resources": ["khan academy"]},
+        {"level": 3, "topics": ["Regression"], "resources": []},
+    ]
+}
+
+
+@pytest.fixture
+def graph(tmp_path):
+    graph = PrerequisiteGraph(str(tmp_path / "roadmap_graph.json"))
+    graph.add_roadmap(PYTHON_ROADMAP, "Python")
+    graph.add_roadmap(ML_ROADMAP, "Machine Learning")
+    return graph
+
+
+def concepts(steps):
+    return [step["concept"] for step in steps]
+
+
+def test_learning_order_puts_prerequisites_first(graph):
+    order = concepts(graph.learning_order("machine learning"))
+    assert order[0] == "Basic computer skills"
+    assert order[-1] == "Machine Learning"
+    assert order.index("Functions") < order.index("Python") < order.index("Regression")
+
+
+def test_path_to_goal_starts_after_known_concepts(graph):
+    path = concepts(graph.path_to_goal(["Python"], "Machine Learning"))
+    assert path[-1] == "Machine Learning"
+    assert "Python" not in path and "Syntax" not in path
+    assert path[-2] == "Regression"
+
+
+def test_path_to_goal_edge_cases(graph):
+    assert graph.path_to_goal(["machine learning"], "Machine Learning") == []
+    assert graph.path_to_goal(["Python"], "Quantum Chemistry") is None
+    # Nothing known leads to the goal: the full order minus what is known
+    path = concepts(graph.path_to_goal(["Cooking"], "Python"))
+    assert path == concepts(graph.learning_order("Python"))
+
+
+def test_merge_roadmaps_shares_concepts(graph):
+    merged = graph.merge_roadmaps(["Python", "Machine Learning", "Unknown"])
+    topics = [topic for step in merged["steps"] for topic in step["topics"]]
+    assert merged["prerequisites"] == ["Basic computer skills"]
+    assert len(topics) == len(set(topics))
+    assert topics.index("Syntax") < topics.index("Regression")
+    # Requested goals are what the merged roadmap leads to, not stage topics
+    assert "Python" not in topics and "Machine Learning" not in topics
+    assert [step["level"] for step in merged["steps"]] == list(range(1, len(merged["steps"]) + 1))
+    assert graph.merge_roadmaps(["Unknown"]) is None
+
+
+def test_saves_keep_roadmaps_from_other_instances(tmp_path):
+    path = str(tmp_path / "roadmap_graph.json")
+    first = PrerequisiteGraph(path)
+    second = PrerequisiteGraph(path)
+    first.add_roadmap(PYTHON_ROADMAP, "Python")
+    first.save()
+    second.add_roadmap(ML_ROADMAP, "Machine Learning")
+    second.save()
+
+    reloaded = PrerequisiteGraph(path)
+    assert reloaded.get_roadmap("Python") == PYTHON_ROADMAP
+    assert reloaded.get_roadmap("machine learning") == ML_ROADMAP
@@ -2,11 +2,23 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import sys
 import os
+import logging
 
 # Add the current directory to the path so we can import course_recommender
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from course_recommender import CourseRecommender, get_course_recommendations
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from course_recommender import CourseRecommender, course_sources, get_course_recommendations
+from external_courses import ExternalCourseFetcher
+from autocomplete import AutocompleteIndex
+from user_profiles import UserProfileStore, blend_with_profile
+from common.static_payload import StaticPayload
+from common.item_neighbors import ItemNeighbors
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -14,6 +26,51 @@ CORS(app)  # Enable CORS for all routes
 # Initialize the course recommender
 course_recommender = CourseRecommender()
 
+# Concurrent, cached external lookups; slow sources never hold a request past the deadline
+external_fetcher = ExternalCourseFetcher(get_course_recommendations)
+
+# Autocomplete over catalog titles, topics and past searches; answered from memory, never scraped
+autocomplete_index = AutocompleteIndex()
+autocomplete_index.add_catalog(course_recommender.catalog)
+MAX_AUTOCOMPLETE_RESULTS = 8
+
+# Per-user profiles precomputed from Quiz_Bot history by `python user_profiles.py`
+user_profiles = UserProfileStore()
+
+# "Learners who studied X next studied Y", built by `python item_cooccurrence.py`
+item_neighbors = ItemNeighbors()
+
+# Top profile topics used for external lookups when a request has only a user_id
+PROFILE_INTERESTS = 3
+
+# Largest number of internal recommendations, and of next topics, a request may ask for
+MAX_RECOMMENDATIONS = 20
+MAX_NEXT_TOPICS = 20
+
+# /api/search only does an external lookup, so it can afford to wait longer
+SEARCH_DEADLINE = 8.0
+
+def parse_limit(value, default, maximum):
+    """Clamp a client-supplied result limit to 1..maximum; raises ValueError if it is not an integer."""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return min(max(int(value), 1), maximum)
+
+def build_topics_payload():
+    """Collect every topic covered by the internal course catalog"""
+    all_topics = course_recommender.catalog.topics()
+    
+    return {
+        "success": True,
+        "topics": all_topics,
+        "count": len(all_topics)
+    }
+
+# Serialized once at startup; call update() whenever the catalog changes
+topics_payload = StaticPayload(build_topics_payload())
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -25,12 +82,16 @@ def recommend_courses():
     try:
         data = request.get_json()
         
-        if not data or 'interests' not in data:
+        user_id = data.get('user_id') if isinstance(data, dict) else None
+        profile = user_profiles.get(user_id) if user_id else None
+        
+        if not data or ('interests' not in data and profile is None):
             return jsonify({
                 "error": "Missing 'interests' field in request body"
             }), 400
         
-        interests = data['interests']
+        # Without explicit interests, the user's strongest topics stand in for them
+        interests = data['interests'] if 'interests' in data else list(profile['affinity'])[:PROFILE_INTERESTS]
         
         # Handle both string and list inputs
         if isinstance(interests, str):
@@ -40,14 +101,30 @@ def recommend_courses():
                 "error": "Interests must be a string or list of strings"
             }), 400
         
+        level = data.get('level')
+        try:
+            limit = parse_limit(data.get('limit'), 3, MAX_RECOMMENDATIONS)
+        except (TypeError, ValueError):
+            return jsonify({
+                "error": "Limit must be an integer"
+            }), 400
+        
+        for interest in interests:
+            autocomplete_index.submit_query(interest)
+        
         # Get recommendations using the course recommender
-        recommendations = course_recommender.get_recommendations(interests)
+        if profile is None:
+            recommendations = course_recommender.get_recommendations(interests, level=level, limit=limit)
+        else:
+            # Personalized: precomputed per-user courses, blended with any explicit interests
+            matches = course_recommender.get_recommendations(interests, level=level, limit=limit) if 'interests' in data else []
+            recommendations = blend_with_profile(profile, matches, level=level, limit=limit)
         
-        # Also get external course recommendations
+        # Also get external course recommendations, all interests at once
+        external_results, external_partial = external_fetcher.fetch_many(interests)
         external_recommendations = []
         for interest in interests:
-            external_courses = get_course_recommendations(interest)
-            for title, url in external_courses:
+            for title, url in external_results.get(interest, []):
                 external_recommendations.append({
                     "title": title,
                     "url": url,
@@ -66,7 +143,7 @@ def recommend_courses():
                 "level": course['level'],
                 "topics": course['topics'],
                 "source": "internal",
-                "url": None
+                "url": course.get('url')
             })
         
         # Add external recommendations (limit to avoid duplicates)
@@ -83,7 +160,9 @@ def recommend_courses():
             "success": True,
             "recommendations": formatted_recommendations,
             "count": len(formatted_recommendations),
-            "interests": interests
+            "interests": interests,
+            "external_partial": external_partial,
+            "personalized": profile is not None
         })
         
     except Exception as e:
@@ -103,7 +182,9 @@ def search_courses():
             }), 400
         
         # Get course recommendations for the search query
-        recommendations = get_course_recommendations(query)
+        autocomplete_index.submit_query(query)
+        external_results, partial = external_fetcher.fetch_many([query], deadline=SEARCH_DEADLINE)
+        recommendations = external_results.get(query, [])
         
         formatted_recommendations = []
         for title, url in recommendations:
@@ -118,6 +199,33 @@ def search_courses():
             "success": True,
             "results": formatted_recommendations,
             "count": len(formatted_recommendations),
+            "query": query,
+            "partial": partial
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    """Suggest course titles, topics and past searches for a typed prefix"""
+    try:
+        query = request.args.get('q', '')
+        try:
+            limit = parse_limit(request.args.get('limit'), MAX_AUTOCOMPLETE_RESULTS, MAX_AUTOCOMPLETE_RESULTS)
+        except ValueError:
+            return jsonify({
+                "error": "Limit must be an integer"
+            }), 400
+        
+        suggestions = autocomplete_index.suggest(query, limit=limit)
+        
+        return jsonify({
+            "success": True,
+            "suggestions": suggestions,
+            "count": len(suggestions),
             "query": query
         })
         
@@ -126,6 +234,42 @@ def search_courses():
             "error": f"An error occurred: {str(e)}"
         }), 500
 
+@app.route('/api/next', methods=['GET'])
+def get_next_topics():
+    """Get the topics learners studied after a topic, with a course for each"""
+    try:
+        topic = request.args.get('topic', '')
+        
+        if not topic:
+            return jsonify({
+                "error": "Missing 'topic' query parameter"
+            }), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), 5, MAX_NEXT_TOPICS)
+        except ValueError:
+            return jsonify({
+                "error": "Limit must be an integer"
+            }), 400
+        
+        next_topics = item_neighbors.next_items(topic, limit=limit)
+        
+        for entry in next_topics:
+            courses = course_recommender.get_recommendations([entry['item']], limit=1)
+            entry['course'] = courses[0] if courses else None
+        
+        return jsonify({
+            "success": True,
+            "topic": topic,
+            "next": next_topics,
+            "count": len(next_topics)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
 @app.route('/api/courses', methods=['GET'])
 def get_all_courses():
     """Get all available courses from the internal database"""
@@ -145,14 +289,21 @@ def get_all_courses():
 def get_available_topics():
     """Get all available topics for recommendations"""
     try:
-        all_topics = set()
-        for course in course_recommender.courses:
-            all_topics.update(course['topics'])
+        return topics_payload.respond()
         
+    except Exception as e:
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/sources', methods=['GET'])
+def get_source_status():
+    """Get the circuit breaker state of every external course source"""
+    try:
         return jsonify({
             "success": True,
-            "topics": sorted(list(all_topics)),
-            "count": len(all_topics)
+            "sources": course_sources.stats(),
+            "cache": external_fetcher.stats()
         })
         
     except Exception as e:
@@ -166,8 +317,11 @@ if __name__ == '__main__':
     print("- GET  /health - Health check")
     print("- POST /api/recommend - Get course recommendations")
     print("- GET  /api/search?q=<query> - Search courses")
+    print("- GET  /api/autocomplete?q=<prefix> - Autocomplete suggestions")
+    print("- GET  /api/next?topic=<topic> - Topics learners studied next")
     print("- GET  /api/courses - Get all courses")
     print("- GET  /api/topics - Get available topics")
+    print("- GET  /api/sources - External source status")
     print("\nServer running on http://localhost:5001")
     
     app.run(host='0.0.0.0', port=5001, debug=True) 
\ No newline at end of file
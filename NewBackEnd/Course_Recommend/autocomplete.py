@@ -0,0 +1,341 @@
+import heapq
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from course_catalog import normalize_topic
+
+logger = logging.getLogger(__name__)
+
+# Suggestions kept at every trie node, so a prefix lookup never walks a subtree
+SUGGESTIONS_PER_NODE = 8
+
+# Keys are cut to this length; longer prefixes are rare and the cut keeps the trie small
+MAX_KEY_CHARS = 24
+
+# Besides the whole phrase, a phrase is also reachable from this many later word starts
+WORD_START_KEYS = 3
+
+# Typo tolerance: none below 4 typed characters, one edit from 4, two from 8
+FUZZY_MIN_CHARS = 4
+FUZZY_TWO_EDITS_CHARS = 8
+
+# Ranking weights per suggestion kind
+KIND_WEIGHTS = {
+    'topic': 3.0,
+    'course': 1.0,
+    'query': 2.0
+}
+
+# A submitted search is suggested to other users only after this many submissions;
+# until then it is just counted, outside the trie
+MIN_QUERY_COUNT = 3
+# Searches still being counted, and searches being suggested; the least recently seen go first
+MAX_PENDING_QUERIES = 10000
+MAX_QUERY_PHRASES = 2000
+# Suggested searches nobody submitted for this long are dropped (seconds)
+QUERY_TTL = 30 * 24 * 3600
+
+# Submitted searches waiting for the background recorder; when it falls behind, new ones are dropped
+RECORD_QUEUE_SIZE = 1000
+
+
+class _TrieNode:
+    __slots__ = ('children', 'top', 'ends', 'keys')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # (-weight, phrase) pairs, the best of the subtree, best first
+        self.ends = set()  # phrases with a key ending at this node
+        self.keys = 0  # keys passing through this node; the node is pruned when it reaches 0
+
+
+class AutocompleteIndex:
+    """
+    Prefix and typo-tolerant autocomplete over catalog titles, topics and past queries.
+
+    Phrases are stored in a character trie. Every node keeps the best few
+    phrases beneath it, so an exact prefix lookup costs one step per typed
+    character. When a prefix has too few completions, the trie is walked again
+    with a Levenshtein row per node (bounded edit distance), one more edit at a
+    time, pruning branches that are already too far from the query and
+    stopping once enough suggestions are found.
+
+    Past queries are suggested once MIN_QUERY_COUNT submissions were seen,
+    and at most MAX_QUERY_PHRASES of them are kept, each for QUERY_TTL
+    seconds after it was last submitted. Dropping a phrase only updates the
+    nodes on its keys.
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.phrases = {}  # phrase -> {"text", "kind", "weight"}
+        self._pending_queries = OrderedDict()  # phrase -> submissions, not suggested yet
+        self._query_seen = OrderedDict()  # suggested query phrase -> last submission time, oldest first
+        self._lock = threading.Lock()
+        self._submitted = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+        self._recorder = None
+
+    def add(self, text, kind, weight=None):
+        """Add a phrase, or raise its weight if it is already indexed."""
+        phrase = normalize_topic(text)
+        if not phrase:
+            return
+        with self._lock:
+            self._add(phrase, text, kind, weight)
+
+    def _add(self, phrase, text, kind, weight=None):
+        # Caller holds the lock
+        weight = KIND_WEIGHTS.get(kind, 1.0) if weight is None else weight
+        entry = self.phrases.get(phrase)
+        if entry is None:
+            entry = self.phrases[phrase] = {"text": str(text).strip(), "kind": kind, "weight": 0.0}
+            for key in self._keys(phrase):
+                self._insert(key, phrase)
+        entry["weight"] += weight
+        for key in self._keys(phrase):
+            self._offer_along(key, phrase, entry["weight"])
+
+    def add_catalog(self, catalog):
+        """Index every course title and topic tag of a catalog."""
+        with self._lock:
+            # Build the trie first and rank every node once at the end, rather than per phrase
+            for course in catalog.courses:
+                for text, kind in [(course['title'], 'course')] + [(topic, 'topic') for topic in course['topics']]:
+                    phrase = normalize_topic(text)
+                    if not phrase:
+                        continue
+                    entry = self.phrases.get(phrase)
+                    if entry is None:
+                        entry = self.phrases[phrase] = {"text": str(text).strip(), "kind": kind, "weight": 0.0}
+                        for key in self._keys(phrase):
+                            self._insert(key, phrase)
+                    entry["weight"] += KIND_WEIGHTS.get(kind, 1.0)
+            self._rank_all()
+
+    def submit_query(self, query):
+        """Record a submitted search in a background thread, so the request never waits for the index."""
+        with self._lock:
+            if self._recorder is None:
+                self._recorder = threading.Thread(target=self._record_loop, name="autocomplete-recorder", daemon=True)
+                self._recorder.start()
+        try:
+            self._submitted.put_nowait(query)
+        except queue.Full:
+            pass
+
+    def _record_loop(self):
+        while True:
+            query = self._submitted.get()
+            try:
+                self.record_query(query)
+            except Exception as e:
+                logger.error(f"Error recording search {query!r}: {str(e)}")
+
+    def record_query(self, query):
+        """Count a submitted search; it is suggested to later users once it was submitted MIN_QUERY_COUNT times."""
+        phrase = normalize_topic(query)
+        if len(phrase) < 2:
+            return
+        now = time.time()
+
+        with self._lock:
+            if phrase in self.phrases:
+                # Catalog phrases and searches already suggested just gain weight
+                if phrase in self._query_seen:
+                    self._query_seen[phrase] = now
+                    self._query_seen.move_to_end(phrase)
+                self._add(phrase, query, 'query')
+            else:
+                count = self._pending_queries.pop(phrase, 0) + 1
+                if count < MIN_QUERY_COUNT:
+                    self._pending_queries[phrase] = count
+                    while len(self._pending_queries) > MAX_PENDING_QUERIES:
+                        self._pending_queries.popitem(last=False)
+                else:
+                    self._add(phrase, query, 'query', KIND_WEIGHTS['query'] * count)
+                    self._query_seen[phrase] = now
+            self._expire_queries(now)
+
+    def _expire_queries(self, now):
+        # Caller holds the lock; drop the least recently submitted searches past the cap or the TTL
+        while self._query_seen:
+            phrase, seen = next(iter(self._query_seen.items()))
+            if len(self._query_seen) <= MAX_QUERY_PHRASES and now - seen <= QUERY_TTL:
+                break
+            del self._query_seen[phrase]
+            self._remove(phrase)
+
+    @staticmethod
+    def _keys(phrase):
+        keys = [phrase[:MAX_KEY_CHARS]]
+        for match in list(re.finditer(r' (?=\S)', phrase))[:WORD_START_KEYS]:
+            key = phrase[match.end():][:MAX_KEY_CHARS]
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    def _insert(self, key, phrase):
+        node = self.root
+        node.keys += 1
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+            node.keys += 1
+        node.ends.add(phrase)
+
+    def _offer_along(self, key, phrase, weight):
+        node = self.root
+        self._offer(node, phrase, weight)
+        for char in key:
+            node = node.children[char]
+            self._offer(node, phrase, weight)
+
+    @staticmethod
+    def _offer(node, phrase, weight):
+        item = (-weight, phrase)
+        top = node.top
+        # Weights only ever grow, so a phrase ranked below a full list cannot already be in it
+        if len(top) >= SUGGESTIONS_PER_NODE and item > top[-1]:
+            return
+        for index, (_, existing) in enumerate(top):
+            if existing == phrase:
+                del top[index]
+                break
+        top.append(item)
+        top.sort()
+        del top[SUGGESTIONS_PER_NODE:]
+
+    def _remove(self, phrase):
+        """Drop a phrase, pruning emptied nodes and re-ranking the nodes that listed it."""
+        del self.phrases[phrase]
+        affected = []  # (depth, node) on the phrase's keys
+        for key in self._keys(phrase):
+            path = [self.root]
+            for char in key:
+                path.append(path[-1].children[char])
+            path[-1].ends.discard(phrase)
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                node.keys -= 1
+                if node.keys == 0 and depth:
+                    del path[depth - 1].children[key[depth - 1]]
+                else:
+                    affected.append((depth, node))
+        # Deepest first, so every node is re-ranked from children that no longer list the phrase
+        for _, node in sorted(affected, key=lambda item: -item[0]):
+            if any(existing == phrase for _, existing in node.top):
+                node.top = self._best(node)
+
+    def _best(self, node):
+        if not node.ends and len(node.children) == 1:
+            # Most nodes sit on a single chain; copied because _offer updates lists in place
+            return list(next(iter(node.children.values())).top)
+        candidates = {phrase: -self.phrases[phrase]["weight"] for phrase in node.ends}
+        for child in node.children.values():
+            for negative_weight, phrase in child.top:
+                candidates[phrase] = negative_weight
+        return heapq.nsmallest(SUGGESTIONS_PER_NODE, ((weight, phrase) for phrase, weight in candidates.items()))
+
+    def _rank_all(self):
+        # Post-order walk: every node is ranked after its children
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                node.top = self._best(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+
+    def suggest(self, prefix, limit=SUGGESTIONS_PER_NODE):
+        """
+        Suggest completions for a typed prefix.
+
+        Returns:
+            list: Dicts with text, kind and distance (number of typo corrections)
+        """
+        query = normalize_topic(prefix)[:MAX_KEY_CHARS]
+        if not query:
+            return []
+
+        with self._lock:
+            found = {}
+            node = self.root
+            for char in query:
+                node = node.children.get(char)
+                if node is None:
+                    break
+            else:
+                for negative_weight, phrase in node.top:
+                    found[phrase] = (0, negative_weight)
+
+            max_distance = self.edit_budget(query)
+            distance = 1
+            while len(found) < limit and distance <= max_distance:
+                self._fuzzy_collect(query, distance, found, limit)
+                distance += 1
+
+            # Fewest corrections first, then highest weight
+            ranked = sorted(found.items(), key=lambda item: (item[1], item[0]))[:limit]
+            return [
+                {
+                    "text": self.phrases[phrase]["text"],
+                    "kind": self.phrases[phrase]["kind"],
+                    "distance": distance
+                }
+                for phrase, (distance, _) in ranked
+            ]
+
+    @staticmethod
+    def edit_budget(query):
+        """Typos tolerated for a typed prefix; short prefixes have too many close neighbours to allow any."""
+        if len(query) < FUZZY_MIN_CHARS:
+            return 0
+        return 2 if len(query) >= FUZZY_TWO_EDITS_CHARS else 1
+
+    def _fuzzy_collect(self, query, max_distance, found, limit):
+        """
+        Add the suggestions of trie nodes within max_distance edits of the query (as a prefix) to found.
+
+        Called with one more edit at a time: a node within the distance already
+        lists the best phrases of its subtree, and any deeper node that is
+        closer was found by an earlier call, so the walk does not go below it.
+        Children are visited best first and the walk stops at `limit` suggestions.
+        """
+        first_row = list(range(len(query) + 1))
+        stack = [(child, char, first_row, None, None) for char, child in self._by_weight(self.root)]
+
+        while stack and len(found) < limit:
+            node, char, previous_row, before_row, previous_char = stack.pop()
+            row = [previous_row[0] + 1]
+            for i in range(1, len(query) + 1):
+                cost = 0 if query[i - 1] == char else 1
+                distance = min(row[i - 1] + 1, previous_row[i] + 1, previous_row[i - 1] + cost)
+                # Swapped neighbouring letters ("pyhton") count as one edit
+                if i > 1 and before_row is not None and query[i - 1] == previous_char and query[i - 2] == char:
+                    distance = min(distance, before_row[i - 2] + 1)
+                row.append(distance)
+
+            if row[-1] <= max_distance:
+                for negative_weight, phrase in node.top:
+                    if phrase not in found or found[phrase][0] > row[-1]:
+                        found[phrase] = (row[-1], negative_weight)
+            elif min(row) <= max_distance:
+                stack.extend(
+                    (child, next_char, row, previous_row, char)
+                    for next_char, child in self._by_weight(node)
+                )
+
+    @staticmethod
+    def _by_weight(node):
+        # Children worst first, so the best is popped from the stack first
+        return sorted(node.children.items(), key=lambda item: item[1].top[0] if item[1].top else (0, ''), reverse=True)
+
+    def __len__(self):
+        return len(self.phrases)
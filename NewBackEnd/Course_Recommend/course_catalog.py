@@ -0,0 +1,261 @@
+import csv
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights: a term in the topic tags counts more than one in the description
+FIELD_WEIGHTS = {
+    'topics': 3.0,
+    'title': 2.0,
+    'description': 1.0
+}
+
+# Bonus for an interest that exactly matches a course topic tag
+TOPIC_MATCH_BOOST = 5.0
+
+# Terms with at least this many postings also get a doc -> impact lookup table,
+# so a query that stops scanning them early can still score its candidates
+LOOKUP_MIN_POSTINGS = 512
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in',
+    'into', 'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with', 'your', 'you'
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text):
+    """Lowercase a string and split it into index terms."""
+    tokens = TOKEN_PATTERN.findall(str(text).lower())
+    return [token.rstrip('.') for token in tokens if token not in STOPWORDS]
+
+
+def course_terms(course):
+    """Field-weighted term frequencies for a course."""
+    weighted_tf = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = course[field]
+        text = ' '.join(value) if isinstance(value, list) else value
+        for token in tokenize(text):
+            weighted_tf[token] += weight
+    return weighted_tf
+
+
+def normalize_topic(topic):
+    """Normalize a topic tag or interest for exact matching."""
+    return re.sub(r'\s+', ' ', str(topic)).strip().lower()
+
+
+class CourseCatalog:
+    """
+    In-memory course catalog with a BM25 inverted index.
+
+    Courses are loaded from JSONL or CSV files (or passed in directly). Each
+    posting stores the precomputed BM25 impact of a term for a course, and
+    postings are kept in descending impact order. A query sums impacts term by
+    term and stops scanning a posting list as soon as no unseen course could
+    still reach the current top results (MaxScore-style pruning), then
+    selects the results with a heap.
+    """
+
+    def __init__(self, courses=None):
+        self.courses = []
+        self.postings = {}
+        self.posting_lookup = {}
+        self.topic_index = {}
+        self.level_index = {}
+        if courses:
+            self.add_courses(courses)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def load(self, path):
+        """Load courses from a .jsonl or .csv file and add them to the catalog."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext in ('.jsonl', '.ndjson'):
+            courses = self._read_jsonl(path)
+        elif ext == '.csv':
+            courses = self._read_csv(path)
+        else:
+            raise ValueError(f"Unsupported catalog file type: {ext}. Use .jsonl or .csv")
+
+        self.add_courses(courses)
+        return len(courses)
+
+    def _read_jsonl(self, path):
+        courses = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    courses.append(json.loads(line))
+        return courses
+
+    def _read_csv(self, path):
+        courses = []
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                topics = row.get('topics') or ''
+                row['topics'] = [topic.strip() for topic in re.split(r'[;|]', topics) if topic.strip()]
+                courses.append(row)
+        return courses
+
+    def add_courses(self, courses):
+        """Add courses to the catalog and rebuild the index."""
+        for course in courses:
+            if not course.get('title'):
+                continue
+            topics = course.get('topics') or []
+            if isinstance(topics, str):
+                topics = [topic.strip() for topic in re.split(r'[;|,]', topics) if topic.strip()]
+            self.courses.append({
+                'title': course['title'],
+                'description': course.get('description', ''),
+                'level': course.get('level') or 'Not specified',
+                'topics': topics,
+                'url': course.get('url') or None
+            })
+        self._build_index()
+
+    def _build_index(self):
+        doc_terms = []
+        doc_lengths = []
+        document_frequency = Counter()
+        topic_index = defaultdict(set)
+        level_index = defaultdict(set)
+
+        for doc_id, course in enumerate(self.courses):
+            weighted_tf = course_terms(course)
+            doc_terms.append(weighted_tf)
+            doc_lengths.append(sum(weighted_tf.values()))
+            document_frequency.update(weighted_tf.keys())
+
+            for topic in course['topics']:
+                topic_index[normalize_topic(topic)].add(doc_id)
+            level_index[normalize_topic(course['level'])].add(doc_id)
+
+        total_docs = len(self.courses)
+        average_length = (sum(doc_lengths) / total_docs) if total_docs else 0.0
+        postings = defaultdict(list)
+
+        for doc_id, weighted_tf in enumerate(doc_terms):
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / average_length) if average_length else BM25_K1
+            for term, tf in weighted_tf.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                postings[term].append((idf * tf * (BM25_K1 + 1) / (tf + length_norm), doc_id))
+
+        for term_postings in postings.values():
+            term_postings.sort(reverse=True)
+
+        self.postings = dict(postings)
+        self.posting_lookup = {
+            term: {doc_id: impact for impact, doc_id in term_postings}
+            for term, term_postings in postings.items()
+            if len(term_postings) >= LOOKUP_MIN_POSTINGS
+        }
+        self.topic_index = dict(topic_index)
+        self.level_index = dict(level_index)
+
+    def topics(self):
+        """All topic tags in the catalog."""
+        return sorted({topic for course in self.courses for topic in course['topics']})
+
+    def search(self, interests, level=None, limit=10):
+        """
+        Score courses for a list of interests and return the top results.
+
+        Args:
+            interests (list): Interests or free-text queries
+            level (str): Optional level filter (e.g. "Beginner")
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (course, score) tuples, best first
+        """
+        return [(self.courses[doc_id], score) for doc_id, score in self.search_ids(interests, level, limit)]
+
+    def search_ids(self, interests, level=None, limit=10):
+        """Same as search(), but returns (doc_id, score) tuples."""
+        if isinstance(interests, str):
+            interests = [interests]
+
+        allowed = None
+        if level:
+            allowed = self.level_index.get(normalize_topic(level), set())
+            if not allowed:
+                return []
+
+        scores = {}
+
+        # Exact topic tag matches are the strongest signal, so score them first
+        for interest in interests:
+            for doc_id in self.topic_index.get(normalize_topic(interest), ()):
+                if allowed is None or doc_id in allowed:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + TOPIC_MATCH_BOOST
+
+        terms = set()
+        for interest in interests:
+            terms.update(tokenize(interest))
+        ordered = sorted(
+            (term for term in terms if term in self.postings),
+            key=lambda term: self.postings[term][0][0],
+            reverse=True
+        )
+
+        # remaining[i] is the best score any course could still gain from terms i onwards
+        remaining = [0.0] * (len(ordered) + 1)
+        for i in range(len(ordered) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + self.postings[ordered[i]][0][0]
+
+        for i, term in enumerate(ordered):
+            threshold = self._threshold(scores, limit)
+            rest = remaining[i + 1]
+            term_postings = self.postings[term]
+            updated = set()
+            stop = len(term_postings)
+
+            for position, (impact, doc_id) in enumerate(term_postings):
+                current = scores.get(doc_id)
+                if current is not None:
+                    scores[doc_id] = current + impact
+                    updated.add(doc_id)
+                elif impact + rest <= threshold:
+                    # Postings are impact-ordered: no unseen course can reach the top results any more
+                    stop = position
+                    break
+                elif allowed is None or doc_id in allowed:
+                    scores[doc_id] = impact
+                    updated.add(doc_id)
+
+            if stop < len(term_postings):
+                # Existing candidates may still appear in the unscanned tail of this posting list
+                lookup = self.posting_lookup.get(term)
+                if lookup is not None and len(scores) < len(term_postings) - stop:
+                    for doc_id in scores:
+                        if doc_id not in updated and doc_id in lookup:
+                            scores[doc_id] += lookup[doc_id]
+                else:
+                    for impact, doc_id in term_postings[stop:]:
+                        if doc_id in scores and doc_id not in updated:
+                            scores[doc_id] += impact
+
+        top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return top
+
+    @staticmethod
+    def _threshold(scores, limit):
+        """Score of the current k-th best candidate, or 0 while there are fewer than k."""
+        if limit <= 0 or len(scores) < limit:
+            return 0.0
+        return heapq.nlargest(limit, scores.values())[-1]
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+from course_catalog import course_terms, normalize_topic, tokenize
+
+# Embedding configuration
+VECTOR_DIM = 256
+INDEX_NONZEROS = 8  # Non-zero entries in each term's random index vector
+NNZ_CHUNK = 65536  # Rows of the sparse term/course matrix processed at once
+
+VECTOR_CACHE_DIR = os.getenv(
+    "COURSE_VECTOR_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_cache")
+)
+
+
+def _index_vector_positions(term):
+    """Deterministic sparse ternary index vector for a term, derived from its hash."""
+    digest = hashlib.blake2b(term.encode('utf-8'), digest_size=2 * INDEX_NONZEROS).digest()
+    positions = [digest[2 * i] % VECTOR_DIM for i in range(INDEX_NONZEROS)]
+    signs = [1.0 if digest[2 * i + 1] & 1 else -1.0 for i in range(INDEX_NONZEROS)]
+    return positions, signs
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _sparse_dot(rows, cols, weights, dense, num_rows):
+    """Multiply the sparse matrix given as (rows, cols, weights) triples by a dense matrix."""
+    order = np.argsort(rows, kind='stable')
+    rows, cols, weights = rows[order], cols[order], weights[order]
+
+    out = np.zeros((num_rows, dense.shape[1]), dtype=np.float32)
+    for start in range(0, len(rows), NNZ_CHUNK):
+        end = start + NNZ_CHUNK
+        chunk_rows = rows[start:end]
+        products = weights[start:end, None] * dense[cols[start:end]]
+        # Rows are sorted, so each row's products are contiguous and can be summed with reduceat
+        unique_rows, row_starts = np.unique(chunk_rows, return_index=True)
+        out[unique_rows] += np.add.reduceat(products, row_starts, axis=0)
+    return out
+
+
+class CourseEmbeddings:
+    """
+    Dense course vectors for semantic matching, built locally with no model downloads.
+
+    Uses reflective random indexing, a cheap approximation of LSA: every term
+    gets a hash-derived sparse random vector, courses are the TF-IDF weighted
+    sum of their terms' vectors, and each term is then re-embedded as the sum
+    of the courses it occurs in. Terms that co-occur across courses (e.g.
+    "deep learning" and "neural networks") end up close together even when a
+    query shares no words with a course.
+
+    Course and term matrices are saved as .npy files and opened memory-mapped,
+    so worker processes share one copy through the page cache.
+    """
+
+    def __init__(self, catalog, cache_dir=VECTOR_CACHE_DIR):
+        self.catalog = catalog
+        self.cache_dir = cache_dir
+        self.vocabulary = {}
+        self.idf = None
+        self.term_vectors = None
+        self.course_vectors = None
+        self.level_masks = {}
+
+    def fingerprint(self):
+        """Hash of the catalog content, used to detect a stale vector cache."""
+        digest = hashlib.sha256()
+        for course in self.catalog.courses:
+            digest.update(json.dumps(
+                [course['title'], course['description'], course['level'], course['topics']],
+                ensure_ascii=False
+            ).encode('utf-8'))
+        digest.update(f"{VECTOR_DIM}:{INDEX_NONZEROS}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def load_or_build(self):
+        """Open the cached vectors if they match the catalog, otherwise rebuild and save them."""
+        fingerprint = self.fingerprint()
+        if not self._load(fingerprint):
+            self.build()
+            self._save(fingerprint)
+            self._load(fingerprint)
+        self._build_level_masks()
+        return self
+
+    def build(self):
+        """Compute term and course vectors for the current catalog."""
+        courses = self.catalog.courses
+        vocabulary = {}
+        rows, cols, counts = [], [], []
+        for doc_id, course in enumerate(courses):
+            for term, tf in course_terms(course).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                rows.append(doc_id)
+                cols.append(term_id)
+                counts.append(tf)
+
+        num_docs, num_terms = len(courses), len(vocabulary)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.float32)
+
+        document_frequency = np.bincount(cols, minlength=num_terms).astype(np.float32)
+        idf = np.log((1 + num_docs) / (1 + document_frequency)).astype(np.float32) + 1.0
+        weights = (1.0 + np.log(counts)) * idf[cols]
+
+        index_vectors = np.zeros((num_terms, VECTOR_DIM), dtype=np.float32)
+        for term, term_id in vocabulary.items():
+            positions, signs = _index_vector_positions(term)
+            for position, sign in zip(positions, signs):
+                index_vectors[term_id, position] += sign
+
+        # Courses from random term vectors, then terms from the courses they occur in
+        first_pass = _normalize_rows(_sparse_dot(rows, cols, weights, index_vectors, num_docs))
+        term_vectors = _normalize_rows(_sparse_dot(cols, rows, weights, first_pass, num_terms))
+        course_vectors = _normalize_rows(_sparse_dot(rows, cols, weights, term_vectors, num_docs))
+
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.term_vectors = term_vectors
+        self.course_vectors = course_vectors
+
+    def _paths(self):
+        return {
+            "meta": os.path.join(self.cache_dir, "course_vectors.json"),
+            "courses": os.path.join(self.cache_dir, "course_vectors.npy"),
+            "terms": os.path.join(self.cache_dir, "term_vectors.npy"),
+            "idf": os.path.join(self.cache_dir, "term_idf.npy")
+        }
+
+    def _save(self, fingerprint):
+        paths = self._paths()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for key, array in (("courses", self.course_vectors), ("terms", self.term_vectors), ("idf", self.idf)):
+            tmp_path = f"{paths[key]}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, paths[key])
+
+        # Metadata is written last, so a cache is only valid once every matrix is in place
+        tmp_path = f"{paths['meta']}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": fingerprint, "vocabulary": self.vocabulary}, f)
+        os.replace(tmp_path, paths['meta'])
+
+    def _load(self, fingerprint):
+        paths = self._paths()
+        try:
+            with open(paths['meta'], 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return False
+            self.vocabulary = meta['vocabulary']
+            self.course_vectors = np.load(paths['courses'], mmap_mode='r')
+            self.term_vectors = np.load(paths['terms'], mmap_mode='r')
+            self.idf = np.load(paths['idf'], mmap_mode='r')
+            return self.course_vectors.shape[0] == len(self.catalog.courses)
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _build_level_masks(self):
+        self.level_masks = {}
+        for level, doc_ids in self.catalog.level_index.items():
+            mask = np.zeros(len(self.catalog.courses), dtype=bool)
+            mask[list(doc_ids)] = True
+            self.level_masks[level] = mask
+
+    def embed_query(self, interests):
+        """Embed interests as the IDF-weighted sum of known term vectors, or None if no term is known."""
+        if isinstance(interests, str):
+            interests = [interests]
+        term_ids = [
+            self.vocabulary[term]
+            for interest in interests
+            for term in set(tokenize(interest))
+            if term in self.vocabulary
+        ]
+        if not term_ids:
+            return None
+
+        query = self.idf[term_ids] @ self.term_vectors[term_ids]
+        norm = float(np.linalg.norm(query))
+        return query / norm if norm else None
+
+    def search(self, interests, level=None, limit=10, min_similarity=0.2):
+        """
+        Rank courses by cosine similarity to the interests.
+
+        Returns:
+            list: (doc_id, similarity) tuples, best first
+        """
+        if self.course_vectors is None or not len(self.catalog.courses):
+            return []
+
+        query = self.embed_query(interests)
+        if query is None:
+            return []
+
+        # One batched matrix-vector product scores every course
+        similarities = np.asarray(self.course_vectors @ query, dtype=np.float32)
+        if level:
+            mask = self.level_masks.get(normalize_topic(level))
+            if mask is None:
+                return []
+            similarities = np.where(mask, similarities, -math.inf)
+
+        limit = min(limit, len(similarities))
+        candidates = np.argpartition(-similarities, limit - 1)[:limit]
+        candidates = candidates[np.argsort(-similarities[candidates])]
+        return [
+            (int(doc_id), float(similarities[doc_id]))
+            for doc_id in candidates
+            if similarities[doc_id] >= min_similarity
+        ]
@@ -1,57 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
+import os
 
-def scrape_coursera(course_name):
-    """
-    Scrapes Coursera to get top-rated courses for the given course name.
-    """
-    search_url = f"https://www.coursera.org/search?query={urllib.parse.quote(course_name)}"
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
-
-    try:
-        response = requests.get(search_url, headers=headers)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            courses = []
-            # This selector looks for anchor tags that wrap course cards
-            course_tags = soup.select('a[href^="/learn/"]')
-
-            seen = set()
-            for tag in course_tags:
-                title = tag.get_text(strip=True)
-                href = tag.get('href')
-
-                if href and href not in seen and title:
-                    full_link = "https://www.coursera.org" + href
-                    courses.append((title, full_link))
-                    seen.add(href)
+from course_catalog import CourseCatalog
+from course_embeddings import CourseEmbeddings
+from course_sources import SourceAggregator, build_sources
 
-                if len(courses) >= 5:
-                    break
+# Reciprocal rank fusion constant for blending keyword and semantic rankings
+RRF_K = 60
 
-            return courses
-        else:
-            print(f"Failed to access Coursera. Status code: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error during scraping Coursera: {e}")
-        return []
+# External course sources (Coursera, curated links, local fixtures), queried in parallel
+course_sources = SourceAggregator(build_sources())
 
 def get_course_recommendations(course_name):
-    if course_name.lower() == 'python':
-        return [
-            ("Python Official Docs", "https://docs.python.org/3/tutorial/"),
-            ("W3Schools Python", "https://www.w3schools.com/python/"),
-            ("Real Python Tutorials", "https://realpython.com/"),
-            ("FreeCodeCamp Python", "https://www.freecodecamp.org/learn/scientific-computing-with-python/"),
-            ("Python.org Getting Started", "https://www.python.org/about/gettingstarted/")
-        ]
-
-    return scrape_coursera(course_name)
+    return course_sources.search(course_name)
 
 def recommend_course(interests):
     """
@@ -68,16 +28,16 @@ def main():
     recommendations = get_course_recommendations(course_input)
 
     if recommendations:
-        print("\nTop course recommendations from Coursera:")
+        print("\nTop course recommendations:")
         for idx, (title, link) in enumerate(recommendations, 1):
             print(f"{idx}. {title}\n   {link}")
     else:
         print("No course recommendations found.")
 
 class CourseRecommender:
-    def __init__(self):
+    def __init__(self, catalog_path=None):
         # Initialize with some sample courses
-        self.courses = [
+        self.catalog = CourseCatalog([
             {
                 'title': 'Introduction to Python Programming',
                 'description': 'Learn the basics of Python programming language',
@@ -96,40 +56,64 @@ class CourseRecommender:
                 'level': 'Advanced',
                 'topics': ['machine learning', 'ai', 'data science']
             }
-        ]
+        ])
+        
+        # Load an external catalog (JSONL or CSV) if one is configured
+        catalog_path = catalog_path or os.getenv('COURSE_CATALOG_PATH')
+        if catalog_path:
+            try:
+                count = self.catalog.load(catalog_path)
+                print(f"Loaded {count} courses from {catalog_path}")
+            except Exception as e:
+                print(f"Error loading course catalog {catalog_path}: {e}")
+        
+        # Dense course vectors for semantic matching (cached on disk, memory-mapped)
+        self.embeddings = CourseEmbeddings(self.catalog)
+        try:
+            self.embeddings.load_or_build()
+        except Exception as e:
+            print(f"Error building course embeddings: {e}")
+            self.embeddings = None
 
-    def get_recommendations(self, interests):
+    @property
+    def courses(self):
+        return self.catalog.courses
+
+    def get_recommendations(self, interests, level=None, limit=3):
         """
         Get course recommendations based on user interests.
         
         Args:
             interests (list): List of user interests/topics
+            level (str): Optional course level filter
+            limit (int): Maximum number of courses to return
             
         Returns:
             list: Recommended courses
         """
-        # Convert interests to lowercase for case-insensitive matching
-        interests = [interest.lower() for interest in interests]
+        return [self.courses[doc_id] for doc_id, _ in self.rank_ids(interests, level=level, limit=limit)]
+
+    def rank_ids(self, interests, level=None, limit=3):
+        """Same as get_recommendations(), but returns (doc_id, fused score) tuples."""
+        if isinstance(interests, str):
+            interests = [interests]
         
-        # Score each course based on matching interests
-        scored_courses = []
-        for course in self.courses:
-            score = 0
-            for topic in course['topics']:
-                if topic.lower() in interests:
-                    score += 1
-            scored_courses.append((course, score))
+        # Keyword matches from the catalog's inverted index
+        candidates = limit * 5
+        rankings = [self.catalog.search_ids(interests, level=level, limit=candidates)]
         
-        # Sort courses by score in descending order
-        scored_courses.sort(key=lambda x: x[1], reverse=True)
+        # Semantic matches find related courses that share no keywords with the interests
+        if self.embeddings is not None:
+            rankings.append(self.embeddings.search(interests, level=level, limit=candidates))
         
-        # Return top 3 courses with non-zero scores
-        recommendations = [
-            course for course, score in scored_courses
-            if score > 0
-        ][:3]
+        # Blend both rankings with reciprocal rank fusion
+        fused = {}
+        for ranking in rankings:
+            for rank, (doc_id, score) in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
         
-        return recommendations
+        best = sorted(fused, key=fused.get, reverse=True)[:limit]
+        return [(doc_id, fused[doc_id]) for doc_id in best]
 
 if __name__ == "__main__":
     main()
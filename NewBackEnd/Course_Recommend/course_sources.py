@@ -0,0 +1,374 @@
+import abc
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from course_catalog import normalize_topic, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Per-source settings
+SOURCE_TIMEOUT = 6.0  # seconds a single source may take for one query
+RESULTS_PER_SOURCE = 5
+SOURCE_WORKERS = 8
+
+# Circuit breaker settings
+BREAKER_FAILURE_THRESHOLD = 3  # consecutive failures before a source is skipped
+BREAKER_RESET_TIMEOUT = 60  # seconds before a skipped source gets a trial request
+
+SCRAPE_CHUNK_SIZE = 16384
+
+# Enabled sources, in merge priority order; "fixture" needs COURSE_SOURCE_FIXTURE
+ENABLED_SOURCES = os.getenv("COURSE_SOURCES", "curated,coursera")
+FIXTURE_PATH = os.getenv("COURSE_SOURCE_FIXTURE")
+
+# Pooled keep-alive session shared by all scraping sources
+http_session = requests.Session()
+http_session.headers.update({"User-Agent": "Mozilla/5.0"})
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Hand-picked resources for topics where search results are poor
+CURATED_LINKS = {
+    'python': [
+        ("Python Official Docs", "https://docs.python.org/3/tutorial/"),
+        ("W3Schools Python", "https://www.w3schools.com/python/"),
+        ("Real Python Tutorials", "https://realpython.com/"),
+        ("FreeCodeCamp Python", "https://www.freecodecamp.org/learn/scientific-computing-with-python/"),
+        ("Python.org Getting Started", "https://www.python.org/about/gettingstarted/")
+    ]
+}
+
+
+class SourceError(Exception):
+    """Raised by a source when a lookup fails, so its circuit breaker can count it."""
+
+
+class CircuitBreaker:
+    """
+    Skips a source after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and the
+    source is skipped for `reset_timeout` seconds. Then one trial request is
+    let through (half-open): success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.time() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Check whether a request may be sent to the source"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+class CourseSource(abc.ABC):
+    """
+    Base class for external course sources.
+
+    Subclasses implement search() and return a list of (title, url) tuples,
+    raising SourceError when the lookup fails. An exclusive source is asked
+    first, and when it has results no other source is queried.
+    """
+
+    name = "source"
+    exclusive = False
+
+    def __init__(self, timeout=SOURCE_TIMEOUT):
+        self.timeout = timeout
+
+    @abc.abstractmethod
+    def search(self, query, limit=RESULTS_PER_SOURCE):
+        """Return up to `limit` (title, url) tuples for a query."""
+
+
+class CourseCardParser(HTMLParser):
+    """
+    Streaming extractor for course cards: anchors whose href starts with a prefix.
+
+    Equivalent to the CSS selector a[href^="<prefix>"]. It keeps no tree, and
+    `done` turns True once `limit` distinct cards are found, so the caller can
+    stop reading the page.
+    """
+
+    def __init__(self, href_prefix, limit):
+        super().__init__(convert_charrefs=True)
+        self.href_prefix = href_prefix
+        self.limit = limit
+        self.cards = []
+        self._seen = set()
+        self._href = None
+        self._text = []
+        self._depth = 0
+
+    @property
+    def done(self):
+        return len(self.cards) >= self.limit
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        if self._href is not None:
+            self._depth += 1
+            return
+        href = dict(attrs).get('href')
+        if href and href.startswith(self.href_prefix) and href not in self._seen:
+            self._href = href
+            self._text = []
+            self._depth = 0
+
+    def handle_endtag(self, tag):
+        if tag != 'a' or self._href is None:
+            return
+        if self._depth:
+            self._depth -= 1
+            return
+        title = ''.join(self._text).strip()
+        if title and not self.done:
+            self.cards.append((title, self._href))
+            self._seen.add(self._href)
+        self._href = None
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data.strip())
+
+
+class CourseraSource(CourseSource):
+    """Scrapes the Coursera search page for courses."""
+
+    name = "coursera"
+    base_url = "https://www.coursera.org"
+
+    def __init__(self, session=http_session, timeout=SOURCE_TIMEOUT):
+        super().__init__(timeout)
+        self.session = session
+
+    def search(self, query, limit=RESULTS_PER_SOURCE):
+        search_url = f"{self.base_url}/search?query={urllib.parse.quote(query)}"
+        parser = CourseCardParser('/learn/', limit)
+
+        try:
+            # Stream the page and stop downloading as soon as enough cards are parsed
+            with self.session.get(search_url, timeout=(3, self.timeout), stream=True) as response:
+                if response.status_code != 200:
+                    raise SourceError(f"Coursera returned status code {response.status_code}")
+                response.encoding = response.encoding or 'utf-8'
+                for chunk in response.iter_content(chunk_size=SCRAPE_CHUNK_SIZE, decode_unicode=True):
+                    parser.feed(chunk)
+                    if parser.done:
+                        break
+        except requests.RequestException as e:
+            raise SourceError(f"Error during scraping Coursera: {e}")
+
+        return [(title, self.base_url + href) for title, href in parser.cards]
+
+
+class CuratedSource(CourseSource):
+    """Hand-picked links for exact topic matches; curated topics are never scraped."""
+
+    name = "curated"
+    exclusive = True
+
+    def __init__(self, links=None):
+        super().__init__(timeout=1.0)
+        links = CURATED_LINKS if links is None else links
+        self.links = {normalize_topic(topic): entries for topic, entries in links.items()}
+
+    def search(self, query, limit=RESULTS_PER_SOURCE):
+        return list(self.links.get(normalize_topic(query), []))[:limit]
+
+
+class FixtureSource(CourseSource):
+    """
+    Serves courses from a local JSON or JSONL file, for offline testing and benchmarks.
+
+    Each entry needs a title and url and may have topics and a description;
+    an entry matches when it shares a term with the query. An optional
+    latency (seconds) simulates a slow remote source.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path, latency=0.0, timeout=SOURCE_TIMEOUT):
+        super().__init__(timeout)
+        self.latency = latency
+        self.entries = []
+        self.term_index = {}
+        self._load(path)
+
+    def _load(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith(('.jsonl', '.ndjson')):
+                entries = [json.loads(line) for line in f if line.strip()]
+            else:
+                entries = json.load(f)
+
+        for entry in entries:
+            if not entry.get('title') or not entry.get('url'):
+                continue
+            entry_id = len(self.entries)
+            self.entries.append((entry['title'], entry['url']))
+            text = ' '.join([entry['title'], entry.get('description', '')] + list(entry.get('topics', [])))
+            for term in set(tokenize(text)):
+                self.term_index.setdefault(term, []).append(entry_id)
+
+    def search(self, query, limit=RESULTS_PER_SOURCE):
+        if self.latency:
+            time.sleep(self.latency)
+
+        matches = {}
+        for term in set(tokenize(query)):
+            for entry_id in self.term_index.get(term, ()):
+                matches[entry_id] = matches.get(entry_id, 0) + 1
+
+        best = sorted(matches, key=lambda entry_id: (-matches[entry_id], entry_id))[:limit]
+        return [self.entries[entry_id] for entry_id in best]
+
+
+class SourceAggregator:
+    """
+    Queries several course sources in parallel and merges their results.
+
+    Each source has its own timeout and circuit breaker, so a slow or failing
+    site only loses its own results. Results are interleaved round-robin in
+    source order and de-duplicated by URL and title. Exclusive sources
+    (in-memory, like the curated links) are asked first and answer alone
+    when they know the query.
+    """
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self.breakers = {source.name: CircuitBreaker() for source in self.sources}
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=SOURCE_WORKERS, thread_name_prefix="course-sources"
+        )
+
+    def search(self, query, limit=RESULTS_PER_SOURCE):
+        """
+        Search all available sources for a query.
+
+        Returns:
+            list: Merged (title, url) tuples
+        """
+        for source in self.sources:
+            if source.exclusive:
+                results = source.search(query, limit)
+                if results:
+                    return results[:limit]
+
+        start = time.time()
+        futures = []
+        for source in self.sources:
+            if not source.exclusive and self.breakers[source.name].allow():
+                futures.append((source, self.executor.submit(source.search, query, limit)))
+
+        per_source = []
+        for source, future in sorted(futures, key=lambda item: item[0].timeout):
+            breaker = self.breakers[source.name]
+            remaining = max(0.0, start + source.timeout - time.time())
+            try:
+                results = future.result(timeout=remaining)
+            except concurrent.futures.TimeoutError:
+                # The lookup keeps running, but its late result is discarded
+                breaker.record_failure()
+                logger.warning(f"Course source '{source.name}' timed out after {source.timeout}s")
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                logger.warning(f"Course source '{source.name}' failed: {e}")
+                continue
+            breaker.record_success()
+            if results:
+                per_source.append((self.sources.index(source), results))
+
+        per_source = [results for _, results in sorted(per_source, key=lambda item: item[0])]
+        return self._merge(per_source, limit)
+
+    @staticmethod
+    def _merge(per_source, limit):
+        merged = []
+        seen = set()
+        for rank in range(max((len(results) for results in per_source), default=0)):
+            for results in per_source:
+                if rank >= len(results):
+                    continue
+                title, url = results[rank]
+                keys = (url, title.lower())
+                if keys[0] in seen or keys[1] in seen:
+                    continue
+                seen.update(keys)
+                merged.append((title, url))
+        return merged[:limit]
+
+    def stats(self):
+        """Circuit breaker state of every source"""
+        return {
+            source.name: {
+                "state": self.breakers[source.name].state,
+                "failures": self.breakers[source.name].failures,
+                "timeout": source.timeout
+            }
+            for source in self.sources
+        }
+
+
+def build_sources(names=ENABLED_SOURCES, fixture_path=FIXTURE_PATH):
+    """Create the configured sources from a comma-separated list of names."""
+    sources = []
+    for name in (name.strip().lower() for name in names.split(',')):
+        if name == 'curated':
+            sources.append(CuratedSource())
+        elif name == 'coursera':
+            sources.append(CourseraSource())
+        elif name == 'fixture':
+            if not fixture_path:
+                logger.warning("Fixture source enabled but COURSE_SOURCE_FIXTURE is not set")
+                continue
+            try:
+                sources.append(FixtureSource(fixture_path))
+            except Exception as e:
+                logger.error(f"Error loading course source fixture {fixture_path}: {e}")
+        elif name:
+            logger.warning(f"Unknown course source: {name}")
+    return sources
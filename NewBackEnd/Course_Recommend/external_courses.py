@@ -0,0 +1,132 @@
+import concurrent.futures
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Fan-out settings
+FANOUT_WORKERS = 8
+FANOUT_DEADLINE = 4.0  # seconds to wait for all external lookups of one request
+
+# Cache settings
+CACHE_TTL = 6 * 3600  # results are fresh for 6 hours
+CACHE_STALE_WINDOW = 24 * 3600  # then served stale for up to a day while refreshing
+EMPTY_RESULT_TTL = 300  # scrapers return [] on errors, so empty results are retried sooner
+CACHE_MAX_ENTRIES = 1000
+
+
+def normalize_query(query):
+    """Normalize a search query so equivalent queries share a cache entry."""
+    return re.sub(r'\s+', ' ', str(query)).strip().lower()
+
+
+class ExternalCourseFetcher:
+    """
+    Runs external course lookups concurrently under an overall deadline.
+
+    Results are cached per normalized query. Fresh entries are returned
+    directly; stale entries are returned immediately while one background
+    refresh runs (stale-while-revalidate). Lookups that miss the deadline keep
+    running in the pool and fill the cache for the next request, and the
+    caller gets whatever finished in time.
+    """
+
+    def __init__(self, fetch_function, deadline=FANOUT_DEADLINE, ttl=CACHE_TTL,
+                 stale_window=CACHE_STALE_WINDOW, max_entries=CACHE_MAX_ENTRIES):
+        self.fetch_function = fetch_function
+        self.deadline = deadline
+        self.ttl = ttl
+        self.stale_window = stale_window
+        self.max_entries = max_entries
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=FANOUT_WORKERS, thread_name_prefix="external-courses"
+        )
+        self._cache = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _fetch_and_store(self, key, query):
+        try:
+            results = self.fetch_function(query)
+        except Exception as e:
+            logger.error(f"Error fetching external courses for '{query}': {e}")
+            results = None
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # Failed lookups are not cached, so the next request retries them
+            if results is not None:
+                self._cache[key] = (time.time(), results)
+                self._evict()
+        return results or []
+
+    def _evict(self):
+        if len(self._cache) <= self.max_entries:
+            return
+        # Drop the oldest entries in one pass
+        excess = len(self._cache) - self.max_entries
+        for key, _ in sorted(self._cache.items(), key=lambda item: item[1][0])[:excess]:
+            del self._cache[key]
+
+    def _submit(self, key, query):
+        """Start a lookup unless one for the same query is already running (caller holds the lock)."""
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self.executor.submit(self._fetch_and_store, key, query)
+            self._in_flight[key] = future
+        return future
+
+    def fetch_many(self, queries, deadline=None):
+        """
+        Look up several queries concurrently.
+
+        Returns:
+            tuple: (results, partial) where results maps each query to its
+            list of (title, url) tuples and partial is True if any lookup
+            missed the deadline
+        """
+        deadline = self.deadline if deadline is None else deadline
+        now = time.time()
+        results = {}
+        pending = {}  # future -> queries waiting on it; spellings of one query share a lookup
+
+        with self._lock:
+            for query in queries:
+                key = normalize_query(query)
+                if not key:
+                    continue
+                entry = self._cache.get(key)
+                if entry is not None:
+                    age = now - entry[0]
+                    if age < (self.ttl if entry[1] else EMPTY_RESULT_TTL):
+                        results[query] = entry[1]
+                        continue
+                    if entry[1] and age < self.ttl + self.stale_window:
+                        results[query] = entry[1]
+                        self._submit(key, query)
+                        continue
+                pending.setdefault(self._submit(key, query), []).append(query)
+
+        if pending:
+            done, not_done = concurrent.futures.wait(pending, timeout=deadline)
+            for future in done:
+                for query in pending[future]:
+                    results[query] = future.result()
+            for future in not_done:
+                for query in pending[future]:
+                    results[query] = []
+            partial = bool(not_done)
+        else:
+            partial = False
+
+        return results, partial
+
+    def stats(self):
+        """Cache size and number of lookups in flight"""
+        with self._lock:
+            return {
+                "cached_queries": len(self._cache),
+                "in_flight": len(self._in_flight)
+            }
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.item_neighbors import NEIGHBORS_FILE, normalize_item
+from user_profiles import HISTORY_FILE, IGNORED_TOPICS, load_history
+
+# Later items within this many steps of an item count as "studied next"
+SEQUENCE_WINDOW = 3
+
+# Neighbors kept per item
+TOP_K_NEIGHBORS = 10
+
+# Pairs seen for fewer learners than this are dropped as noise
+MIN_PAIR_USERS = 1
+
+
+def user_sequence(user_history):
+    """
+    Distinct topics of one user in the order they were first studied.
+
+    Topic visits, quizzes and chats all count as studying a topic.
+    """
+    events = []
+    for entry in user_history.get('topics', []):
+        events.append((entry.get('first_used') or '', entry.get('topic')))
+    for quiz in user_history.get('quizzes', []):
+        events.append((quiz.get('timestamp') or '', quiz.get('topic')))
+    for chat in user_history.get('chats', []):
+        events.append((chat.get('timestamp') or '', chat.get('topic')))
+    events.sort(key=lambda event: event[0])
+
+    sequence = []
+    labels = {}
+    for _, topic in events:
+        key = normalize_item(topic or '')
+        if key in IGNORED_TOPICS or key.startswith('url:') or key in labels:
+            continue
+        labels[key] = str(topic).strip()
+        sequence.append(key)
+    return sequence, labels
+
+
+def build_neighbors(history, window=SEQUENCE_WINDOW, top_k=TOP_K_NEIGHBORS, min_pair_users=MIN_PAIR_USERS):
+    """
+    Build next-item and related-item neighbor lists from all users' histories.
+
+    A pair X -> Y is counted when Y follows X within `window` steps of a
+    user's sequence, weighted by 1 / gap. Pair weights are normalized by
+    sqrt(users(X) * users(Y)) so popular topics do not dominate every list.
+
+    Returns:
+        dict: items, next and related neighbor lists, ready to save
+    """
+    vocabulary = {}
+    labels = {}
+    support = []
+    sources, targets, weights = [], [], []
+
+    for user_history in history.values():
+        if not isinstance(user_history, dict):
+            continue
+        sequence, user_labels = user_sequence(user_history)
+        ids = []
+        for key in sequence:
+            if key not in vocabulary:
+                vocabulary[key] = len(vocabulary)
+                labels[key] = user_labels[key]
+                support.append(0)
+            support[vocabulary[key]] += 1
+            ids.append(vocabulary[key])
+
+        for i, source in enumerate(ids):
+            for gap in range(1, window + 1):
+                if i + gap >= len(ids):
+                    break
+                sources.append(source)
+                targets.append(ids[i + gap])
+                weights.append(1.0 / gap)
+
+    num_items = len(vocabulary)
+    keys = list(vocabulary)
+    result = {
+        "items": {key: {"label": labels[key], "users": support[vocabulary[key]]} for key in keys},
+        "next": {},
+        "related": {}
+    }
+    if not sources:
+        return result
+
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    support = np.asarray(support, dtype=np.float64)
+
+    # Sparse matrix as (source, target) -> weight, aggregated through a combined key
+    pair_keys, inverse = np.unique(sources * num_items + targets, return_inverse=True)
+    pair_weights = np.bincount(inverse, weights=weights)
+    pair_users = np.bincount(inverse)  # each user contributes a pair at most once per direction
+    pair_sources, pair_targets = pair_keys // num_items, pair_keys % num_items
+
+    keep = pair_users >= min_pair_users
+    pair_sources, pair_targets, pair_weights = pair_sources[keep], pair_targets[keep], pair_weights[keep]
+    scores = pair_weights / np.sqrt(support[pair_sources] * support[pair_targets])
+
+    result["next"] = _top_k_lists(pair_sources, pair_targets, scores, keys, top_k)
+
+    # Related ignores direction: add the transposed pairs and aggregate again
+    both_sources = np.concatenate([pair_sources, pair_targets])
+    both_targets = np.concatenate([pair_targets, pair_sources])
+    both_keys, inverse = np.unique(both_sources * num_items + both_targets, return_inverse=True)
+    both_scores = np.bincount(inverse, weights=np.concatenate([scores, scores]))
+    result["related"] = _top_k_lists(both_keys // num_items, both_keys % num_items, both_scores, keys, top_k)
+    return result
+
+
+def _top_k_lists(sources, targets, scores, keys, top_k):
+    """Group pairs by source and keep each source's top_k targets by score."""
+    order = np.lexsort((-scores, sources))
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    boundaries = np.flatnonzero(np.diff(sources)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(sources)]])
+
+    lists = {}
+    for start, end in zip(starts, ends):
+        end = min(end, start + top_k)
+        lists[keys[sources[start]]] = [
+            [keys[target], round(float(score), 4)]
+            for target, score in zip(targets[start:end], scores[start:end])
+        ]
+    return lists
+
+
+def save_neighbors(neighbors, path=NEIGHBORS_FILE):
+    """Write the neighbor lists atomically, so readers never see a half-written file"""
+    data = {"generated_at": datetime.now(timezone.utc).isoformat(), **neighbors}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build item-item neighbor lists from Quiz_Bot history")
+    parser.add_argument('--history', default=HISTORY_FILE, help="Path to Quiz_Bot's user_history.json")
+    parser.add_argument('--output', default=NEIGHBORS_FILE, help="Where to write the neighbor lists")
+    parser.add_argument('--window', type=int, default=SEQUENCE_WINDOW, help="Steps ahead that count as studied next")
+    parser.add_argument('--top-k', type=int, default=TOP_K_NEIGHBORS, help="Neighbors kept per item")
+    parser.add_argument('--min-users', type=int, default=MIN_PAIR_USERS, help="Minimum learners per pair")
+    args = parser.parse_args()
+
+    start = time.time()
+    history = load_history(args.history)
+    neighbors = build_neighbors(history, args.window, args.top_k, args.min_users)
+    save_neighbors(neighbors, args.output)
+    print(f"Wrote neighbors for {len(neighbors['items'])} items to {args.output} in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
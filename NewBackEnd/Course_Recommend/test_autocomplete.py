@@ -0,0 +1,101 @@
+import os
+import sys
+
+import pytest
+
+# Add the current directory to the path so we can import the service modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import autocomplete
+from autocomplete import AutocompleteIndex
+from course_catalog import CourseCatalog
+
+
+@pytest.fixture
+def index():
+    catalog = CourseCatalog([
+        {"title": "Introduction to Python Programming", "topics": ["python", "programming"]},
+        {"title": "Machine Learning Fundamentals", "topics": ["machine learning", "python"]},
+        {"title": "Data Science with Pandas", "topics": ["data science", "pandas"]},
+        {"title": "JavaScript for the Web", "topics": ["javascript", "web development"]},
+    ])
+    index = AutocompleteIndex()
+    index.add_catalog(catalog)
+    return index
+
+
+def texts(suggestions):
+    return [suggestion["text"] for suggestion in suggestions]
+
+
+def test_prefix_matches_rank_topics_first(index):
+    suggestions = index.suggest("py")
+    assert suggestions[0] == {"text": "python", "kind": "topic", "distance": 0}
+    assert "Introduction to Python Programming" in texts(suggestions)
+
+
+def test_later_words_are_prefixes_too(index):
+    assert "Machine Learning Fundamentals" in texts(index.suggest("learn"))
+
+
+def test_typos_are_corrected(index):
+    suggestions = index.suggest("pyhton")
+    assert suggestions[0]["text"] == "python"
+    assert suggestions[0]["distance"] == 1
+    assert "machine learning" in texts(index.suggest("machne lea"))
+
+
+def test_edit_budget_grows_with_prefix_length(index):
+    assert index.edit_budget("pyt") == 0
+    assert index.edit_budget("pyth") == 1
+    assert index.edit_budget("machine l") == 2
+    # Too short for typo tolerance
+    assert index.suggest("pzt") == []
+
+
+def test_limit(index):
+    assert len(index.suggest("p", limit=2)) == 2
+
+
+def test_query_suggested_after_repeated_submissions(index):
+    for _ in range(autocomplete.MIN_QUERY_COUNT - 1):
+        index.record_query("rust ownership")
+    assert index.suggest("rust") == []
+    index.record_query("rust ownership")
+    assert index.suggest("rust") == [{"text": "rust ownership", "kind": "query", "distance": 0}]
+
+
+def test_queries_expire_and_their_nodes_are_pruned(index, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(autocomplete.time, "time", lambda: clock[0])
+    for _ in range(autocomplete.MIN_QUERY_COUNT):
+        index.record_query("rust ownership")
+    assert texts(index.suggest("rust")) == ["rust ownership"]
+
+    clock[0] += autocomplete.QUERY_TTL + 1
+    index.record_query("python")
+    assert index.suggest("rust") == []
+    assert "r" not in index.root.children
+    assert "rust ownership" not in index.phrases
+
+
+def test_query_cap_drops_least_recent(index, monkeypatch):
+    monkeypatch.setattr(autocomplete, "MAX_QUERY_PHRASES", 2)
+    for query in ("rust ownership", "golang channels", "kotlin coroutines"):
+        for _ in range(autocomplete.MIN_QUERY_COUNT):
+            index.record_query(query)
+    assert index.suggest("rust") == []
+    assert texts(index.suggest("golang")) == ["golang channels"]
+    assert texts(index.suggest("kotlin")) == ["kotlin coroutines"]
+
+
+def test_removal_keeps_every_node_ranked(index, monkeypatch):
+    monkeypatch.setattr(autocomplete, "MAX_QUERY_PHRASES", 3)
+    for i in range(10):
+        for _ in range(autocomplete.MIN_QUERY_COUNT):
+            index.record_query(f"python project {i}")
+    stack = [index.root]
+    while stack:
+        node = stack.pop()
+        assert node.top == index._best(node)
+        stack.extend(node.children.values())
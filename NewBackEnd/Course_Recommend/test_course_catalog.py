@@ -0,0 +1,75 @@
+import heapq
+import os
+import random
+import sys
+
+import pytest
+
+# Add the current directory to the path so we can import the service modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from course_catalog import TOPIC_MATCH_BOOST, CourseCatalog, normalize_topic, tokenize
+
+WORDS = [
+    "python", "machine", "learning", "data", "science", "web", "development", "deep", "neural",
+    "networks", "statistics", "sql", "database", "cloud", "security", "design", "javascript", "react"
+]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = random.Random(7)
+    courses = []
+    # Enough courses that common terms get lookup tables, so both tail-scoring paths run
+    for i in range(1500):
+        courses.append({
+            "title": " ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))),
+            "level": rng.choice(LEVELS),
+            "topics": rng.sample(WORDS, 2)
+        })
+    return CourseCatalog(courses)
+
+
+def exhaustive_scores(catalog, interests, level=None):
+    """Score every course with no pruning."""
+    allowed = None
+    if level:
+        allowed = catalog.level_index.get(normalize_topic(level), set())
+    scores = {}
+    for interest in interests:
+        for doc_id in catalog.topic_index.get(normalize_topic(interest), ()):
+            if allowed is None or doc_id in allowed:
+                scores[doc_id] = scores.get(doc_id, 0.0) + TOPIC_MATCH_BOOST
+    terms = {term for interest in interests for term in tokenize(interest)}
+    for term in terms:
+        for impact, doc_id in catalog.postings.get(term, ()):
+            if allowed is None or doc_id in allowed:
+                scores[doc_id] = scores.get(doc_id, 0.0) + impact
+    return scores
+
+
+@pytest.mark.parametrize("interests,level,limit", [
+    (["python"], None, 3),
+    (["machine learning"], None, 10),
+    (["deep neural networks", "python"], None, 5),
+    (["data science", "sql database"], "Beginner", 8),
+    (["web development javascript react"], "Advanced", 1),
+    (["security"], None, 50),
+])
+def test_pruned_search_matches_exhaustive_bm25(catalog, interests, level, limit):
+    expected = heapq.nlargest(limit, exhaustive_scores(catalog, interests, level).values())
+    results = catalog.search_ids(interests, level=level, limit=limit)
+    assert [score for _, score in results] == pytest.approx(expected)
+    # Every returned score is the course's full score, not a partial sum
+    full = exhaustive_scores(catalog, interests, level)
+    for doc_id, score in results:
+        assert score == pytest.approx(full[doc_id])
+
+
+def test_level_filter_and_unknown_terms(catalog):
+    for course, _ in catalog.search(["python"], level="Intermediate", limit=20):
+        assert course["level"] == "Intermediate"
+    assert catalog.search(["python"], level="Expert") == []
+    assert catalog.search(["quantum basketweaving"]) == []
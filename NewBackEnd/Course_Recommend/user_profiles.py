@@ -0,0 +1,304 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from course_catalog import normalize_topic
+from course_recommender import RRF_K, CourseRecommender
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Quiz_Bot's history store, read by the batch job
+HISTORY_FILE = os.getenv(
+    "QUIZ_HISTORY_FILE",
+    os.path.join(BACKEND_ROOT, "Quiz_Bot", "user_history.json")
+)
+
+# Output of the batch job, read by the API
+PROFILE_FILE = os.getenv(
+    "USER_PROFILE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_profiles.json")
+)
+
+# Profile settings
+TOP_N_COURSES = 10
+MAX_PROFILE_TOPICS = 20
+RECENCY_HALF_LIFE_DAYS = 30
+CANDIDATES_PER_TOPIC = 20
+
+# How much a topic's weakness adds to its weight when ranking courses
+WEAKNESS_WEIGHT = 1.5
+
+# Bonus for courses at the level suggested by the user's quiz scores
+LEVEL_MATCH_BOOST = 1.2
+
+# Activity weights per history entry
+TOPIC_VISIT_WEIGHT = 1.0
+QUIZ_WEIGHT = 2.0
+CHAT_WEIGHT = 0.5
+
+# Placeholder topics Quiz_Bot records when it has no real topic
+IGNORED_TOPICS = {'', 'unknown', 'general'}
+
+# How often the API checks whether the batch job wrote a new profile file
+PROFILE_RELOAD_INTERVAL = 30
+
+
+def _topic_key(topic):
+    key = normalize_topic(topic or '')
+    if key in IGNORED_TOPICS or key.startswith('url:'):
+        return None
+    return key
+
+
+def _recency(timestamp, now):
+    """Exponential decay weight for an ISO timestamp (1.0 for activity right now)."""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return 0.5
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    age_days = max(0.0, (now - moment).total_seconds() / 86400)
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def _top(vector, limit=MAX_PROFILE_TOPICS):
+    best = sorted(vector.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return {topic: round(weight, 4) for topic, weight in best}
+
+
+def load_history(path=HISTORY_FILE):
+    """Read the Quiz_Bot history store; returns {} if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        return history if isinstance(history, dict) else {}
+    except FileNotFoundError:
+        logger.warning(f"No history file at {path}")
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading history file {path}: {e}")
+    return {}
+
+
+def build_user_vectors(user_history, now=None):
+    """
+    Build the topic-affinity and weakness vectors of one user.
+
+    Affinity sums recency-weighted activity per topic (topic visits, quizzes
+    and chats). Weakness is the share of quiz questions missed per topic,
+    shrunk towards zero for topics with few quizzes.
+
+    Returns:
+        dict: affinity, weakness, average quiz score and suggested level
+    """
+    now = now or datetime.now(timezone.utc)
+    affinity = {}
+    missed = {}
+    attempts = {}
+    scores = []
+
+    for entry in user_history.get('topics', []):
+        key = _topic_key(entry.get('topic'))
+        if key:
+            weight = TOPIC_VISIT_WEIGHT * max(1, entry.get('count', 1)) * _recency(entry.get('last_used'), now)
+            affinity[key] = affinity.get(key, 0.0) + weight
+
+    for quiz in user_history.get('quizzes', []):
+        score = quiz.get('score_percentage')
+        if isinstance(score, (int, float)):
+            scores.append(score)
+        key = _topic_key(quiz.get('topic'))
+        if not key:
+            continue
+        affinity[key] = affinity.get(key, 0.0) + QUIZ_WEIGHT * _recency(quiz.get('timestamp'), now)
+        if isinstance(score, (int, float)):
+            missed[key] = missed.get(key, 0.0) + (100.0 - score) / 100.0
+            attempts[key] = attempts.get(key, 0) + 1
+
+    for chat in user_history.get('chats', []):
+        key = _topic_key(chat.get('topic'))
+        if key:
+            affinity[key] = affinity.get(key, 0.0) + CHAT_WEIGHT * _recency(chat.get('timestamp'), now)
+
+    # Mean miss rate, scaled by n / (n + 1) so one bad quiz is not a strong signal
+    weakness = {
+        key: (missed[key] / attempts[key]) * attempts[key] / (attempts[key] + 1)
+        for key in attempts
+        if missed[key] > 0
+    }
+
+    total = sum(affinity.values())
+    if total:
+        affinity = {key: weight / total for key, weight in affinity.items()}
+
+    average_score = sum(scores) / len(scores) if scores else None
+    if average_score is None:
+        level = None
+    elif average_score < 50:
+        level = 'Beginner'
+    elif average_score < 80:
+        level = 'Intermediate'
+    else:
+        level = 'Advanced'
+
+    return {
+        "affinity": _top(affinity),
+        "weakness": _top(weakness),
+        "average_score": round(average_score, 2) if average_score is not None else None,
+        "level": level
+    }
+
+
+def rank_courses_for_profile(profile, recommender, limit=TOP_N_COURSES):
+    """
+    Rank catalog courses for a profile.
+
+    Each topic is matched with the recommender's blended keyword/semantic
+    ranking, and its scores are weighted by the topic's affinity plus its
+    weakness, so courses on weak topics rank higher.
+
+    Returns:
+        list: (doc_id, score) tuples, best first
+    """
+    weights = dict(profile['affinity'])
+    for topic, weakness in profile['weakness'].items():
+        weights[topic] = weights.get(topic, 0.0) + WEAKNESS_WEIGHT * weakness
+
+    scores = {}
+    for topic, weight in weights.items():
+        for doc_id, score in recommender.rank_ids([topic], limit=CANDIDATES_PER_TOPIC):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * score
+
+    level = normalize_topic(profile['level']) if profile.get('level') else None
+    if level:
+        for doc_id in scores:
+            if normalize_topic(recommender.courses[doc_id]['level']) == level:
+                scores[doc_id] *= LEVEL_MATCH_BOOST
+
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def build_profiles(history, recommender, top_n=TOP_N_COURSES):
+    """Build every user's profile and precomputed course list."""
+    now = datetime.now(timezone.utc)
+    profiles = {}
+    for user_id, user_history in history.items():
+        if not isinstance(user_history, dict):
+            continue
+        profile = build_user_vectors(user_history, now)
+        ranked = rank_courses_for_profile(profile, recommender, top_n)
+        # Courses are stored whole, so a lookup needs no catalog access
+        profile["recommendations"] = [recommender.courses[doc_id] for doc_id, _ in ranked]
+        profiles[user_id] = profile
+    return profiles
+
+
+def save_profiles(profiles, path=PROFILE_FILE):
+    """Write the profiles atomically, so the API never reads a half-written file"""
+    data = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "users": profiles
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def blend_with_profile(profile, courses, level=None, limit=3):
+    """
+    Merge request-time recommendations with a user's precomputed courses.
+
+    Both lists are combined with reciprocal rank fusion, so courses that match
+    the current interests and the user's history come first. With no
+    request-time courses this is just the precomputed list.
+
+    Returns:
+        list: Courses, best first
+    """
+    level = normalize_topic(level) if level else None
+    precomputed = [
+        course for course in profile.get('recommendations', [])
+        if level is None or normalize_topic(course['level']) == level
+    ]
+
+    fused = {}
+    by_title = {}
+    for ranking in (courses, precomputed):
+        for rank, course in enumerate(ranking):
+            key = course['title'].lower()
+            by_title.setdefault(key, course)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    best = sorted(fused, key=lambda key: -fused[key])[:limit]
+    return [by_title[key] for key in best]
+
+
+class UserProfileStore:
+    """
+    Read-only view of the precomputed profiles for the API.
+
+    The file is re-read when the batch job replaces it; the check runs at most
+    every PROFILE_RELOAD_INTERVAL seconds, so lookups stay a dict access.
+    """
+
+    def __init__(self, path=PROFILE_FILE):
+        self.path = path
+        self.users = {}
+        self.generated_at = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.users = data.get('users', {})
+            self.generated_at = data.get('generated_at')
+            self._mtime = mtime
+            logger.info(f"Loaded {len(self.users)} user profiles from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading user profiles {self.path}: {e}")
+
+    def get(self, user_id):
+        """Return the precomputed profile of a user, or None"""
+        now = time.time()
+        if now - self._checked_at >= PROFILE_RELOAD_INTERVAL:
+            with self._lock:
+                if now - self._checked_at >= PROFILE_RELOAD_INTERVAL:
+                    self._checked_at = now
+                    self._reload()
+        return self.users.get(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-user course recommendation profiles from Quiz_Bot history")
+    parser.add_argument('--history', default=HISTORY_FILE, help="Path to Quiz_Bot's user_history.json")
+    parser.add_argument('--output', default=PROFILE_FILE, help="Where to write the profiles")
+    parser.add_argument('--top-n', type=int, default=TOP_N_COURSES, help="Courses to precompute per user")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.time()
+    history = load_history(args.history)
+    profiles = build_profiles(history, CourseRecommender(), args.top_n)
+    save_profiles(profiles, args.output)
+    logger.info(f"Wrote {len(profiles)} user profiles to {args.output} in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import sys
 import tempfile
 from werkzeug.utils import secure_filename
 import logging
@@ -10,15 +11,25 @@ import ollama
 import PyPDF2
 from docx import Document
 import re
-import requests
-from bs4 import BeautifulSoup
 import json
+import threading
 import time
 from urllib.parse import urlparse, urljoin
-import concurrent.futures
 from datetime import datetime, timezone
 import uuid
 
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.admission import AdmissionController, AdmissionRejected
+from common.responses import too_busy_response
+from common.content_extractor import EXTRACTOR_VERSION, extract_content
+from common.model_router import ModelRouter
+from common.model_warmup import OLLAMA_KEEP_ALIVE, ModelWarmup
+from common.page_cache import PageCache
+from common.scrape_pool import ScrapePool
+from common.static_payload import StaticPayload
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +56,9 @@ class UserHistoryManager:
     def __init__(self):
         self.history_file = USER_HISTORY_FILE
         self.history = self.load_history()
+        # Request threads share the history; every change and every save holds the lock,
+        # so a save never serializes a list another thread is appending to
+        self._lock = threading.RLock()
     
     def load_history(self) -> Dict[str, Any]:
         """Load user history from file"""
@@ -60,173 +74,212 @@ class UserHistoryManager:
     
     def save_history(self):
         """Save user history to file"""
+        tmp_file = None
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                # Write to a temp file first so a failed dump never truncates the history
+                with tempfile.NamedTemporaryFile(
+                    'w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(self.history_file)),
+                    prefix=os.path.basename(self.history_file), suffix='.tmp', delete=False
+                ) as f:
+                    tmp_file = f.name
+                    json.dump(self.history, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_file, self.history_file)
         except Exception as e:
             logger.error(f"Error saving history: {str(e)}")
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
     
     def get_user_history(self, user_id: str) -> Dict[str, Any]:
         """Get history for a specific user"""
-        if user_id not in self.history:
-            self.history[user_id] = {
-                'quizzes': [],
-                'chats': [],
-                'topics': [],
-                'created_at': datetime.now(timezone.utc).isoformat(),
-                'last_activity': datetime.now(timezone.utc).isoformat()
-            }
-        return self.history[user_id]
+        with self._lock:
+            if user_id not in self.history:
+                self.history[user_id] = {
+                    'quizzes': [],
+                    'chats': [],
+                    'topics': [],
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'last_activity': datetime.now(timezone.utc).isoformat()
+                }
+            return self.history[user_id]
     
     def add_quiz_history(self, user_id: str, quiz_data: Dict[str, Any]):
         """Add quiz to user history"""
-        user_history = self.get_user_history(user_id)
-        
-        quiz_entry = {
-            'id': str(uuid.uuid4()),
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'topic': quiz_data.get('topic', 'Unknown'),
-            'source_type': quiz_data.get('source_type', 'topic'),
-            'num_questions': quiz_data.get('num_questions', 0),
-            'score': quiz_data.get('score', 0),
-            'total_questions': quiz_data.get('total_questions', 0),
-            'score_percentage': quiz_data.get('score_percentage', 0),
-            'ollama_used': quiz_data.get('ollama_used', False),
-            'questions': quiz_data.get('questions', []),
-            'results': quiz_data.get('results', []),
-            'input_content': quiz_data.get('input_content', ''),
-            'filename': quiz_data.get('filename', ''),
-            'url': quiz_data.get('url', '')
-        }
-        
-        user_history['quizzes'].append(quiz_entry)
-        user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
-        
-        # Keep only last 50 quizzes
-        if len(user_history['quizzes']) > 50:
-            user_history['quizzes'] = user_history['quizzes'][-50:]
-        
-        self.save_history()
-        logger.info(f"Added quiz history for user {user_id}")
+        with self._lock:
+            user_history = self.get_user_history(user_id)
+            
+            quiz_entry = {
+                'id': str(uuid.uuid4()),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'topic': quiz_data.get('topic', 'Unknown'),
+                'source_type': quiz_data.get('source_type', 'topic'),
+                'num_questions': quiz_data.get('num_questions', 0),
+                'score': quiz_data.get('score', 0),
+                'total_questions': quiz_data.get('total_questions', 0),
+                'score_percentage': quiz_data.get('score_percentage', 0),
+                'ollama_used': quiz_data.get('ollama_used', False),
+                'questions': quiz_data.get('questions', []),
+                'results': quiz_data.get('results', []),
+                'input_content': quiz_data.get('input_content', ''),
+                'filename': quiz_data.get('filename', ''),
+                'url': quiz_data.get('url', '')
+            }
+            
+            user_history['quizzes'].append(quiz_entry)
+            user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
+            
+            # Keep only last 50 quizzes
+            if len(user_history['quizzes']) > 50:
+                user_history['quizzes'] = user_history['quizzes'][-50:]
+            
+            self.save_history()
+            logger.info(f"Added quiz history for user {user_id}")
     
     def add_chat_history(self, user_id: str, chat_data: Dict[str, Any]):
         """Add chat interaction to user history"""
-        user_history = self.get_user_history(user_id)
-        
-        chat_entry = {
-            'id': str(uuid.uuid4()),
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'message': chat_data.get('message', ''),
-            'response': chat_data.get('response', ''),
-            'topic': chat_data.get('topic', ''),
-            'type': chat_data.get('type', 'general')
-        }
-        
-        user_history['chats'].append(chat_entry)
-        user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
-        
-        # Keep only last 100 chats
-        if len(user_history['chats']) > 100:
-            user_history['chats'] = user_history['chats'][-100:]
-        
-        self.save_history()
-        logger.info(f"Added chat history for user {user_id}")
+        with self._lock:
+            user_history = self.get_user_history(user_id)
+            
+            chat_entry = {
+                'id': str(uuid.uuid4()),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'message': chat_data.get('message', ''),
+                'response': chat_data.get('response', ''),
+                'topic': chat_data.get('topic', ''),
+                'type': chat_data.get('type', 'general')
+            }
+            
+            user_history['chats'].append(chat_entry)
+            user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
+            
+            # Keep only last 100 chats
+            if len(user_history['chats']) > 100:
+                user_history['chats'] = user_history['chats'][-100:]
+            
+            self.save_history()
+            logger.info(f"Added chat history for user {user_id}")
     
     def add_topic_history(self, user_id: str, topic: str, source_type: str = 'topic'):
         """Add topic to user history"""
-        user_history = self.get_user_history(user_id)
-        
-        # Check if topic already exists
-        existing_topics = [t for t in user_history['topics'] if t['topic'].lower() == topic.lower()]
-        
-        if existing_topics:
-            # Update existing topic
-            existing_topics[0]['count'] += 1
-            existing_topics[0]['last_used'] = datetime.now(timezone.utc).isoformat()
-            existing_topics[0]['source_types'].add(source_type)
-        else:
-            # Add new topic
-            topic_entry = {
-                'id': str(uuid.uuid4()),
-                'topic': topic,
-                'count': 1,
-                'first_used': datetime.now(timezone.utc).isoformat(),
-                'last_used': datetime.now(timezone.utc).isoformat(),
-                'source_types': {source_type}
-            }
-            user_history['topics'].append(topic_entry)
-        
-        user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
-        
-        # Keep only last 100 topics
-        if len(user_history['topics']) > 100:
-            user_history['topics'] = sorted(
-                user_history['topics'], 
-                key=lambda x: x['last_used'], 
-                reverse=True
-            )[:100]
-        
-        self.save_history()
-        logger.info(f"Added topic history for user {user_id}: {topic}")
+        with self._lock:
+            user_history = self.get_user_history(user_id)
+            
+            # Check if topic already exists
+            existing_topics = [t for t in user_history['topics'] if t['topic'].lower() == topic.lower()]
+            
+            if existing_topics:
+                # Update existing topic
+                existing_topics[0]['count'] += 1
+                existing_topics[0]['last_used'] = datetime.now(timezone.utc).isoformat()
+                if source_type not in existing_topics[0]['source_types']:
+                    existing_topics[0]['source_types'].append(source_type)
+            else:
+                # Add new topic
+                topic_entry = {
+                    'id': str(uuid.uuid4()),
+                    'topic': topic,
+                    'count': 1,
+                    'first_used': datetime.now(timezone.utc).isoformat(),
+                    'last_used': datetime.now(timezone.utc).isoformat(),
+                    'source_types': [source_type]  # a list, so the history stays JSON-serializable
+                }
+                user_history['topics'].append(topic_entry)
+            
+            user_history['last_activity'] = datetime.now(timezone.utc).isoformat()
+            
+            # Keep only last 100 topics
+            if len(user_history['topics']) > 100:
+                user_history['topics'] = sorted(
+                    user_history['topics'], 
+                    key=lambda x: x['last_used'], 
+                    reverse=True
+                )[:100]
+            
+            self.save_history()
+            logger.info(f"Added topic history for user {user_id}: {topic}")
     
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """Get user statistics"""
-        user_history = self.get_user_history(user_id)
-        
-        total_quizzes = len(user_history['quizzes'])
-        total_chats = len(user_history['chats'])
-        total_topics = len(user_history['topics'])
-        
-        # Calculate average quiz score
-        quiz_scores = [q['score_percentage'] for q in user_history['quizzes'] if q.get('score_percentage')]
-        avg_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
-        
-        # Get most used topics
-        sorted_topics = sorted(user_history['topics'], key=lambda x: x['count'], reverse=True)
-        top_topics = sorted_topics[:5] if sorted_topics else []
-        
-        # Get recent activity
-        recent_quizzes = sorted(user_history['quizzes'], key=lambda x: x['timestamp'], reverse=True)[:5]
-        recent_chats = sorted(user_history['chats'], key=lambda x: x['timestamp'], reverse=True)[:5]
-        
-        return {
-            'total_quizzes': total_quizzes,
-            'total_chats': total_chats,
-            'total_topics': total_topics,
-            'average_score': round(avg_score, 2),
-            'top_topics': top_topics,
-            'recent_quizzes': recent_quizzes,
-            'recent_chats': recent_chats,
-            'created_at': user_history.get('created_at'),
-            'last_activity': user_history.get('last_activity')
-        }
+        with self._lock:
+            user_history = self.get_user_history(user_id)
+            
+            total_quizzes = len(user_history['quizzes'])
+            total_chats = len(user_history['chats'])
+            total_topics = len(user_history['topics'])
+            
+            # Calculate average quiz score
+            quiz_scores = [q['score_percentage'] for q in user_history['quizzes'] if q.get('score_percentage')]
+            avg_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
+            
+            # Get most used topics
+            sorted_topics = sorted(user_history['topics'], key=lambda x: x['count'], reverse=True)
+            top_topics = sorted_topics[:5] if sorted_topics else []
+            
+            # Get recent activity
+            recent_quizzes = sorted(user_history['quizzes'], key=lambda x: x['timestamp'], reverse=True)[:5]
+            recent_chats = sorted(user_history['chats'], key=lambda x: x['timestamp'], reverse=True)[:5]
+            
+            return {
+                'total_quizzes': total_quizzes,
+                'total_chats': total_chats,
+                'total_topics': total_topics,
+                'average_score': round(avg_score, 2),
+                'top_topics': top_topics,
+                'recent_quizzes': recent_quizzes,
+                'recent_chats': recent_chats,
+                'created_at': user_history.get('created_at'),
+                'last_activity': user_history.get('last_activity')
+            }
     
     def clear_user_history(self, user_id: str, history_type: str = 'all'):
         """Clear user history"""
-        if user_id in self.history:
-            if history_type == 'all':
-                del self.history[user_id]
-            elif history_type == 'quizzes':
-                self.history[user_id]['quizzes'] = []
-            elif history_type == 'chats':
-                self.history[user_id]['chats'] = []
-            elif history_type == 'topics':
-                self.history[user_id]['topics'] = []
-            
-            self.save_history()
-            logger.info(f"Cleared {history_type} history for user {user_id}")
+        with self._lock:
+            if user_id in self.history:
+                if history_type == 'all':
+                    del self.history[user_id]
+                elif history_type == 'quizzes':
+                    self.history[user_id]['quizzes'] = []
+                elif history_type == 'chats':
+                    self.history[user_id]['chats'] = []
+                elif history_type == 'topics':
+                    self.history[user_id]['topics'] = []
+            
+                self.save_history()
+                logger.info(f"Cleared {history_type} history for user {user_id}")
 
 # Initialize history manager
 history_manager = UserHistoryManager()
 
+# Long-lived workers and keep-alive connections shared by every scrape
+scrape_pool = ScrapePool()
+
+# Scraped pages and their extracted text, revalidated with conditional GETs once stale
+page_cache = PageCache(scrape_pool.get)
+
+# Overall wait for the pages gathered as topic context
+TOPIC_CONTEXT_TIMEOUT = 10
+
+# Model calls queue with the other services' ones; quiz generation yields to interactive chat
+admission = AdmissionController()
+
+# Quiz generation prefers llama3 for quality; topic extraction is short and routed for speed.
+# Each request goes to the preferred model that is installed, healthy and within its latency target (seconds).
+QUIZ_MODELS = ["llama3:latest", "mistral:latest"]
+QUIZ_LATENCY_SLO = float(os.getenv("QUIZ_LATENCY_SLO", "60"))
+TOPIC_LATENCY_SLO = float(os.getenv("TOPIC_LATENCY_SLO", "5"))
+model_router = ModelRouter({
+    "quiz": {"models": QUIZ_MODELS, "slo": QUIZ_LATENCY_SLO},
+    "topic": {"models": QUIZ_MODELS, "slo": TOPIC_LATENCY_SLO}
+})
+
+# Loads the quiz model at startup so the first quiz does not pay for it; /health waits for it
+model_warmup = ModelWarmup(model_router, admission)
+
 class WebScraper:
     """Web scraping utility for gathering content from URLs"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, cache: PageCache = page_cache):
+        self.cache = cache
     
     def scrape_url(self, url: str) -> Dict[str, Any]:
         """Scrape content from a URL"""
@@ -236,45 +289,14 @@ class WebScraper:
             if not parsed_url.scheme or not parsed_url.netloc:
                 raise ValueError("Invalid URL format")
             
-            # Fetch the page
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract text content
-            text_content = soup.get_text()
-            
-            # Clean up text
-            lines = (line.strip() for line in text_content.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text_content = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Extract title
-            title = soup.find('title')
-            title_text = title.get_text() if title else "No title found"
-            
-            # Extract main content areas
-            main_content = ""
-            for tag in soup.find_all(['article', 'main', 'section', 'div']):
-                if tag.get('class') and any('content' in cls.lower() for cls in tag.get('class')):
-                    main_content += tag.get_text() + " "
-            
-            if not main_content.strip():
-                # Fallback to paragraphs
-                paragraphs = soup.find_all('p')
-                main_content = ' '.join([p.get_text() for p in paragraphs])
+            # Fetch the page, or reuse the cached page and extracted text
+            page = self.cache.fetch(url, f"quiz:{EXTRACTOR_VERSION}", self._extract_page, timeout=10)
             
             return {
                 'url': url,
-                'title': title_text,
-                'content': text_content[:5000],  # Limit content length
-                'main_content': main_content[:3000],
+                'title': page['title'],
+                'content': page['content'],
+                'main_content': page['main_content'],
                 'success': True
             }
             
@@ -289,11 +311,18 @@ class WebScraper:
                 'error': str(e)
             }
 
+    def _extract_page(self, html: str, url: str) -> Dict[str, str]:
+        """Extract the title, full text and main content of a page"""
+        page = extract_content(html, max_chars=3000, max_text_chars=5000)
+        
+        return {
+            'title': page['title'] or "No title found",
+            'content': page['text'],
+            'main_content': page['content']
+        }
+
 class OllamaQuizGenerator:
     def __init__(self):
-        # Use only llama3:latest for best performance
-        self.model_name = "llama3:latest"  # Best model for quiz generation
-        
         # Performance optimizations
         self.max_content_length = 6000  # Optimized for faster processing
         self.timeout = 30  # 30 second timeout
@@ -301,7 +330,7 @@ class OllamaQuizGenerator:
         
         self.web_scraper = WebScraper()
         
-        # Fallback questions for when llama3:latest is not available
+        # Fallback questions for when no quiz model is available
         self.fallback_questions = {
             'react': [
                 {
@@ -445,22 +474,21 @@ class OllamaQuizGenerator:
             ]
         }
         
-        # Initialize Ollama connection - only use llama3:latest
-        try:
-            models = ollama.list()
-            available_models = [model.get('name') for model in models.get('models', [])]
-            
-            if self.model_name in available_models:
-                logger.info(f"✅ Using llama3:latest for quiz generation")
-                self.ollama_available = True
-            else:
-                logger.warning(f"❌ llama3:latest not found. Available models: {available_models}")
-                logger.warning("⚠️ Quiz generation will use fallback questions only")
-                self.ollama_available = False
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize Ollama: {str(e)}")
-            self.ollama_available = False
+        # Find the installed models now and keep rechecking them in the background
+        if model_router.refresh() is None:
+            logger.error("Failed to initialize Ollama: it cannot be reached")
+        elif model_router.is_available("quiz"):
+            logger.info(f"✅ Using {model_router.choose('quiz')} for quiz generation")
+        else:
+            logger.warning(f"❌ None of {QUIZ_MODELS} found. Available models: {sorted(model_router.available)}")
+            logger.warning("⚠️ Quiz generation will use fallback questions until one is installed")
+        model_router.start()
+        model_warmup.start()
+
+    @property
+    def ollama_available(self) -> bool:
+        """Whether Ollama is reachable with a quiz model installed, as of the last check."""
+        return model_router.is_available("quiz")
 
     def read_file_content(self, filepath: str) -> str:
         """Read content from different file types."""
@@ -493,10 +521,10 @@ class OllamaQuizGenerator:
         """Generate questions using Ollama AI with optimized performance."""
         try:
             if not self.ollama_available:
-                logger.warning(f"❌ llama3:latest not available, using fallback questions for topic: {topic}")
+                logger.warning(f"❌ No quiz model available, using fallback questions for topic: {topic}")
                 return self.get_fallback_questions(topic, num_questions, question_types)
             
-            logger.info(f"🚀 Generating {num_questions} questions for topic: {topic} using llama3:latest")
+            logger.info(f"🚀 Generating {num_questions} questions for topic: {topic} using Ollama")
             logger.info(f"📝 Content preview: {content[:200]}...")
             
             # Optimize content length for faster processing
@@ -533,19 +561,22 @@ Format as JSON array:
 
 Return ONLY the JSON array, no additional text."""
 
-            logger.info(f"📤 Sending prompt to llama3:latest for topic: {topic}")
+            logger.info(f"📤 Sending prompt for topic: {topic}")
             logger.info(f"📊 Content length: {len(optimized_content)} characters")
             
             # Generate questions using Ollama with optimized timeout
-            response = ollama.chat(
-                model=self.model_name, 
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'timeout': self.timeout}
-            )
+            model = model_router.choose("quiz")
+            with admission.slot("quiz"), model_router.track(model, "quiz"):
+                response = ollama.chat(
+                    model=model, 
+                    messages=[{'role': 'user', 'content': prompt}],
+                    options={'timeout': self.timeout},
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
             
             # Parse the response
             response_text = response['message']['content']
-            logger.info(f"📥 Received response from llama3:latest for topic: {topic}")
+            logger.info(f"📥 Received response from {model} for topic: {topic}")
             
             # Try to extract JSON from the response
             try:
@@ -555,7 +586,7 @@ Return ONLY the JSON array, no additional text."""
                 
                 if json_start != -1 and json_end != 0:
                     json_str = response_text[json_start:json_end]
-                    logger.info(f"✅ Extracted JSON from llama3:latest response for topic: {topic}")
+                    logger.info(f"✅ Extracted JSON from {model} response for topic: {topic}")
                     
                     questions = json.loads(json_str)  # Using json.loads for safety
                     
@@ -581,17 +612,19 @@ Return ONLY the JSON array, no additional text."""
                         logger.warning(f"⚠️ Generated only {len(validated_questions)} questions for topic: {topic}, using fallback")
                         return self.get_fallback_questions(topic, num_questions, question_types)
                 else:
-                    logger.warning(f"❌ No valid JSON found in llama3:latest response for topic: {topic}, using fallback")
+                    logger.warning(f"❌ No valid JSON found in {model} response for topic: {topic}, using fallback")
                     logger.debug(f"Response text: {response_text[:500]}...")
                     return self.get_fallback_questions(topic, num_questions, question_types)
                     
             except Exception as e:
-                logger.error(f"❌ Error parsing llama3:latest response for topic {topic}: {str(e)}")
+                logger.error(f"❌ Error parsing {model} response for topic {topic}: {str(e)}")
                 logger.debug(f"Response text: {response_text[:500]}...")
                 return self.get_fallback_questions(topic, num_questions, question_types)
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            logger.error(f"❌ Error generating questions with llama3:latest for topic {topic}: {str(e)}")
+            logger.error(f"❌ Error generating questions with Ollama for topic {topic}: {str(e)}")
             return self.get_fallback_questions(topic, num_questions, question_types)
 
     def validate_question(self, question: Dict[str, Any]) -> bool:
@@ -848,14 +881,17 @@ FOCUS: All questions must be about {topic} specifically."""
 
         try:
             # Generate questions using the topic-specific prompt
-            response = ollama.chat(
-                model=self.model_name, 
-                messages=[{'role': 'user', 'content': topic_prompt}],
-                options={'timeout': self.timeout}
-            )
+            model = model_router.choose("quiz")
+            with admission.slot("quiz"), model_router.track(model, "quiz"):
+                response = ollama.chat(
+                    model=model, 
+                    messages=[{'role': 'user', 'content': topic_prompt}],
+                    options={'timeout': self.timeout},
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
             
             response_text = response['message']['content']
-            logger.info(f"📥 Received response from llama3:latest for topic: {topic}")
+            logger.info(f"📥 Received response from {model} for topic: {topic}")
             
             # Try to extract JSON from the response
             try:
@@ -865,7 +901,7 @@ FOCUS: All questions must be about {topic} specifically."""
                 
                 if json_start != -1 and json_end != 0:
                     json_str = response_text[json_start:json_end]
-                    logger.info(f"✅ Extracted JSON from llama3:latest response for topic: {topic}")
+                    logger.info(f"✅ Extracted JSON from {model} response for topic: {topic}")
                     
                     questions = json.loads(json_str)
                     
@@ -891,15 +927,17 @@ FOCUS: All questions must be about {topic} specifically."""
                         logger.warning(f"⚠️ Generated only {len(validated_questions)} questions for topic: {topic}, using fallback")
                         return self.get_fallback_questions(topic, num_questions, question_types)
                 else:
-                    logger.warning(f"❌ No valid JSON found in llama3:latest response for topic: {topic}, using fallback")
+                    logger.warning(f"❌ No valid JSON found in {model} response for topic: {topic}, using fallback")
                     return self.get_fallback_questions(topic, num_questions, question_types)
                     
             except Exception as e:
-                logger.error(f"❌ Error parsing llama3:latest response for topic {topic}: {str(e)}")
+                logger.error(f"❌ Error parsing {model} response for topic {topic}: {str(e)}")
                 return self.get_fallback_questions(topic, num_questions, question_types)
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            logger.error(f"❌ Error generating questions with llama3:latest for topic {topic}: {str(e)}")
+            logger.error(f"❌ Error generating questions with Ollama for topic {topic}: {str(e)}")
             return self.get_fallback_questions(topic, num_questions, question_types)
 
     def is_question_about_topic(self, question: Dict[str, Any], topic: str) -> bool:
@@ -955,6 +993,8 @@ FOCUS: All questions must be about {topic} specifically."""
             # Use the improved question generation method
             return self.generate_questions_with_ollama(content, topic, num_questions, question_types)
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error generating quiz from file: {str(e)}")
             return self.get_fallback_questions("general", num_questions, question_types)
@@ -982,6 +1022,8 @@ FOCUS: All questions must be about {topic} specifically."""
             
             return self.generate_questions_with_ollama(content, topic, num_questions, question_types)
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error generating quiz from URL: {str(e)}")
             return self.get_fallback_questions("general", num_questions, question_types)
@@ -998,17 +1040,14 @@ FOCUS: All questions must be about {topic} specifically."""
             
             context_parts = []
             
-            # Try to get content from multiple sources
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                future_to_url = {executor.submit(self.web_scraper.scrape_url, url): url for url in search_urls}
-                
-                for future in concurrent.futures.as_completed(future_to_url, timeout=10):
-                    try:
-                        scraped_data = future.result()
-                        if scraped_data['success'] and scraped_data['main_content']:
-                            context_parts.append(scraped_data['main_content'][:1000])
-                    except Exception as e:
-                        logger.warning(f"Failed to gather context from URL: {str(e)}")
+            # Try to get content from multiple sources; use whatever finished in time
+            results, missed = scrape_pool.fetch_all(self.web_scraper.scrape_url, search_urls, TOPIC_CONTEXT_TIMEOUT)
+            if missed:
+                logger.warning(f"{missed} context sources for '{topic}' missed the {TOPIC_CONTEXT_TIMEOUT}s timeout")
+            
+            for scraped_data in results:
+                if scraped_data['success'] and scraped_data['main_content']:
+                    context_parts.append(scraped_data['main_content'][:1000])
             
             if context_parts:
                 return f"Additional context about {topic}: {' '.join(context_parts)}"
@@ -1079,12 +1118,14 @@ Content: {content[:1000]}
 
 Topic:"""
                 
-                response = ollama.chat(model=self.model_name, messages=[
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ])
+                model = model_router.choose("topic")
+                with admission.slot("quiz"), model_router.track(model, "topic"):
+                    response = ollama.chat(model=model, messages=[
+                        {
+                            'role': 'user',
+                            'content': prompt
+                        }
+                    ], keep_alive=OLLAMA_KEEP_ALIVE)
                 
                 topic = response['message']['content'].strip()
                 if topic and len(topic) < 50:  # Reasonable topic length
@@ -1094,7 +1135,7 @@ Topic:"""
                     return 'General Knowledge'
                     
             except Exception as e:
-                logger.error(f"Error extracting topic with llama3:latest: {str(e)}")
+                logger.error(f"Error extracting topic with Ollama: {str(e)}")
                 return 'General Knowledge'
                 
         except Exception as e:
@@ -1104,22 +1145,43 @@ Topic:"""
 # Initialize quiz generator
 quiz_generator = OllamaQuizGenerator()
 
+def build_supported_types():
+    """Build the supported types payload from the current configuration"""
+    return {
+        "supported_file_types": sorted(ALLOWED_EXTENSIONS),
+        "supported_question_types": ["mcq", "fill_blank", "true_false"],
+        "supported_source_types": ["topic", "text", "file", "url"],
+        "max_file_size_mb": app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024),
+        "ollama_available": quiz_generator.ollama_available
+    }
+
+# Serialized once at startup and again whenever the installed models change
+supported_types_payload = StaticPayload(build_supported_types(), max_age=60)
+model_router.on_change = lambda: supported_types_payload.update(build_supported_types())
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; answers 503 until the quiz model is warmed up so no traffic reaches a cold instance"""
+    ready = model_warmup.ready
     return jsonify({
-        "status": "healthy",
+        "status": "healthy" if ready else "warming_up",
         "service": "quiz-generator",
-        "message": "Quiz Generator API is running",
-        "model": "llama3:latest",
+        "message": "Quiz Generator API is running" if ready else "Quiz Generator API is warming up the model",
+        "ready": ready,
+        "model": model_router.choose("quiz"),
         "ollama_available": quiz_generator.ollama_available,
         "features": ["topic_generation", "text_generation", "file_generation", "url_generation", "web_scraping"],
         "optimizations": {
             "max_content_length": quiz_generator.max_content_length,
             "timeout": quiz_generator.timeout,
             "batch_size": quiz_generator.batch_size
-        }
-    })
+        },
+        "scrape_pool": scrape_pool.stats(),
+        "page_cache": page_cache.stats(),
+        "admission": admission.stats(),
+        "model_router": model_router.stats(),
+        "warmup": model_warmup.stats()
+    }), 200 if ready else 503
 
 @app.route('/api/generate', methods=['POST'])
 def generate_quiz():
@@ -1184,6 +1246,8 @@ def generate_quiz():
         
         return jsonify(response_data)
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         logger.error(f"Error generating quiz: {str(e)}")
         return jsonify({"error": f"Failed to generate quiz: {str(e)}"}), 500
@@ -1248,6 +1312,8 @@ def generate_quiz_from_file():
                 os.remove(filepath)
                 logger.info(f"🗑️ Cleaned up temporary file: {filepath}")
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         logger.error(f"Error generating quiz from file: {str(e)}")
         return jsonify({"error": f"Failed to generate quiz from file: {str(e)}"}), 500
@@ -1280,6 +1346,8 @@ def generate_quiz_from_topic_get(topic):
         
         return jsonify(response_data)
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         logger.error(f"Error generating quiz from topic: {str(e)}")
         return jsonify({"error": f"Failed to generate quiz: {str(e)}"}), 500
@@ -1384,13 +1452,7 @@ def validate_quiz():
 @app.route('/api/supported-types', methods=['GET'])
 def get_supported_types():
     """Get supported file types and question types"""
-    return jsonify({
-        "supported_file_types": list(ALLOWED_EXTENSIONS),
-        "supported_question_types": ["mcq", "fill_blank", "true_false"],
-        "supported_source_types": ["topic", "text", "file", "url"],
-        "max_file_size_mb": app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024),
-        "ollama_available": quiz_generator.ollama_available
-    })
+    return supported_types_payload.respond()
 
 @app.route('/api/history/<user_id>', methods=['GET'])
 def get_user_history(user_id):
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Content Extraction Benchmark
+Compares common/content_extractor.py with the BeautifulSoup html.parser extraction
+the teacher chatbot and Quiz_Bot used before, on a local corpus of saved pages.
+
+Usage:
+    python benchmark_content_extraction.py --corpus saved_pages/
+    python benchmark_content_extraction.py --synthetic 20 --depth 40
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from common.content_extractor import extract_content
+
+MAX_CONTENT_LENGTH = 6000
+
+
+def bs4_teacher_extract(html):
+    """The previous TeacherChatbot.scrape_content parsing path (non-Wikipedia branch)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header']):
+        element.decompose()
+    main_elements = soup.find_all(['article', 'main', 'div'], class_=re.compile(r'content|article|main|body'))
+    if main_elements:
+        main_element = max(main_elements, key=lambda x: len(x.get_text()))
+        paragraphs = main_element.find_all('p')
+    else:
+        paragraphs = soup.find_all('p')
+    content = ' '.join([p.get_text().strip() for p in paragraphs])
+    return re.sub(r'\s+', ' ', content).strip()[:MAX_CONTENT_LENGTH]
+
+
+def bs4_quiz_extract(html):
+    """The previous Quiz_Bot WebScraper.scrape_url parsing path."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    soup.get_text()
+    main_content = ""
+    for tag in soup.find_all(['article', 'main', 'section', 'div']):
+        if tag.get('class') and any('content' in cls.lower() for cls in tag.get('class')):
+            main_content += tag.get_text() + " "
+    return main_content[:3000]
+
+
+def lxml_extract(html):
+    return extract_content(html, max_chars=MAX_CONTENT_LENGTH)['content']
+
+
+def synthetic_page(index, depth, paragraphs=40):
+    """A page with deeply nested wrappers around the article, like many CMS templates."""
+    words = "photosynthesis converts light energy into chemical energy stored in glucose molecules".split()
+    body = []
+    for i in range(paragraphs):
+        sentence = ' '.join(words[(i + j) % len(words)] for j in range(30))
+        body.append(f"<p>{sentence} <a href='/wiki/{i}'>link {i}</a>.</p>")
+    article = f"<div class='article-content'><h1>Page {index}</h1>{''.join(body)}</div>"
+    for level in range(depth):
+        article = f"<div class='wrapper level-{level} main-body'>{article}<span>meta</span></div>"
+    navigation = ''.join(f"<li><a href='/n{i}'>Menu entry {i}</a></li>" for i in range(50))
+    return (
+        f"<html><head><title>Synthetic {index}</title><script>var x = 1;</script></head><body>"
+        f"<header><nav><ul>{navigation}</ul></nav></header>{article}"
+        f"<div class='comments'><p>A reader comment that is long enough to count as a block.</p></div>"
+        f"<footer><p>Footer text</p></footer></body></html>"
+    )
+
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '**', '*.htm*'), recursive=True)):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.relpath(path, directory), f.read()))
+    return pages
+
+
+def time_extractor(extract, pages, repeat):
+    """Median seconds per page for each page, plus the last output."""
+    timings, outputs = [], []
+    for _, html in pages:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = extract(html)
+            samples.append(time.perf_counter() - start)
+        timings.append(statistics.median(samples))
+        outputs.append(output)
+    return timings, outputs
+
+
+def overlap(a, b):
+    """Word-set Jaccard similarity of two extracted texts"""
+    words_a, words_b = set(a.lower().split()), set(b.lower().split())
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lxml content extraction against BeautifulSoup")
+    parser.add_argument('--corpus', help="Directory of saved .html pages")
+    parser.add_argument('--synthetic', type=int, default=20, help="Generated pages to use when no corpus is given")
+    parser.add_argument('--depth', type=int, default=40, help="Wrapper nesting depth of generated pages")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per page; the median is reported")
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+        if not pages:
+            print(f"No .html files found in {args.corpus}")
+            return
+    else:
+        pages = [(f"synthetic-{i}", synthetic_page(i, args.depth)) for i in range(args.synthetic)]
+
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"Corpus: {len(pages)} pages, {total_bytes / 1024:.0f} KB")
+
+    lxml_times, lxml_outputs = time_extractor(lxml_extract, pages, args.repeat)
+    print("\nExtractor                 total ms   median ms   max ms   speedup   overlap")
+    print("-" * 78)
+    print(f"{'lxml single pass':24}{sum(lxml_times) * 1000:10.1f}{statistics.median(lxml_times) * 1000:12.2f}"
+          f"{max(lxml_times) * 1000:9.1f}{'1.0x':>10}{'-':>10}")
+    for name, extract in (("bs4 teacher path", bs4_teacher_extract), ("bs4 quiz path", bs4_quiz_extract)):
+        times, outputs = time_extractor(extract, pages, args.repeat)
+        similarity = statistics.mean(overlap(a, b) for a, b in zip(lxml_outputs, outputs))
+        print(f"{name:24}{sum(times) * 1000:10.1f}{statistics.median(times) * 1000:12.2f}"
+              f"{max(times) * 1000:9.1f}{sum(times) / sum(lxml_times):9.1f}x{similarity:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
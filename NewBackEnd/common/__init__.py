@@ -0,0 +1,5 @@
+# This file makes the common directory a Python package 
+
+"""
+Shared helpers used by all backend services.
+"""
@@ -0,0 +1,325 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# One ticket table shared by every service that calls the local Ollama
+ADMISSION_DB_PATH = os.getenv(
+    "ADMISSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission.sqlite3")
+)
+
+# Model requests in flight at once across all services; match Ollama's OLLAMA_NUM_PARALLEL
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", "2"))
+
+# Slots the lower classes leave free for chat; none when Ollama runs one request at a time
+CHAT_RESERVED_SLOTS = 1 if OLLAMA_CONCURRENCY > 1 else 0
+
+# Lower priority numbers go first. `limit` caps a class's requests in flight, `headroom` is how
+# many slots it must leave free for higher classes, `queue_budget` is how long a request may wait
+# (seconds) and `max_queue` how many may wait before new ones are turned away. A class is admitted
+# only while fewer than capacity - headroom requests are in flight, so limits stay within that.
+# A roadmap's parallel level expansion runs under a single roadmap ticket.
+PRIORITY_CLASSES = {
+    "interactive": {"priority": 0, "limit": OLLAMA_CONCURRENCY, "headroom": 0,
+                    "queue_budget": 10.0, "max_queue": 32},
+    "quiz": {"priority": 1, "limit": max(1, OLLAMA_CONCURRENCY - CHAT_RESERVED_SLOTS), "headroom": CHAT_RESERVED_SLOTS,
+             "queue_budget": 30.0, "max_queue": 16},
+    "roadmap": {"priority": 2, "limit": 1, "headroom": CHAT_RESERVED_SLOTS, "queue_budget": 60.0, "max_queue": 16},
+    "prewarm": {"priority": 3, "limit": 1, "headroom": CHAT_RESERVED_SLOTS, "queue_budget": 0.0, "max_queue": 1}
+}
+
+POLL_INTERVAL = 0.05
+# Tickets of processes that died: queued ones stop polling, active ones stop being renewed.
+# A held slot is renewed every HEARTBEAT_INTERVAL, however long it is held (e.g. across a stream)
+QUEUED_LEASE = 5
+ACTIVE_LEASE = 60
+HEARTBEAT_INTERVAL = 10
+
+# Recent samples kept for the wait percentiles and the Retry-After estimate
+LATENCY_WINDOW = 500
+DEFAULT_HOLD_SECONDS = 10.0
+MAX_RETRY_AFTER = 120
+
+
+class AdmissionRejected(Exception):
+    """A model request was turned away because its class is saturated."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Too many {name} requests right now. Please try again in {retry_after} seconds.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+
+class AdmissionController:
+    """
+    Priority admission control for model requests, shared across services.
+
+    Every model call takes a slot with `with admission.slot("quiz"): ...`.
+    Waiting and running requests are tickets in a SQLite table that all
+    services on the machine share, so a burst of quiz generation in one
+    process cannot starve interactive chat in another. A waiting request is
+    admitted when its class is under its limit, enough slots stay free for
+    higher classes, and no better-ranked waiter could go instead. Requests
+    that would wait longer than their class's queue budget, or find its
+    queue full, raise AdmissionRejected with a Retry-After estimate.
+
+    Admitted tickets are renewed by a heartbeat thread while they are held,
+    so the slot of a process that died is freed after ACTIVE_LEASE seconds.
+    If the ticket table cannot be used, requests are admitted without control.
+    """
+
+    def __init__(self, path=ADMISSION_DB_PATH, capacity=OLLAMA_CONCURRENCY, classes=PRIORITY_CLASSES):
+        self.path = path
+        self.capacity = capacity
+        self.classes = classes
+        self._local = threading.local()
+        self._released = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._counters = {name: Counter() for name in classes}
+        self._waits = {name: deque(maxlen=LATENCY_WINDOW) for name in classes}
+        self._holds = {name: deque(maxlen=LATENCY_WINDOW) for name in classes}
+        self._held = set()  # admitted ticket ids of this process, renewed by the heartbeat
+        self._heartbeat = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tickets ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, class TEXT NOT NULL, priority INTEGER NOT NULL, "
+                    "state TEXT NOT NULL, created_at REAL NOT NULL, heartbeat REAL NOT NULL)"
+                )
+        except (OSError, sqlite3.Error):
+            pass
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Transactions are managed explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def slot(self, name):
+        """Hold a model slot of class `name` for the duration of the block."""
+        ticket = self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name, ticket)
+
+    def acquire(self, name):
+        """
+        Wait for a slot of class `name`.
+
+        Returns:
+            tuple: (ticket id or None when uncontrolled, time admitted)
+
+        Raises:
+            AdmissionRejected: the queue is full or the wait would exceed the class's budget
+        """
+        settings = self.classes[name]
+        start = time.time()
+        try:
+            conn = self._connection()
+            ticket = self._enqueue(conn, name, settings, start)
+            while True:
+                now = time.time()
+                if self._try_admit(conn, ticket, now):
+                    self._record(name, "admitted", wait=now - start)
+                    self._hold(ticket)
+                    return ticket, now
+                if now - start >= settings["queue_budget"]:
+                    conn.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+                    raise self._reject(name)
+                with self._released:
+                    self._released.wait(POLL_INTERVAL)
+        except sqlite3.Error:
+            self._record(name, "uncontrolled")
+            return None, time.time()
+
+    def _enqueue(self, conn, name, settings, now):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            queued, ahead = conn.execute(
+                "SELECT SUM(class = ?), SUM(priority <= ?) FROM tickets WHERE state = 'queued'",
+                (name, settings["priority"])
+            ).fetchone()
+            # Turn the request away now if the queue is full or the wait would outlast the budget
+            expected_wait = (ahead or 0) * self._hold_seconds(name) / settings["limit"]
+            if (queued or 0) >= settings["max_queue"] or (ahead and expected_wait > settings["queue_budget"]):
+                conn.execute("COMMIT")
+                raise self._reject(name, ahead or 0)
+            ticket = conn.execute(
+                "INSERT INTO tickets (class, priority, state, created_at, heartbeat) VALUES (?, ?, 'queued', ?, ?)",
+                (name, settings["priority"], now, now)
+            ).lastrowid
+            conn.execute("COMMIT")
+            return ticket
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _try_admit(self, conn, ticket, now):
+        """Admit the ticket if it is the best-ranked waiter that has room; otherwise renew its heartbeat."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            rows = conn.execute("SELECT id, class, state FROM tickets ORDER BY priority, id").fetchall()
+            active = Counter(name for _, name, state in rows if state == 'active')
+            total = sum(active.values())
+            admit = False
+            for row_id, name, state in rows:
+                if state == 'queued' and name in self.classes and self._has_room(name, active, total):
+                    admit = row_id == ticket
+                    break
+            conn.execute(
+                "UPDATE tickets SET state = ?, heartbeat = ? WHERE id = ?",
+                ('active' if admit else 'queued', now, ticket)
+            )
+            conn.execute("COMMIT")
+            return admit
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _has_room(self, name, active, total):
+        settings = self.classes[name]
+        return active[name] < settings["limit"] and total + settings["headroom"] < self.capacity
+
+    @staticmethod
+    def _expire(conn, now):
+        conn.execute(
+            "DELETE FROM tickets WHERE (state = 'queued' AND heartbeat < ?) OR (state = 'active' AND heartbeat < ?)",
+            (now - QUEUED_LEASE, now - ACTIVE_LEASE)
+        )
+
+    def _hold(self, ticket):
+        with self._stats_lock:
+            self._held.add(ticket)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_loop, name="admission-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self._stats_lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                self._connection().execute(
+                    f"UPDATE tickets SET heartbeat = ? WHERE state = 'active' AND id IN ({','.join('?' * len(held))})",
+                    [time.time()] + held
+                )
+            except sqlite3.Error:
+                pass
+
+    def release(self, name, ticket):
+        ticket_id, admitted_at = ticket
+        self._record(name, None, hold=time.time() - admitted_at)
+        if ticket_id is not None:
+            with self._stats_lock:
+                self._held.discard(ticket_id)
+            try:
+                self._connection().execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+            except sqlite3.Error:
+                pass
+        with self._released:
+            self._released.notify_all()
+
+    def _hold_seconds(self, name):
+        holds = self._holds[name]
+        return sum(holds) / len(holds) if holds else DEFAULT_HOLD_SECONDS
+
+    def _reject(self, name, ahead=0):
+        """Count a rejection and estimate when a retry would be admitted."""
+        limit = self.classes[name]["limit"]
+        retry_after = min(MAX_RETRY_AFTER, max(1, math.ceil(self._hold_seconds(name) * (ahead + 1) / limit)))
+        self._record(name, "rejected")
+        return AdmissionRejected(name, retry_after)
+
+    def _record(self, name, event, wait=None, hold=None):
+        with self._stats_lock:
+            if event:
+                self._counters[name][event] += 1
+            if wait is not None:
+                self._waits[name].append(wait)
+            if hold is not None:
+                self._holds[name].append(hold)
+
+    def saturated(self, name):
+        """
+        Retry-After seconds if a request of class `name` would be turned away right now, else None.
+
+        Lets streaming endpoints answer 429 before their response starts.
+        """
+        settings = self.classes[name]
+        try:
+            queued, ahead = self._connection().execute(
+                "SELECT SUM(class = ?), SUM(priority <= ?) FROM tickets WHERE state = 'queued' AND heartbeat >= ?",
+                (name, settings["priority"], time.time() - QUEUED_LEASE)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        expected_wait = (ahead or 0) * self._hold_seconds(name) / settings["limit"]
+        if (queued or 0) >= settings["max_queue"] or (ahead and expected_wait > settings["queue_budget"]):
+            return self._reject(name, ahead or 0).retry_after
+        return None
+
+    def stats(self):
+        """Queue depth and requests in flight per class across all services, with this process's counters"""
+        now = time.time()
+        try:
+            rows = self._connection().execute(
+                "SELECT class, state, COUNT(*) FROM tickets "
+                "WHERE (state = 'queued' AND heartbeat >= ?) OR (state = 'active' AND heartbeat >= ?) "
+                "GROUP BY class, state",
+                (now - QUEUED_LEASE, now - ACTIVE_LEASE)
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        depths = {(name, state): count for name, state, count in rows}
+
+        with self._stats_lock:
+            classes = {
+                name: {
+                    "queued": depths.get((name, 'queued'), 0),
+                    "active": depths.get((name, 'active'), 0),
+                    "limit": settings["limit"],
+                    "queue_budget": settings["queue_budget"],
+                    "admitted": self._counters[name]["admitted"],
+                    "rejected": self._counters[name]["rejected"],
+                    "uncontrolled": self._counters[name]["uncontrolled"],
+                    "wait_ms": {
+                        "p50": _percentile(self._waits[name], 0.5),
+                        "p95": _percentile(self._waits[name], 0.95)
+                    },
+                    "hold_ms": {
+                        "p50": _percentile(self._holds[name], 0.5),
+                        "p95": _percentile(self._holds[name], 0.95)
+                    }
+                }
+                for name, settings in self.classes.items()
+            }
+        return {
+            "capacity": self.capacity,
+            "classes": classes
+        }
@@ -0,0 +1,196 @@
+import re
+
+from lxml import etree
+
+# Bump when the extraction rules change, so cached results of the old rules are not reused
+EXTRACTOR_VERSION = 1
+
+# Only this much of a page is parsed; main content is almost always near the top
+MAX_HTML_CHARS = 1_000_000
+FEED_CHUNK_SIZE = 65536
+
+# Subtrees that never hold main content
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'nav', 'footer', 'header', 'aside', 'form', 'svg', 'iframe', 'select'}
+
+# Elements whose text is captured as one block (nested blocks are part of the outer one)
+BLOCK_TAGS = {'p', 'li', 'pre', 'blockquote', 'dd', 'dt', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'td', 'th', 'figcaption'}
+
+# Elements that can be chosen as the main content container
+CONTAINER_TAGS = {'div', 'article', 'main', 'section', 'body'}
+
+# Blocks shorter than this are usually captions, buttons or menu entries
+MIN_BLOCK_CHARS = 25
+
+POSITIVE_HINTS = re.compile(r'content|article|main|body|text|entry|post|story', re.I)
+NEGATIVE_HINTS = re.compile(r'comment|sidebar|side-bar|nav|menu|footer|header|banner|promo|related|share|social|advert|cookie', re.I)
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class _Container:
+    __slots__ = ('element', 'first_block', 'score')
+
+    def __init__(self, element, first_block):
+        self.element = element
+        self.first_block = first_block
+        self.score = 0.0
+
+
+def _class_weight(element):
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    if element.tag in ('article', 'main'):
+        hints += ' article'
+    weight = 1.0
+    if POSITIVE_HINTS.search(hints):
+        weight *= 1.25
+    if NEGATIVE_HINTS.search(hints):
+        weight *= 0.5
+    return weight
+
+
+def extract_content(html, max_chars=6000, max_text_chars=20000, max_html_chars=MAX_HTML_CHARS):
+    """
+    Extract the title, main content and readable text of an HTML page in a single pass.
+
+    The page is fed to lxml's pull parser in chunks and read as start/end
+    events. Text blocks (paragraphs, list items, headings, ...) are captured
+    when they close, with their share of link text. Each block credits its
+    nearest container (div, article, ...) fully and the next one up by half,
+    weighted by how little of it is links, so the container holding the most
+    dense prose wins, as in readability. Nothing is scanned twice: a
+    container's blocks are a contiguous range of the block list, and parsed
+    subtrees are cleared as they close. Parsing stops at `max_html_chars`.
+
+    Returns:
+        dict: title, content (main container text, at most max_chars),
+              text (all block text, at most max_text_chars) and
+              truncated (whether content was cut at max_chars)
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'), recover=True, remove_comments=True)
+
+    title = ""
+    blocks = []  # (text, link chars)
+    containers = []  # open containers, innermost last
+    best = (0.0, 0, 0)  # (score, first block, end block)
+    skip_depth = 0
+    block_depth = 0
+    link_chars = 0
+
+    html = html[:max_html_chars]
+    for start in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[start:start + FEED_CHUNK_SIZE])
+        for event, element in parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if event == 'start':
+                if tag in SKIP_TAGS:
+                    skip_depth += 1
+                elif skip_depth:
+                    continue
+                elif tag in BLOCK_TAGS:
+                    if block_depth == 0:
+                        link_chars = 0
+                    block_depth += 1
+                elif tag in CONTAINER_TAGS and block_depth == 0:
+                    containers.append(_Container(element, len(blocks)))
+                continue
+
+            # end event
+            if tag in SKIP_TAGS:
+                skip_depth -= 1
+                element.clear(keep_tail=True)
+                continue
+            if skip_depth:
+                continue
+
+            if tag == 'title' and not title:
+                title = WHITESPACE.sub(' ', ''.join(element.itertext())).strip()
+            elif tag == 'a' and block_depth:
+                link_chars += len(''.join(element.itertext()).strip())
+            elif tag in BLOCK_TAGS:
+                block_depth -= 1
+                if block_depth == 0:
+                    text = WHITESPACE.sub(' ', ''.join(element.itertext())).strip()
+                    if text:
+                        blocks.append((text, link_chars))
+                        _credit(containers, text, link_chars)
+                    element.clear(keep_tail=True)
+            elif tag in CONTAINER_TAGS and block_depth == 0 and containers and containers[-1].element is element:
+                container = containers.pop()
+                loose, loose_links = _loose_text(element)
+                if loose:
+                    blocks.append((loose, loose_links))
+                    container.score += _block_score(loose, loose_links)
+                score = container.score * _class_weight(element)
+                if score > best[0]:
+                    best = (score, container.first_block, len(blocks))
+                element.clear(keep_tail=True)
+        if start + FEED_CHUNK_SIZE >= max_html_chars:
+            break
+
+    # Containers left open because the input was cut off still compete
+    while containers:
+        container = containers.pop()
+        score = container.score * _class_weight(container.element)
+        if score > best[0]:
+            best = (score, container.first_block, len(blocks))
+    try:
+        parser.close()
+    except etree.LxmlError:
+        pass
+
+    score, first, end = best
+    if not score:
+        # Only short blocks: nothing to choose between, keep them all
+        first, end = 0, len(blocks)
+    main_blocks = [text for text, links in blocks[first:end] if links * 2 < len(text)]
+    content = ' '.join(main_blocks)
+    truncated = len(content) > max_chars
+    text = ' '.join(text for text, _ in blocks)
+
+    return {
+        "title": title,
+        "content": content[:max_chars],
+        "text": text[:max_text_chars],
+        "truncated": truncated
+    }
+
+
+def _block_score(text, link_chars):
+    length = len(text)
+    if length < MIN_BLOCK_CHARS:
+        return 0.0
+    return length * (1.0 - min(link_chars / length, 1.0))
+
+
+def _credit(containers, text, link_chars):
+    """Credit a block to its nearest container fully and the next one up by half."""
+    score = _block_score(text, link_chars)
+    if not score or not containers:
+        return
+    containers[-1].score += score
+    if len(containers) > 1:
+        containers[-2].score += score / 2
+
+
+def _loose_text(element):
+    """
+    Text of a container that is not in any block.
+
+    Blocks and nested containers are already cleared, so what is left is the
+    container's own text, inline children and tails.
+
+    Returns:
+        tuple: (text, link chars)
+    """
+    parts = [element.text or '']
+    link_chars = 0
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in SKIP_TAGS:
+            inline = ''.join(child.itertext())
+            if child.tag == 'a':
+                link_chars += len(inline.strip())
+            parts.append(inline)
+        parts.append(child.tail or '')
+    return WHITESPACE.sub(' ', ' '.join(parts)).strip(), link_chars
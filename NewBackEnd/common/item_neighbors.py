@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Written by Course_Recommend/item_cooccurrence.py, read by every service that suggests next topics
+NEIGHBORS_FILE = os.getenv(
+    "ITEM_NEIGHBORS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "item_neighbors.json")
+)
+
+# How often a reader checks whether the batch job wrote a new file
+RELOAD_INTERVAL = 60
+
+
+def normalize_item(name):
+    """Normalize a topic name so history entries and queries share one key."""
+    return re.sub(r'\s+', ' ', str(name)).strip().lower()
+
+
+class ItemNeighbors:
+    """
+    Precomputed item-item neighbor lists ("learners who studied X next studied Y").
+
+    Lookups are dict accesses. The file is re-read when the batch job replaces
+    it; the check runs at most every RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self, path=NEIGHBORS_FILE):
+        self.path = path
+        self.items = {}
+        self.next = {}
+        self.related = {}
+        self.generated_at = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.items = data.get('items', {})
+            self.next = data.get('next', {})
+            self.related = data.get('related', {})
+            self.generated_at = data.get('generated_at')
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading item neighbors {self.path}: {e}")
+
+    def _maybe_reload(self):
+        now = time.time()
+        if now - self._checked_at >= RELOAD_INTERVAL:
+            with self._lock:
+                if now - self._checked_at >= RELOAD_INTERVAL:
+                    self._checked_at = now
+                    self._reload()
+
+    def _lookup(self, table, item, limit):
+        self._maybe_reload()
+        return [
+            {"item": self.items.get(neighbor, {}).get('label', neighbor), "score": score}
+            for neighbor, score in table.get(normalize_item(item), [])[:limit]
+        ]
+
+    def next_items(self, item, limit=10):
+        """Items learners most often studied after this one"""
+        return self._lookup(self.next, item, limit)
+
+    def related_items(self, item, limit=10):
+        """Items most often studied together with this one, in either order"""
+        return self._lookup(self.related, item, limit)
+
+    def __contains__(self, item):
+        self._maybe_reload()
+        return normalize_item(item) in self.items
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import requests
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+if not OLLAMA_HOST.startswith(("http://", "https://")):
+    OLLAMA_HOST = f"http://{OLLAMA_HOST}"
+
+# How often the installed models are listed again
+MODEL_CHECK_INTERVAL = int(os.getenv("MODEL_CHECK_INTERVAL", "60"))
+
+# Weight of the newest sample in the latency and error rate averages
+EWMA_WEIGHT = 0.2
+# Models failing more often than this are skipped while another candidate is healthy
+MAX_ERROR_RATE = 0.5
+
+
+def list_ollama_models(timeout=2):
+    """Names of the models installed in Ollama, or None if it cannot be reached."""
+    try:
+        response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        return {model.get("name") for model in response.json().get("models", [])}
+    except (requests.RequestException, ValueError):
+        return None
+
+
+class ModelRouter:
+    """
+    Picks the model for each request from live availability, latency and error rates.
+
+    `tasks` maps a task type to its candidate models, most preferred first,
+    and its latency target in seconds, e.g. {"chat": {"models": [...], "slo": 20}}.
+    choose() returns the most preferred candidate that is installed, not
+    failing, and whose recent latency on that task meets the target; if none
+    meets it, the fastest healthy candidate. A model without samples counts
+    as meeting the target, so it gets tried. Calls are measured with
+    track(); installed models are listed again every `check_interval`
+    seconds once start() is called, which also lets failing models recover.
+
+    Set `on_change` to a callable to be told when the installed models change.
+    """
+
+    def __init__(self, tasks, list_models=list_ollama_models, check_interval=MODEL_CHECK_INTERVAL):
+        self.tasks = tasks
+        self.check_interval = check_interval
+        self.on_change = None
+        self._list_models = list_models
+        self._lock = threading.Lock()
+        self._thread = None
+        self.available = None  # installed model names; None until listed or while Ollama is unreachable
+        self.checked_at = None
+        self._latency = {}  # (model, task) -> seconds
+        self._errors = {}  # model -> error rate
+        self._requests = Counter()
+        self._failures = Counter()
+
+    def refresh(self):
+        """List the installed models now; returns them, or None if Ollama cannot be reached."""
+        models = self._list_models()
+        with self._lock:
+            changed = models != self.available
+            self.available = models
+            self.checked_at = time.time()
+            # Give models that failed earlier another chance
+            for model in self._errors:
+                self._errors[model] *= 0.5
+        if changed and self.on_change is not None:
+            self.on_change()
+        return models
+
+    def start(self):
+        """Recheck the installed models every check_interval seconds in a daemon thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._check_loop, name="model-router", daemon=True)
+        self._thread.start()
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.refresh()
+
+    def _installed(self, model):
+        # Unknown availability counts as installed, so requests still reach Ollama
+        return self.available is None or model in self.available or f"{model}:latest" in self.available
+
+    def is_available(self, task):
+        """Whether Ollama is reachable and has at least one model for this task."""
+        with self._lock:
+            return self.available is not None and any(self._installed(model) for model in self.tasks[task]["models"])
+
+    def candidates(self, task):
+        """Models for a task in the order they should be tried, the routed choice first."""
+        settings = self.tasks[task]
+        with self._lock:
+            installed = [model for model in settings["models"] if self._installed(model)] or list(settings["models"])
+            healthy = [model for model in installed if self._errors.get(model, 0.0) <= MAX_ERROR_RATE] or installed
+            meeting = [model for model in healthy if self._latency.get((model, task), 0.0) <= settings["slo"]]
+            if meeting:
+                choice = meeting[0]
+            else:
+                choice = min(healthy, key=lambda model: self._latency[(model, task)])
+        return [choice] + [model for model in installed if model != choice]
+
+    def choose(self, task):
+        """The model to use for a request of this task type."""
+        return self.candidates(task)[0]
+
+    def record(self, model, task, seconds, ok=True):
+        key = (model, task)
+        with self._lock:
+            self._requests[key] += 1
+            if ok:
+                previous = self._latency.get(key)
+                self._latency[key] = seconds if previous is None else previous + EWMA_WEIGHT * (seconds - previous)
+            else:
+                self._failures[key] += 1
+            error_rate = self._errors.get(model, 0.0)
+            self._errors[model] = error_rate + EWMA_WEIGHT * ((0.0 if ok else 1.0) - error_rate)
+
+    @contextmanager
+    def track(self, model, task):
+        """Measure a model call; an exception counts as a failure and is re-raised."""
+        start = time.time()
+        try:
+            yield
+        except GeneratorExit:
+            # A stream closed early by its consumer says nothing about the model
+            raise
+        except Exception:
+            self.record(model, task, time.time() - start, ok=False)
+            raise
+        self.record(model, task, time.time() - start)
+
+    def stats(self):
+        """Routed model per task with each candidate's latency, error rate and request counts"""
+        choices = {task: self.choose(task) for task in self.tasks}
+        with self._lock:
+            tasks = {}
+            for task, settings in self.tasks.items():
+                tasks[task] = {
+                    "model": choices[task],
+                    "slo_seconds": settings["slo"],
+                    "candidates": {
+                        model: {
+                            "installed": self.available is not None and self._installed(model),
+                            "latency_ms": round(self._latency[(model, task)] * 1000, 1) if (model, task) in self._latency else None,
+                            "error_rate": round(self._errors.get(model, 0.0), 3),
+                            "requests": self._requests[(model, task)],
+                            "failures": self._failures[(model, task)]
+                        }
+                        for model in settings["models"]
+                    }
+                }
+            return {
+                "ollama_reachable": self.available is not None,
+                "installed_models": sorted(self.available) if self.available is not None else [],
+                "checked_at": self.checked_at,
+                "tasks": tasks
+            }
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+
+import requests
+
+from common.admission import AdmissionRejected
+from common.model_router import OLLAMA_HOST
+
+
+def _keep_alive(value):
+    # Ollama takes a duration ("30m") or seconds; a negative number keeps the model loaded indefinitely
+    for number in (int, float):
+        try:
+            return number(value)
+        except ValueError:
+            pass
+    return value
+
+
+# How long Ollama keeps a model loaded after its last request; sent with every model request.
+# By default models stay loaded until Ollama restarts, so no request pays a cold load
+OLLAMA_KEEP_ALIVE = _keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "-1"))
+
+# A cold load takes 10+ seconds; a warm-up request taking longer than this counts as failed
+WARMUP_TIMEOUT = 120
+# Wait (seconds) before retrying models that could not be loaded yet, e.g. while Ollama is down or busy,
+# and before checking for models the router can newly use
+WARMUP_RETRY_INTERVAL = 5
+
+
+def load_model(model, timeout=WARMUP_TIMEOUT):
+    """Load a model into Ollama with a one-token generation and keep it resident for OLLAMA_KEEP_ALIVE."""
+    response = requests.post(f"{OLLAMA_HOST}/api/generate", json={
+        "model": model,
+        "prompt": "Hi",
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"num_predict": 1}
+    }, timeout=timeout)
+    response.raise_for_status()
+
+
+class ModelWarmup:
+    """
+    Loads a service's routed models into Ollama in the background at startup.
+
+    start() warms every installed model the router may use for any task
+    (fallbacks included, since a routing change or a failing model sends
+    requests to them), taking slots of the lowest-priority "prewarm"
+    admission class so real requests are never held up. Models that cannot
+    be loaded yet (Ollama down, queue busy) are retried every
+    `retry_interval` seconds, and models installed later are warmed when
+    the router sees them. `ready` turns true once every model is loaded;
+    until then the service reports warming_up.
+    """
+
+    def __init__(self, router, admission, load=load_model, retry_interval=WARMUP_RETRY_INTERVAL):
+        self.router = router
+        self.admission = admission
+        self.retry_interval = retry_interval
+        self._load = load
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._models = {}  # model -> state, attempts, load time and last error
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        """Warm the models in a daemon thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the service is ready; returns whether it is."""
+        return self._ready.wait(timeout)
+
+    def _targets(self):
+        # Every candidate of every task, routed choices first; recomputed so newly installed models are picked up
+        models = []
+        for task in self.router.tasks:
+            for model in self.router.candidates(task):
+                if model not in models:
+                    models.append(model)
+        return models
+
+    def _run(self):
+        while True:
+            if self.router.available is None:
+                # Ollama was not listed yet or was down; find out what is installed before choosing
+                self.router.refresh()
+            pending = [model for model in self._targets() if self._state(model) != "ready"]
+            for model in pending:
+                self.warm(model)
+            if not self._ready.is_set() and all(self._state(model) == "ready" for model in pending):
+                with self._lock:
+                    self.finished_at = time.time()
+                self._ready.set()
+            time.sleep(self.retry_interval)
+
+    def _state(self, model):
+        with self._lock:
+            return self._models.get(model, {}).get("state")
+
+    def warm(self, model):
+        """Load one model now; returns whether it is loaded."""
+        with self._lock:
+            entry = self._models.setdefault(model, {"state": "pending", "attempts": 0, "load_ms": None, "error": None})
+            entry["state"] = "loading"
+            entry["attempts"] += 1
+        try:
+            with self.admission.slot("prewarm"):
+                start = time.time()
+                self._load(model)
+        except AdmissionRejected:
+            # Real requests are running and load the model themselves; try again later
+            state, error = "pending", "busy"
+        except (requests.RequestException, ValueError) as e:
+            state, error = "failed", str(e)
+        else:
+            state, error = "ready", None
+        with self._lock:
+            entry["state"] = state
+            entry["error"] = error
+            if state == "ready":
+                entry["load_ms"] = round((time.time() - start) * 1000, 1)
+        return state == "ready"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self._ready.is_set(),
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "models": {model: dict(entry) for model, entry in self._models.items()}
+            }
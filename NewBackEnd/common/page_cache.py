@@ -0,0 +1,227 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+# One cache file shared by every service that scrapes pages
+PAGE_CACHE_PATH = os.getenv(
+    "PAGE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "page_cache.sqlite3")
+)
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# How long a page is used without revalidation when the server sends no max-age
+DEFAULT_FRESHNESS = 6 * 3600
+MAX_FRESHNESS = 7 * 24 * 3600
+
+MAX_AGE_PATTERN = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+def _freshness(headers, default=DEFAULT_FRESHNESS):
+    """Seconds a response may be reused without revalidation, or None if it must not be stored."""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    match = MAX_AGE_PATTERN.search(cache_control)
+    if match:
+        return min(int(match.group(1)), MAX_FRESHNESS)
+    return default
+
+
+class PageCache:
+    """
+    Disk cache of fetched web pages and the text extracted from them.
+
+    Each page is stored with its compressed body, its ETag/Last-Modified
+    validators and the output of every extractor that has parsed it. While a
+    page is fresh (Cache-Control max-age, else `fresh_for` seconds) it is
+    served without a request; once stale it is revalidated with a
+    conditional GET and a 304 keeps the stored copy. Extracted results are
+    reused as long as the body is unchanged, so a hit never re-parses HTML.
+
+    Storage is a SQLite file in WAL mode, bounded by `max_bytes` with least
+    recently used pages evicted first.
+    """
+
+    def __init__(self, get, path=PAGE_CACHE_PATH, max_bytes=PAGE_CACHE_MAX_BYTES, fresh_for=DEFAULT_FRESHNESS):
+        self._get = get
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+        self.stale_served = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, body BLOB NOT NULL, encoding TEXT, etag TEXT, last_modified TEXT, "
+                "extracted TEXT NOT NULL, size INTEGER NOT NULL, fresh_until REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def fetch(self, url, name, extract, **kwargs):
+        """
+        Return extract(html, url) for a page, fetching or revalidating it only when needed.
+
+        A stale copy is served when revalidation fails.
+
+        Args:
+            url: Page to fetch
+            name: Extractor name; results of different extractors are stored separately
+            extract: Callable(html, url) returning a JSON-serializable result
+            **kwargs: Passed to the GET function (e.g. timeout)
+
+        Raises:
+            requests.RequestException: The fetch failed and no copy was stored
+        """
+        now = time.time()
+        try:
+            row = self._connection().execute(
+                "SELECT body, encoding, etag, last_modified, extracted, fresh_until FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+
+        if row is not None and row[5] > now:
+            with self._lock:
+                self.hits += 1
+            return self._extracted(url, name, extract, row, now)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if row is not None:
+            if row[2]:
+                headers['If-None-Match'] = row[2]
+            if row[3]:
+                headers['If-Modified-Since'] = row[3]
+
+        try:
+            response = self._get(url, headers=headers, **kwargs)
+            if response.status_code != 304 or row is None:
+                response.raise_for_status()
+        except Exception:
+            if row is None:
+                raise
+            # Serve the stale copy rather than nothing while the site is unreachable
+            with self._lock:
+                self.stale_served += 1
+            return self._extracted(url, name, extract, row, now)
+
+        if response.status_code == 304:
+            with self._lock:
+                self.revalidated += 1
+            freshness = _freshness(response.headers, self.fresh_for)
+            self._execute(
+                "UPDATE pages SET fresh_until = ?, accessed_at = ? WHERE url = ?",
+                (now + (freshness or 0), now, url)
+            )
+            return self._extracted(url, name, extract, row, now)
+
+        with self._lock:
+            self.fetched += 1
+        html = response.text
+        result = extract(html, url)
+
+        freshness = _freshness(response.headers, self.fresh_for)
+        if freshness is not None:
+            body = zlib.compress(response.content)
+            extracted = json.dumps({name: result}, ensure_ascii=False)
+            self._store(
+                url, body, response.encoding, response.headers.get('ETag'),
+                response.headers.get('Last-Modified'), extracted, now + freshness, now
+            )
+        return result
+
+    def _extracted(self, url, name, extract, row, now):
+        """Stored extractor output, or run the extractor on the stored body once and keep it."""
+        body, encoding, _, _, extracted_json, _ = row
+        extracted = json.loads(extracted_json)
+        if name in extracted:
+            self._execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+            return extracted[name]
+
+        html = zlib.decompress(body).decode(encoding or 'utf-8', errors='replace')
+        result = extract(html, url)
+        extracted[name] = result
+        extracted_json = json.dumps(extracted, ensure_ascii=False)
+        self._execute(
+            "UPDATE pages SET extracted = ?, size = ?, accessed_at = ? WHERE url = ?",
+            (extracted_json, len(body) + len(extracted_json.encode('utf-8')), now, url)
+        )
+        return result
+
+    def _execute(self, sql, params):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(sql, params)
+        except sqlite3.Error:
+            pass
+
+    def _store(self, url, body, encoding, etag, last_modified, extracted, fresh_until, now):
+        size = len(body) + len(extracted.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages "
+                    "(url, body, encoding, etag, last_modified, extracted, size, fresh_until, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, body, encoding, etag, last_modified, extracted, size, fresh_until, now)
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+                if total > self.max_bytes:
+                    # Drop least recently used pages until the cache fits again
+                    stale = []
+                    for old_url, old_size in conn.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+                        if total <= self.max_bytes:
+                            break
+                        stale.append((old_url,))
+                        total -= old_size
+                    conn.executemany("DELETE FROM pages WHERE url = ?", stale)
+                    with self._lock:
+                        self.evictions += len(stale)
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Hit, revalidation and fetch counters plus current size"""
+        try:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.fetched
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "fetched": self.fetched,
+                "stale_served": self.stale_served,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,12 @@
+from flask import jsonify
+
+
+def too_busy_response(error):
+    """429 response for an AdmissionRejected error, with Retry-After set."""
+    response = jsonify({
+        "error": str(error),
+        "retry_after": error.retry_after
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
@@ -0,0 +1,174 @@
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Worker threads shared by every scrape of a service
+SCRAPE_POOL_WORKERS = int(os.getenv("SCRAPE_POOL_WORKERS", "8"))
+
+# Requests in flight to one host at a time; also the keep-alive connections kept per host
+PER_HOST_LIMIT = int(os.getenv("SCRAPE_PER_HOST_LIMIT", "2"))
+
+# Hosts whose connection pools are kept open
+MAX_HOSTS = 32
+
+# Recent samples kept for the latency percentiles
+LATENCY_WINDOW = 500
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def build_session(user_agent=USER_AGENT, per_host_limit=PER_HOST_LIMIT, max_hosts=MAX_HOSTS):
+    """
+    A requests session that keeps connections open per host.
+
+    Reused connections skip the DNS lookup and the TCP/TLS handshake.
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': user_agent})
+    adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=per_host_limit)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+
+class ScrapePool:
+    """
+    Long-lived, bounded pool for fetching web pages.
+
+    One executor and one keep-alive session serve every request of the
+    service instead of a new thread pool and new connections per query.
+    get() allows at most `per_host_limit` requests to the same host at once;
+    fetch_all() runs a scrape function over several URLs in the pool and
+    returns what finished within a timeout, cancelling the rest.
+
+    stats() reports queue depth, active work, and queue-wait and request
+    latency percentiles.
+    """
+
+    def __init__(self, workers=SCRAPE_POOL_WORKERS, per_host_limit=PER_HOST_LIMIT, session=None):
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.session = session or build_session(per_host_limit=per_host_limit)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+        self._host_slots = {}  # host -> semaphore limiting concurrent requests
+        self._host_stats = {}  # host -> [requests, errors]
+        self._lock = threading.Lock()
+        self._queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.requests = 0
+        self.request_errors = 0
+
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_stats[host] = [0, 0]
+            return slot
+
+    def get(self, url, **kwargs):
+        """GET a URL through the pooled session, waiting for a free slot on its host."""
+        host = urlparse(url).netloc.lower()
+        with self._host_slot(host):
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.requests += 1
+                    self.request_errors += 1
+                    self._host_stats[host][0] += 1
+                    self._host_stats[host][1] += 1
+                raise
+            with self._lock:
+                self.requests += 1
+                self._host_stats[host][0] += 1
+                self._latencies.append(time.monotonic() - started)
+            return response
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a pool worker and return its future."""
+        with self._lock:
+            self.queued += 1
+        return self._executor.submit(self._run, time.monotonic(), fn, args, kwargs)
+
+    def _run(self, submitted_at, fn, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._queue_waits.append(time.monotonic() - submitted_at)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def fetch_all(self, fn, urls, timeout):
+        """
+        Run fn(url) for every URL in the pool and wait at most `timeout` seconds.
+
+        Calls that raise are skipped. Calls still queued at the timeout are
+        cancelled; running ones finish in the background and are ignored.
+
+        Returns:
+            tuple: (results in completion order, number of URLs that missed the timeout)
+        """
+        futures = [self.submit(fn, url) for url in urls]
+        results = []
+        pending = len(futures)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                pending -= 1
+                try:
+                    results.append(future.result())
+                except Exception:
+                    pass
+        except concurrent.futures.TimeoutError:
+            for future in futures:
+                if future.cancel():
+                    with self._lock:
+                        self.queued -= 1
+                        self.cancelled += 1
+        return results, pending
+
+    def stats(self):
+        """Queue depth, activity counters and latency percentiles in milliseconds"""
+        with self._lock:
+            busiest = sorted(self._host_stats.items(), key=lambda item: item[1][0], reverse=True)[:10]
+            return {
+                "workers": self.workers,
+                "per_host_limit": self.per_host_limit,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "requests": self.requests,
+                "request_errors": self.request_errors,
+                "queue_wait_ms": {
+                    "p50": _percentile(self._queue_waits, 0.5),
+                    "p95": _percentile(self._queue_waits, 0.95)
+                },
+                "request_latency_ms": {
+                    "p50": _percentile(self._latencies, 0.5),
+                    "p95": _percentile(self._latencies, 0.95)
+                },
+                "hosts": {host: {"requests": counts[0], "errors": counts[1]} for host, counts in busiest}
+            }
@@ -0,0 +1,52 @@
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+
+
+class StaticPayload:
+    """
+    A JSON payload that is serialized and compressed once instead of on every request.
+
+    Call update() whenever the underlying data changes; respond() answers
+    conditional requests with 304 and serves the gzip bytes when the client
+    accepts them.
+    """
+
+    def __init__(self, data, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.update(data)
+
+    def update(self, data):
+        """Re-serialize the payload and recompute its ETag."""
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        gzipped = gzip.compress(body, compresslevel=9)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+
+        with self._lock:
+            self.body = body
+            self.gzipped = gzipped
+            self.etag = etag
+
+    def respond(self):
+        """Build the Flask response for the current request."""
+        with self._lock:
+            body, gzipped, etag = self.body, self.gzipped, self.etag
+
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            "Vary": "Accept-Encoding"
+        }
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        if request.accept_encodings['gzip'] and len(gzipped) < len(body):
+            headers["Content-Encoding"] = "gzip"
+            body = gzipped
+
+        return Response(body, status=200, headers=headers, mimetype='application/json')
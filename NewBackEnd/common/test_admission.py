@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from common.admission import AdmissionController, AdmissionRejected
+from common.responses import too_busy_response
+
+
+def make_classes(chat_budget=2.0, batch_budget=0.2):
+    return {
+        "interactive": {"priority": 0, "limit": 2, "headroom": 0, "queue_budget": chat_budget, "max_queue": 4},
+        "quiz": {"priority": 1, "limit": 2, "headroom": 0, "queue_budget": 2.0, "max_queue": 4},
+        "roadmap": {"priority": 2, "limit": 1, "headroom": 1, "queue_budget": batch_budget, "max_queue": 1}
+    }
+
+
+@pytest.fixture
+def admission(tmp_path):
+    return AdmissionController(str(tmp_path / "admission.sqlite3"), capacity=2, classes=make_classes())
+
+
+def test_class_limit_rejects_with_retry_after(admission):
+    with admission.slot("roadmap"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            admission.acquire("roadmap")
+    assert rejected.value.name == "roadmap"
+    assert rejected.value.retry_after >= 1
+    assert admission.stats()["classes"]["roadmap"]["rejected"] == 1
+
+
+def test_lower_class_leaves_headroom_for_chat(admission):
+    with admission.slot("interactive"):
+        # One slot is still free, but roadmaps must leave it to chat
+        with pytest.raises(AdmissionRejected):
+            admission.acquire("roadmap")
+        with admission.slot("interactive"):
+            assert admission.stats()["classes"]["interactive"]["active"] == 2
+
+
+def test_higher_priority_waiter_goes_first(tmp_path):
+    path = str(tmp_path / "admission.sqlite3")
+    admission = AdmissionController(path, capacity=1, classes=make_classes())
+    order = []
+
+    def wait_for(name):
+        with admission.slot(name):
+            order.append(name)
+
+    holder = admission.acquire("interactive")
+    quiz = threading.Thread(target=wait_for, args=("quiz",))
+    quiz.start()
+    time.sleep(0.2)
+    chat = threading.Thread(target=wait_for, args=("interactive",))
+    chat.start()
+    time.sleep(0.2)
+    admission.release("interactive", holder)
+    quiz.join(5)
+    chat.join(5)
+    assert order == ["interactive", "quiz"]
+
+
+def test_slots_are_shared_between_controllers(tmp_path):
+    path = str(tmp_path / "admission.sqlite3")
+    first = AdmissionController(path, capacity=2, classes=make_classes())
+    second = AdmissionController(path, capacity=2, classes=make_classes())
+    with first.slot("roadmap"):
+        with pytest.raises(AdmissionRejected):
+            second.acquire("roadmap")
+    with second.slot("roadmap"):
+        pass
+
+
+def test_too_busy_response():
+    app = Flask(__name__)
+    with app.app_context():
+        response = too_busy_response(AdmissionRejected("quiz", 7))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.get_json()["retry_after"] == 7
@@ -0,0 +1,54 @@
+import gzip
+import json
+
+from flask import Flask
+
+from common.static_payload import StaticPayload
+
+
+def make_client(payload):
+    app = Flask(__name__)
+    app.add_url_rule('/data', 'data', payload.respond)
+    return app.test_client()
+
+
+def test_serves_json_with_etag():
+    payload = StaticPayload({"topics": ["python", "sql"]}, max_age=60)
+    response = make_client(payload).get('/data')
+    assert response.status_code == 200
+    assert response.get_json() == {"topics": ["python", "sql"]}
+    assert response.headers["ETag"] == f'"{payload.etag}"'
+    assert "max-age=60" in response.headers["Cache-Control"]
+
+
+def test_matching_etag_answers_not_modified():
+    payload = StaticPayload({"topics": ["python"]})
+    client = make_client(payload)
+    etag = client.get('/data').headers["ETag"]
+    response = client.get('/data', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_update_changes_etag():
+    payload = StaticPayload({"topics": ["python"]})
+    client = make_client(payload)
+    etag = client.get('/data').headers["ETag"]
+    payload.update({"topics": ["python", "rust"]})
+    response = client.get('/data', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json() == {"topics": ["python", "rust"]}
+
+
+def test_gzip_only_when_accepted():
+    payload = StaticPayload({"topics": [f"topic {i}" for i in range(200)]})
+    client = make_client(payload)
+
+    plain = client.get('/data')
+    assert "Content-Encoding" not in plain.headers
+
+    compressed = client.get('/data', headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
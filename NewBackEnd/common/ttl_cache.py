@@ -0,0 +1,227 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SQLiteCacheBackend:
+    """
+    Cache storage in a SQLite file, shared by every process that opens it.
+
+    Uses WAL mode so readers in one process never block writers in another.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path, max_entries, max_bytes):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        """Return (serialized value, expires_at), or None if missing or expired"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is not None:
+            with conn:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row
+
+    def set(self, key, value, size, expires_at, now):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                # Drop least recently used rows until both limits hold again
+                removed_count, removed_bytes = 0, 0
+                stale = []
+                for old_key, old_size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+                    if count - removed_count <= self.max_entries and total - removed_bytes <= self.max_bytes:
+                        break
+                    stale.append((old_key,))
+                    removed_count += 1
+                    removed_bytes += old_size
+                conn.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    def delete(self, key):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache")
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, bounded by entry count and total bytes.
+
+    Values must be JSON-serializable; their serialized size counts towards
+    max_bytes. Lookups, inserts and evictions are O(1): recency is kept in an
+    OrderedDict and expiry in a second OrderedDict ordered by insertion time,
+    so expired entries are purged from its front.
+
+    With `shared_path`, entries are also written to a SQLite file so other
+    worker processes can reuse them; a local miss then checks the file.
+    """
+
+    def __init__(self, max_entries=100, max_bytes=16 * 1024 * 1024, ttl=3600, shared_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at), least recently used first
+        self._expiry = OrderedDict()  # key -> expires_at, soonest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared = SQLiteCacheBackend(shared_path, max_entries, max_bytes) if shared_path else None
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self.shared is not None:
+            try:
+                row = self.shared.get(key, now)
+            except sqlite3.Error:
+                row = None
+            if row is not None:
+                serialized, expires_at = row
+                value = json.loads(serialized)
+                with self._lock:
+                    self._store(key, value, len(serialized.encode('utf-8')), expires_at)
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """Cache a value; entries larger than max_bytes are not cached."""
+        serialized = json.dumps(value, ensure_ascii=False)
+        size = len(serialized.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._purge_expired(now)
+            self._store(key, value, size, expires_at)
+
+        if self.shared is not None:
+            try:
+                self.shared.set(key, serialized, size, expires_at, now)
+            except sqlite3.Error:
+                pass
+
+    def _store(self, key, value, size, expires_at):
+        # Caller holds the lock
+        self._remove(key)
+        self._entries[key] = (value, size, expires_at)
+        self._expiry[key] = expires_at
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            del self._expiry[key]
+
+    def _purge_expired(self, now):
+        # Ordered by insertion, which is expiry order while every entry uses the default TTL;
+        # entries with a custom TTL that end up out of order are caught by the check in get()
+        while self._expiry:
+            key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            try:
+                self.shared.clear()
+            except sqlite3.Error:
+                pass
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                "shared": self.shared is not None
+            }
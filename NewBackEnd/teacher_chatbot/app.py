@@ -1,13 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import json
 import logging
 
 # Add the current directory to the path so we can import main
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from main import TeacherChatbot
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import OFFLINE_MODE, TeacherChatbot, admission, answer_cache, corpus_index, format_response, model_router, model_warmup, page_cache, passage_index, scrape_pool, semantic_cache, session_store
+from common.admission import AdmissionRejected
+from common.responses import too_busy_response
+from common.static_payload import StaticPayload
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -24,13 +31,153 @@ except Exception as e:
     logger.error(f"Failed to initialize teacher chatbot: {str(e)}")
     chatbot = None
 
+# Suggested questions and topics shown by the frontend
+SUGGESTIONS = [
+    {
+        "category": "Programming",
+        "questions": [
+            "What is object-oriented programming?",
+            "How do I learn Python?",
+            "What are the differences between Python and JavaScript?",
+            "How do I create a REST API?",
+            "What is machine learning?"
+        ]
+    },
+    {
+        "category": "Mathematics",
+        "questions": [
+            "What is calculus?",
+            "How do I solve quadratic equations?",
+            "What are matrices used for?",
+            "How do I understand probability?",
+            "What is linear algebra?"
+        ]
+    },
+    {
+        "category": "Science",
+        "questions": [
+            "How does photosynthesis work?",
+            "What is the theory of relativity?",
+            "How do atoms work?",
+            "What is DNA?",
+            "How do ecosystems function?"
+        ]
+    },
+    {
+        "category": "History",
+        "questions": [
+            "What caused World War II?",
+            "How did the Industrial Revolution change society?",
+            "What was the Cold War?",
+            "How did ancient civilizations develop?",
+            "What led to the fall of the Roman Empire?"
+        ]
+    },
+    {
+        "category": "Technology",
+        "questions": [
+            "How do computers work?",
+            "What is artificial intelligence?",
+            "How does the internet work?",
+            "What is blockchain technology?",
+            "How do smartphones function?"
+        ]
+    }
+]
+
+TOPICS = [
+    {
+        "name": "Programming",
+        "subtopics": ["Python", "JavaScript", "Java", "C++", "Web Development", "Mobile Development"],
+        "icon": "💻"
+    },
+    {
+        "name": "Mathematics",
+        "subtopics": ["Algebra", "Calculus", "Statistics", "Geometry", "Linear Algebra"],
+        "icon": "📐"
+    },
+    {
+        "name": "Science",
+        "subtopics": ["Physics", "Chemistry", "Biology", "Astronomy", "Earth Science"],
+        "icon": "🔬"
+    },
+    {
+        "name": "History",
+        "subtopics": ["Ancient History", "Modern History", "World Wars", "Civilizations", "Political History"],
+        "icon": "📚"
+    },
+    {
+        "name": "Technology",
+        "subtopics": ["AI", "Machine Learning", "Cybersecurity", "Cloud Computing", "IoT"],
+        "icon": "🚀"
+    },
+    {
+        "name": "Languages",
+        "subtopics": ["English", "Spanish", "French", "German", "Chinese", "Japanese"],
+        "icon": "🗣️"
+    }
+]
+
+# Static catalog responses are serialized once at startup instead of per request
+suggestions_payload = StaticPayload({
+    "success": True,
+    "suggestions": SUGGESTIONS
+})
+topics_payload = StaticPayload({
+    "success": True,
+    "topics": TOPICS
+})
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; answers 503 until the chat model is warmed up so no traffic reaches a cold instance"""
+    ready = chatbot is not None and model_warmup.ready
     return jsonify({
-        "status": "healthy" if chatbot else "unhealthy",
+        "status": "healthy" if ready else "warming_up" if chatbot else "unhealthy",
         "service": "teacher_chatbot",
-        "model_available": chatbot is not None
+        "model_available": chatbot is not None,
+        "ready": ready,
+        "warmup": model_warmup.stats()
+    }), 200 if ready else 503
+
+def resolve_session(session_id, new_session):
+    """
+    The session a chat message belongs to: the known session with this id, or a
+    new one when the client opts in with new_session. Otherwise None, and the
+    message is answered on its own without keeping any server-side state.
+    """
+    session = session_store.get(session_id)
+    if session is None and new_session:
+        session = session_store.create()
+    return session
+
+def answer_chat(message, session_id, new_session=False):
+    """Answer a chat message and serialize the result; shared by the POST and GET chat endpoints"""
+    if not message:
+        return jsonify({
+            "error": "Message cannot be empty"
+        }), 400
+    
+    if not chatbot:
+        return jsonify({
+            "error": "Teacher chatbot is not available. Please check the service."
+        }), 503
+    
+    # Get response from the chatbot, continuing the conversation if it belongs to a session
+    session = resolve_session(session_id, new_session)
+    result = chatbot.answer_query(message, session)
+    
+    return jsonify({
+        "success": True,
+        "response": {
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "full_response": format_response(result),
+            "cache": result["cache"],
+            "timings": result["timings"]
+        },
+        "query": message,
+        "session_id": session.session_id if session else None
     })
 
 @app.route('/api/chat', methods=['POST'])
@@ -39,6 +186,31 @@ def chat():
     try:
         data = request.get_json()
         
+        if not data or 'message' not in data:
+            return jsonify({
+                "error": "Missing 'message' field in request body"
+            }), 400
+        
+        return answer_chat(data['message'].strip(), data.get('session_id'), data.get('new_session', False))
+        
+    except AdmissionRejected as e:
+        return too_busy_response(e)
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+def format_sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chat with the AI teacher, streaming the answer as server-sent events"""
+    try:
+        data = request.get_json()
+        
         if not data or 'message' not in data:
             return jsonify({
                 "error": "Missing 'message' field in request body"
@@ -56,42 +228,30 @@ def chat():
                 "error": "Teacher chatbot is not available. Please check the service."
             }), 503
         
-        # Get response from the chatbot
-        response = chatbot.answer_query(message)
-        
-        # Parse response to separate answer and sources
-        sources = []
-        answer = response
-        
-        if "Sources:" in response:
-            parts = response.split("Sources:", 1)
-            answer = parts[0].strip()
-            if len(parts) > 1:
-                sources_text = parts[1].strip()
-                # Parse sources (format: "- Title: URL")
-                for line in sources_text.split('\n'):
-                    line = line.strip()
-                    if line.startswith('- ') and ':' in line:
-                        title_url = line[2:]  # Remove "- "
-                        if ':' in title_url:
-                            title, url = title_url.split(':', 1)
-                            sources.append({
-                                "title": title.strip(),
-                                "url": url.strip()
-                            })
+        # Answer 429 before the stream starts when chat requests are already queued past their budget
+        retry_after = admission.saturated("interactive")
+        if retry_after is not None:
+            return too_busy_response(AdmissionRejected("interactive", retry_after))
         
-        return jsonify({
-            "success": True,
-            "response": {
-                "answer": answer,
-                "sources": sources,
-                "full_response": response
-            },
-            "query": message
-        })
+        session = resolve_session(data.get('session_id'), data.get('new_session', False))
+        
+        def generate():
+            for event, payload in chatbot.stream_answer(message, session):
+                if event == "done":
+                    payload = {**payload, "session_id": session.session_id if session else None}
+                yield format_sse(event, payload)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"  # stop reverse proxies from buffering the stream
+            }
+        )
         
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
+        logger.error(f"Error in chat stream endpoint: {str(e)}")
         return jsonify({
             "error": f"An error occurred: {str(e)}"
         }), 500
@@ -100,50 +260,14 @@ def chat():
 def chat_get(message):
     """Chat with the AI teacher via GET request"""
     try:
-        if not message or not message.strip():
-            return jsonify({
-                "error": "Message cannot be empty"
-            }), 400
-        
-        if not chatbot:
-            return jsonify({
-                "error": "Teacher chatbot is not available. Please check the service."
-            }), 503
-        
-        # Get response from the chatbot
-        response = chatbot.answer_query(message.strip())
-        
-        # Parse response to separate answer and sources
-        sources = []
-        answer = response
-        
-        if "Sources:" in response:
-            parts = response.split("Sources:", 1)
-            answer = parts[0].strip()
-            if len(parts) > 1:
-                sources_text = parts[1].strip()
-                # Parse sources (format: "- Title: URL")
-                for line in sources_text.split('\n'):
-                    line = line.strip()
-                    if line.startswith('- ') and ':' in line:
-                        title_url = line[2:]  # Remove "- "
-                        if ':' in title_url:
-                            title, url = title_url.split(':', 1)
-                            sources.append({
-                                "title": title.strip(),
-                                "url": url.strip()
-                            })
-        
-        return jsonify({
-            "success": True,
-            "response": {
-                "answer": answer,
-                "sources": sources,
-                "full_response": response
-            },
-            "query": message.strip()
-        })
+        return answer_chat(
+            message.strip(),
+            request.args.get('session_id'),
+            request.args.get('new_session') == 'true'
+        )
         
+    except AdmissionRejected as e:
+        return too_busy_response(e)
     except Exception as e:
         logger.error(f"Error in chat GET endpoint: {str(e)}")
         return jsonify({
@@ -154,63 +278,7 @@ def chat_get(message):
 def get_suggestions():
     """Get suggested questions for the AI teacher"""
     try:
-        suggestions = [
-            {
-                "category": "Programming",
-                "questions": [
-                    "What is object-oriented programming?",
-                    "How do I learn Python?",
-                    "What are the differences between Python and JavaScript?",
-                    "How do I create a REST API?",
-                    "What is machine learning?"
-                ]
-            },
-            {
-                "category": "Mathematics",
-                "questions": [
-                    "What is calculus?",
-                    "How do I solve quadratic equations?",
-                    "What are matrices used for?",
-                    "How do I understand probability?",
-                    "What is linear algebra?"
-                ]
-            },
-            {
-                "category": "Science",
-                "questions": [
-                    "How does photosynthesis work?",
-                    "What is the theory of relativity?",
-                    "How do atoms work?",
-                    "What is DNA?",
-                    "How do ecosystems function?"
-                ]
-            },
-            {
-                "category": "History",
-                "questions": [
-                    "What caused World War II?",
-                    "How did the Industrial Revolution change society?",
-                    "What was the Cold War?",
-                    "How did ancient civilizations develop?",
-                    "What led to the fall of the Roman Empire?"
-                ]
-            },
-            {
-                "category": "Technology",
-                "questions": [
-                    "How do computers work?",
-                    "What is artificial intelligence?",
-                    "How does the internet work?",
-                    "What is blockchain technology?",
-                    "How do smartphones function?"
-                ]
-            }
-        ]
-        
-        return jsonify({
-            "success": True,
-            "suggestions": suggestions
-        })
+        return suggestions_payload.respond()
         
     except Exception as e:
         logger.error(f"Error getting suggestions: {str(e)}")
@@ -222,43 +290,7 @@ def get_suggestions():
 def get_topics():
     """Get available learning topics"""
     try:
-        topics = [
-            {
-                "name": "Programming",
-                "subtopics": ["Python", "JavaScript", "Java", "C++", "Web Development", "Mobile Development"],
-                "icon": "💻"
-            },
-            {
-                "name": "Mathematics",
-                "subtopics": ["Algebra", "Calculus", "Statistics", "Geometry", "Linear Algebra"],
-                "icon": "📐"
-            },
-            {
-                "name": "Science",
-                "subtopics": ["Physics", "Chemistry", "Biology", "Astronomy", "Earth Science"],
-                "icon": "🔬"
-            },
-            {
-                "name": "History",
-                "subtopics": ["Ancient History", "Modern History", "World Wars", "Civilizations", "Political History"],
-                "icon": "📚"
-            },
-            {
-                "name": "Technology",
-                "subtopics": ["AI", "Machine Learning", "Cybersecurity", "Cloud Computing", "IoT"],
-                "icon": "🚀"
-            },
-            {
-                "name": "Languages",
-                "subtopics": ["English", "Spanish", "French", "German", "Chinese", "Japanese"],
-                "icon": "🗣️"
-            }
-        ]
-        
-        return jsonify({
-            "success": True,
-            "topics": topics
-        })
+        return topics_payload.respond()
         
     except Exception as e:
         logger.error(f"Error getting topics: {str(e)}")
@@ -273,8 +305,21 @@ def get_status():
         status = {
             "service": "teacher_chatbot",
             "status": "running" if chatbot else "error",
-            "model_available": chatbot is not None,
-            "model_name": "mistral:instruct" if chatbot else None,
+            "model_available": chatbot is not None and model_router.is_available("chat"),
+            "model_name": model_router.choose("chat") if chatbot else None,
+            "model_router": model_router.stats(),
+            "warmup": model_warmup.stats(),
+            "cache": answer_cache.stats(),
+            "semantic_cache": semantic_cache.stats(),
+            "retrieval": chatbot.retrieval_stats() if chatbot else None,
+            "scrape_pool": scrape_pool.stats(),
+            "page_cache": page_cache.stats(),
+            "passage_index": passage_index.stats(),
+            "offline_mode": OFFLINE_MODE,
+            "corpus_index": corpus_index.stats(),
+            "sessions": session_store.stats(),
+            "admission": admission.stats(),
+            "context_reuse": chatbot.context_reuse_stats() if chatbot else None,
             "features": [
                 "AI-powered educational responses",
                 "Web content integration",
@@ -302,15 +347,154 @@ def get_status():
             "error": f"An error occurred: {str(e)}"
         }), 500
 
+@app.route('/api/cache/audit', methods=['GET'])
+def get_cache_audit():
+    """Get recent semantic cache hits so false hits can be reviewed"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({
+            "success": True,
+            "hits": semantic_cache.audit_log(limit),
+            "stats": semantic_cache.stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting cache audit log: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/cache/audit/<int:audit_id>/false', methods=['POST'])
+def report_false_cache_hit(audit_id):
+    """Report a semantic cache hit that returned the wrong answer"""
+    try:
+        if not semantic_cache.report_false_hit(audit_id):
+            return jsonify({
+                "error": f"Unknown audit id {audit_id}"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "stats": semantic_cache.stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error reporting false cache hit: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/notes', methods=['POST'])
+def add_note():
+    """Add teacher notes that answers can draw on"""
+    try:
+        data = request.get_json()
+        
+        if not data or not str(data.get('text', '')).strip():
+            return jsonify({
+                "error": "Missing 'text' field in request body"
+            }), 400
+        
+        if not chatbot:
+            return jsonify({
+                "error": "Teacher chatbot is not available. Please check the service."
+            }), 503
+        
+        title = str(data.get('title') or 'Teacher notes').strip()
+        note_id, passages = chatbot.add_note(title, str(data['text']), data.get('note_id'))
+        
+        return jsonify({
+            "success": True,
+            "note_id": note_id,
+            "passages": passages
+        })
+        
+    except Exception as e:
+        logger.error(f"Error adding note: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/notes/<note_id>', methods=['DELETE'])
+def remove_note(note_id):
+    """Remove teacher notes from the passage index"""
+    try:
+        if not chatbot:
+            return jsonify({
+                "error": "Teacher chatbot is not available. Please check the service."
+            }), 503
+        
+        if not chatbot.remove_note(note_id):
+            return jsonify({
+                "error": f"Unknown note id {note_id}"
+            }), 404
+        
+        return jsonify({
+            "success": True
+        })
+        
+    except Exception as e:
+        logger.error(f"Error removing note: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Get the history kept for a chat session"""
+    try:
+        session = session_store.get(session_id)
+        if session is None:
+            return jsonify({
+                "error": f"Unknown session id {session_id}"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "session": session.to_dict()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting session: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """End a chat session and forget its history"""
+    try:
+        if not session_store.delete(session_id):
+            return jsonify({
+                "error": f"Unknown session id {session_id}"
+            }), 404
+        
+        return jsonify({
+            "success": True
+        })
+        
+    except Exception as e:
+        logger.error(f"Error deleting session: {str(e)}")
+        return jsonify({
+            "error": f"An error occurred: {str(e)}"
+        }), 500
+
 if __name__ == '__main__':
     print("Starting AI Teacher Chatbot API...")
     print("Available endpoints:")
     print("- GET  /health - Health check")
     print("- POST /api/chat - Chat with AI teacher")
+    print("- POST /api/chat/stream - Chat with streamed tokens (server-sent events)")
     print("- GET  /api/chat/<message> - Chat via GET")
     print("- GET  /api/suggestions - Get question suggestions")
     print("- GET  /api/topics - Get available topics")
     print("- GET  /api/status - Get detailed status")
+    print("- GET  /api/cache/audit - Review semantic cache hits")
+    print("- POST /api/cache/audit/<id>/false - Report a false semantic cache hit")
+    print("- POST /api/notes - Add teacher notes to the passage index")
+    print("- DELETE /api/notes/<note_id> - Remove teacher notes")
+    print("- GET  /api/sessions/<session_id> - Get chat session history")
+    print("- DELETE /api/sessions/<session_id> - End a chat session")
     print("\nServer running on http://localhost:5003")
     
     app.run(host='0.0.0.0', port=5003, debug=True) 
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Context Reuse Benchmark
+Measures time to first token of follow-up questions when the session's Ollama
+context is reused, against resending the conversation history as text.
+Needs a running Ollama with the teacher model.
+
+Usage:
+    python benchmark_context_reuse.py --turns 4
+"""
+
+import argparse
+import statistics
+import time
+
+from chat_sessions import ChatSession
+from main import TeacherChatbot
+
+CONVERSATION = [
+    "What is photosynthesis?",
+    "Which part of the cell does it happen in?",
+    "What are the products of the light reactions?",
+    "How is it different from cellular respiration?",
+    "Why do leaves change colour in autumn?",
+    "Can you summarise what we discussed?"
+]
+
+
+def run_conversation(chatbot, questions, reuse):
+    """Ask the questions in one session; returns seconds to first token of each follow-up."""
+    session = ChatSession("benchmark")
+    first_tokens = []
+    for number, question in enumerate(questions):
+        if not reuse:
+            session.model_context = None
+        start = time.perf_counter()
+        tokens = []
+        for token in chatbot.generate_session_stream(question, None, session):
+            if not tokens and number:
+                first_tokens.append(time.perf_counter() - start)
+            tokens.append(token)
+        session.add_exchange(question, "".join(tokens))
+    return first_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Ollama context reuse for follow-up questions")
+    parser.add_argument('--turns', type=int, default=4, help="Questions per conversation, including the first")
+    parser.add_argument('--repeat', type=int, default=2, help="Conversations per mode")
+    args = parser.parse_args()
+
+    chatbot = TeacherChatbot()
+    questions = CONVERSATION[:max(2, args.turns)]
+
+    results = {}
+    for reuse in (False, True):
+        samples = []
+        for _ in range(args.repeat):
+            samples.extend(run_conversation(chatbot, questions, reuse))
+        results[reuse] = samples
+
+    print(f"Follow-up questions: {len(results[True])} per mode")
+    print("\nMode                      median TTFT ms   max TTFT ms")
+    print("-" * 56)
+    for reuse, label in ((False, "history resent as text"), (True, "context reused")):
+        samples = results[reuse]
+        print(f"{label:26}{statistics.median(samples) * 1000:14.1f}{max(samples) * 1000:14.1f}")
+    saved = statistics.median(results[False]) - statistics.median(results[True])
+    print(f"\nMedian time to first token saved: {saved * 1000:.1f} ms")
+    print(f"Prefill stats: {chatbot.context_reuse_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.content_extractor import extract_content
+from passage_index import PassageIndex
+
+CORPUS_INDEX_PATH = os.getenv(
+    "CORPUS_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_index.sqlite3")
+)
+
+HTML_EXTENSIONS = {'.html', '.htm'}
+TEXT_EXTENSIONS = {'.md', '.markdown', '.txt'}
+JSONL_EXTENSIONS = {'.jsonl', '.json'}
+
+MAX_DOCUMENT_CHARS = 200000
+
+MARKDOWN_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+MARKDOWN_MARKUP = re.compile(r'^\s{0,3}(#{1,6}|>|[-*+]|\d+\.)\s+|[*_`~]{1,3}', re.M)
+
+
+def markdown_to_text(text):
+    """Drop Markdown markup that would only add noise to passages; link text is kept."""
+    return MARKDOWN_LINK.sub(r'\1', MARKDOWN_MARKUP.sub('', text))
+
+
+def read_documents(corpus_dir):
+    """
+    Yield (url, title, text) for every document in a corpus directory.
+
+    HTML pages go through the shared content extractor, Markdown and text
+    files are read as is, and JSONL files hold one article per line with
+    "title" and "text" (and optionally "url"), as written by WikiExtractor --json.
+    """
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, corpus_dir).replace(os.sep, '/')
+            extension = os.path.splitext(name)[1].lower()
+            try:
+                if extension in JSONL_EXTENSIONS:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        for number, line in enumerate(f, 1):
+                            line = line.strip()
+                            if not line:
+                                continue
+                            article = json.loads(line)
+                            title = article.get('title') or f"{relative}:{number}"
+                            url = article.get('url') or f"corpus:{relative}#{number}"
+                            yield url, title, str(article.get('text', ''))[:MAX_DOCUMENT_CHARS]
+                    continue
+
+                if extension not in HTML_EXTENSIONS and extension not in TEXT_EXTENSIONS:
+                    continue
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    raw = f.read()
+                if extension in HTML_EXTENSIONS:
+                    page = extract_content(raw, max_chars=MAX_DOCUMENT_CHARS)
+                    title, text = page['title'], page['content']
+                else:
+                    text = markdown_to_text(raw) if extension != '.txt' else raw
+                    title = ''
+                yield f"corpus:{relative}", title or os.path.splitext(name)[0].replace('_', ' '), text[:MAX_DOCUMENT_CHARS]
+            except (OSError, ValueError) as e:
+                print(f"Skipping {relative}: {e}")
+
+
+def build_index(corpus_dir, output=CORPUS_INDEX_PATH):
+    """
+    Index every document of a corpus directory into a fresh passage index file.
+
+    The index is built next to the output and swapped in atomically, so a
+    running service never reads a half-built file.
+
+    Returns:
+        tuple: (documents indexed, passages indexed)
+    """
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+
+    index = PassageIndex(tmp_path)
+    documents = passages = 0
+    for url, title, text in read_documents(corpus_dir):
+        count = index.add_document(url, title, text, kind="corpus")
+        if count:
+            documents += 1
+            passages += count
+
+    index.optimize()
+    os.replace(tmp_path, output)
+    return documents, passages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline corpus index for the teacher chatbot")
+    parser.add_argument('corpus', help="Directory of HTML, Markdown, text or JSONL (WikiExtractor) files")
+    parser.add_argument('--output', default=CORPUS_INDEX_PATH, help="Where to write the index")
+    args = parser.parse_args()
+
+    start = time.time()
+    documents, passages = build_index(args.corpus, args.output)
+    print(f"Indexed {documents} documents ({passages} passages) into {args.output} in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
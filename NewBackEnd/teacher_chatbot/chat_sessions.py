@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+
+from passage_index import estimate_tokens
+
+# Prompt tokens of recent turns carried into each answer; older turns are rolled into the summary
+HISTORY_TOKEN_BUDGET = 1200
+SUMMARY_TOKEN_BUDGET = 300
+
+# Longer turns are cut before they are stored
+MAX_TURN_CHARS = 4000
+
+# Sessions kept in memory, and how long an idle one survives
+MAX_SESSIONS = 1000
+SESSION_IDLE_TTL = 2 * 3600
+
+FIRST_SENTENCE = re.compile(r'^(.{1,240}?[.!?])(\s|$)', re.S)
+
+
+def lead_sentence(text):
+    """First sentence of a turn (at most 240 characters)"""
+    text = ' '.join(text.split())
+    match = FIRST_SENTENCE.match(text)
+    return match.group(1) if match else text[:240]
+
+
+def summarize_turns(summary, turns, max_tokens=SUMMARY_TOKEN_BUDGET):
+    """
+    Fold turns into a running summary without calling the model.
+
+    Each turn contributes its lead sentence; when the summary grows past
+    max_tokens its oldest lines are dropped.
+    """
+    lines = summary.split('\n') if summary else []
+    for role, content in turns:
+        speaker = "Student asked" if role == "user" else "Teacher explained"
+        lines.append(f"{speaker}: {lead_sentence(content)}")
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+class ChatSession:
+    """
+    One conversation: recent turns within a token budget plus a summary of older ones.
+    """
+
+    def __init__(self, session_id, history_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+        self.session_id = session_id
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.summary = ""
+        self.turns = []  # (role, content), oldest first
+        self.turn_tokens = 0
+        # Ollama KV context of the conversation so far (token ids, packed as 32-bit ints),
+        # the model that produced it and the passages it already holds, so they are not sent again
+        self.model_context = None
+        self.context_model = None
+        self.context_passages = set()
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self._lock = threading.Lock()
+
+    def add_exchange(self, question, answer):
+        """Record a question and its answer, rolling the oldest turns into the summary when over budget."""
+        with self._lock:
+            for role, content in (("user", question), ("assistant", answer)):
+                content = content.strip()[:MAX_TURN_CHARS]
+                self.turns.append((role, content))
+                self.turn_tokens += estimate_tokens(content)
+
+            rolled = []
+            # Keep at least the latest exchange verbatim
+            while self.turn_tokens > self.history_budget and len(self.turns) > 2:
+                role, content = self.turns.pop(0)
+                self.turn_tokens -= estimate_tokens(content)
+                rolled.append((role, content))
+            if rolled:
+                self.summary = summarize_turns(self.summary, rolled, self.summary_budget)
+            self.last_used = time.time()
+
+    def history_messages(self):
+        """Chat messages that carry the conversation so far: the summary, then the recent turns."""
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation with this student:\n{self.summary}"
+                })
+            messages.extend({"role": role, "content": content} for role, content in self.turns)
+            return messages
+
+    def reusable_context(self, model):
+        """
+        The stored model context and the passages in it, if it was produced by this model.
+
+        A context from another model is dropped, so the next answer starts a new one.
+
+        Returns:
+            tuple: (context tokens as an array or None, set of passage texts already in the context)
+        """
+        with self._lock:
+            if self.model_context and self.context_model == model:
+                return self.model_context, set(self.context_passages)
+            self._drop_context()
+            return None, set()
+
+    def store_context(self, model, context, passages, extend=False, max_tokens=None):
+        """
+        Keep the context of the latest answer; with extend, it continues the previous context.
+
+        A context longer than max_tokens could not be sent back to the model,
+        so it is dropped instead of kept.
+        """
+        with self._lock:
+            if max_tokens is not None and len(context) > max_tokens:
+                self._drop_context()
+                return
+            if not extend:
+                self.context_passages = set()
+            self.model_context = array('i', context)
+            self.context_model = model
+            self.context_passages.update(passages)
+
+    def drop_context(self):
+        with self._lock:
+            self._drop_context()
+
+    def _drop_context(self):
+        self.model_context = self.context_model = None
+        self.context_passages = set()
+
+    def last_question(self):
+        with self._lock:
+            for role, content in reversed(self.turns):
+                if role == "user":
+                    return content
+            return ""
+
+    def has_history(self):
+        with self._lock:
+            return bool(self.turns or self.summary)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "summary": self.summary,
+                "turns": [{"role": role, "content": content} for role, content in self.turns],
+                "history_tokens": self.turn_tokens + (estimate_tokens(self.summary) if self.summary else 0),
+                "model_context_tokens": len(self.model_context or ()),
+                "created_at": self.created_at,
+                "last_used": self.last_used
+            }
+
+
+class SessionStore:
+    """
+    Server-side chat sessions keyed by id, in LRU order.
+
+    Ids are random and minted by the store, never chosen by clients, since
+    anyone holding an id can read that session's history.
+
+    At most `max_sessions` sessions are kept; the least recently used one is
+    dropped first, and sessions idle for more than `idle_ttl` seconds expire.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_ttl=SESSION_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id):
+        """Return the session with this id, or None for an unknown or expired id."""
+        if not session_id:
+            return None
+        now = time.time()
+        session_id = str(session_id)[:64]
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = now
+            return session
+
+    def create(self):
+        """Start a session with a new random id."""
+        with self._lock:
+            self._expire(time.time())
+            session_id = uuid.uuid4().hex
+            session = self._sessions[session_id] = ChatSession(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self, now):
+        # Caller holds the lock; sessions are in last-used order, so idle ones are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "evictions": self.evictions
+            }
@@ -1,16 +1,29 @@
 import os
+import sys
 import re
 import json
 import logging
-import requests
 import time
-import concurrent.futures
-from bs4 import BeautifulSoup
+import uuid
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 import ollama
 from typing import List, Dict
 
+# Add the backend root to the path so we can import the shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.admission import AdmissionController, AdmissionRejected
+from common.content_extractor import EXTRACTOR_VERSION, extract_content
+from common.model_router import ModelRouter
+from common.model_warmup import OLLAMA_KEEP_ALIVE, ModelWarmup
+from common.page_cache import PageCache
+from common.scrape_pool import ScrapePool
+from common.ttl_cache import TTLCache
+from chat_sessions import SessionStore
+from passage_index import CHARS_PER_TOKEN, PassageIndex, estimate_tokens, merge_rankings, pack_passages
+from semantic_cache import SemanticQueryCache
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,10 +41,16 @@ load_dotenv()
 # Model configuration with fallback chain
 PRIMARY_MODEL = "llama3:latest"  # Best performance and quality
 FALLBACK_MODELS = ["mistral:instruct", "mistral:latest"]
-MODEL_NAME = PRIMARY_MODEL
+MODEL_NAME = PRIMARY_MODEL  # model of the terminal chatbot, set by initialize_ollama()
+
+# Each answer goes to the preferred model that is installed, healthy and answering within this many seconds
+CHAT_LATENCY_SLO = float(os.getenv("CHAT_LATENCY_SLO", "20"))
+model_router = ModelRouter({
+    "chat": {"models": [PRIMARY_MODEL] + FALLBACK_MODELS, "slo": CHAT_LATENCY_SLO}
+})
 
 # Performance optimizations
-MAX_CONTENT_LENGTH = 6000  # Optimized for faster processing
+MAX_CONTENT_LENGTH = 20000  # Pages are split into passages, so only the relevant parts reach the prompt
 TIMEOUT = 30  # 30 second timeout
 
 # Constants
@@ -39,33 +58,137 @@ SEARCH_API_KEY = os.getenv("SEARCH_API_KEY", "")
 SEARCH_API_URL = os.getenv("SEARCH_API_URL", "https://serpapi.com/search")
 MAX_SOURCES = 3
 SCRAPE_TIMEOUT = 10  # seconds
+SEARCH_TIMEOUT = 3  # seconds
+
+# Overall time budget for search plus scraping. Sources still loading when it runs out
+# are dropped and the answer is generated from what finished (or from the model alone).
+RETRIEVAL_BUDGET = float(os.getenv("RETRIEVAL_BUDGET", "5.0"))
+
+# Long-lived workers and keep-alive connections shared by every search and scrape
+scrape_pool = ScrapePool()
+
+# Model calls queue with the other services' ones; chat is the "interactive" class and goes first
+admission = AdmissionController()
+
+# Loads the chat model at startup so the first question does not pay for it; /health waits for it
+model_warmup = ModelWarmup(model_router, admission)
+
+# Scraped pages and their extracted text, revalidated with conditional GETs once stale
+page_cache = PageCache(scrape_pool.get)
+
+# Scraped pages and uploaded notes, split into passages and ranked with BM25 for each query
+PASSAGE_INDEX_PATH = os.getenv(
+    "PASSAGE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "passage_index.sqlite3")
+)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Local passages answer a query without any fetch when they mention all of its words and add up to this many tokens
+MIN_LOCAL_TOKENS = 300
+LOCAL_KNOWLEDGE_MAX_AGE = 7 * 24 * 3600  # web pages older than this are fetched again
+
+passage_index = PassageIndex(PASSAGE_INDEX_PATH)
+
+# Local document corpus built with build_corpus_index.py; opened on first use and read through mmap.
+# With TEACHER_OFFLINE=1 answers come only from the corpus and notes, with no network calls.
+OFFLINE_MODE = os.getenv("TEACHER_OFFLINE", "").lower() in ("1", "true", "yes")
+CORPUS_INDEX_PATH = os.getenv(
+    "CORPUS_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_index.sqlite3")
+)
+CORPUS_MMAP_BYTES = 256 * 1024 * 1024
+
+corpus_index = PassageIndex(CORPUS_INDEX_PATH, read_only=True, mmap_size=CORPUS_MMAP_BYTES)
+
+# Server-side conversations for the HTTP API, keyed by session id
+session_store = SessionStore()
+
+# Model context window in tokens. Set explicitly, since Ollama's default window is smaller than a
+# session turn can need and it silently cuts the front of the prompt. A reused session context is
+# dropped and rebuilt from the budgeted history when it, the new prompt and the answer would not fit.
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "8192"))
+# Slack for estimate_tokens being approximate
+CONTEXT_SAFETY_TOKENS = 256
+
+SYSTEM_PROMPT = "You are a helpful educational assistant that explains concepts clearly and accurately. Always provide accurate information and explain concepts in a way that's easy to understand."
+
+GENERATION_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "num_predict": 1024,
+    "num_ctx": MODEL_CONTEXT_TOKENS
+}
 
 # Cache for recent queries to reduce repeated scraping
-query_cache = {}
 CACHE_EXPIRY = 3600  # 1 hour in seconds
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Set ANSWER_CACHE_DB to a SQLite file path to share cached answers between worker processes
+CACHE_SHARED_PATH = os.getenv("ANSWER_CACHE_DB") or None
+
+answer_cache = TTLCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    ttl=CACHE_EXPIRY,
+    shared_path=CACHE_SHARED_PATH
+)
+
+# Near-duplicate queries ("what is photosynthesis?" / "explain photosynthesis") reuse cached answers.
+# Raise the threshold for fewer false hits; above 1.0 disables semantic matching.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_AUDIT_LOG = os.getenv("SEMANTIC_CACHE_AUDIT_LOG") or None
+
+semantic_cache = SemanticQueryCache(
+    answer_cache,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=CACHE_MAX_ENTRIES,
+    audit_path=SEMANTIC_CACHE_AUDIT_LOG
+)
+
+
+def format_context(passages):
+    """Prompt context text for passages, each headed by its source; None without passages."""
+    if not passages:
+        return None
+    return "\n\n".join([
+        f"Source: {passage['title']} ({passage['url']})\n{passage['content']}"
+        for passage in passages
+    ])
+
+def format_response(result):
+    """The answer of an answer_query result as text, with its sources listed after it."""
+    if not result["sources"]:
+        return result["answer"]
+    source_urls = [f"- {source['title']}: {source['url']}" for source in result["sources"]]
+    return result["answer"] + "\n\nSources:\n" + "\n".join(source_urls)
 
 
 class TeacherChatbot:
     def __init__(self):
         self.logger = logger
+        self.retrieval_runs = 0
+        self.retrieval_partial = 0  # some sources missed the budget
+        self.retrieval_missed = 0  # no source finished within the budget
+        self.local_hits = 0  # answered from indexed passages without fetching
+        # Session turns that reused the model context and those that sent their history as text
+        self.context_reuse = {
+            kind: {"turns": 0, "timed_turns": 0, "first_token_seconds": 0.0, "prompt_tokens": 0,
+                   "prefill_seconds": 0.0, "context_tokens": 0}
+            for kind in ("reused", "rebuilt")
+        }
         self.initialize_model()
         
     def initialize_model(self):
-        """Initialize the LLaMA model through Ollama."""
-        try:
-            # Check if model exists in Ollama
-            models = ollama.list()
-            model_exists = any(model.get('name') == MODEL_NAME for model in models.get('models', []))
-            
-            if not model_exists:
-                self.logger.info(f"Model {MODEL_NAME} not found. Make sure it's available in Ollama.")
-            else:
-                self.logger.info(f"Successfully connected to Ollama with model {MODEL_NAME}")
-        except Exception as e:
-            self.logger.error(f"Failed to initialize Ollama model: {str(e)}")
-            raise
+        """List the models available in Ollama and keep rechecking them in the background."""
+        if model_router.refresh() is None:
+            self.logger.error("Failed to reach Ollama; answers will be routed once it is available")
+        elif not model_router.is_available("chat"):
+            self.logger.info(f"None of {model_router.tasks['chat']['models']} found. Make sure one is available in Ollama.")
+        else:
+            self.logger.info(f"Successfully connected to Ollama, routing answers to {model_router.choose('chat')}")
+        model_router.start()
+        model_warmup.start()
 
-    def search_web(self, query):
+    def search_web(self, query, timeout=SEARCH_TIMEOUT):
         """Search the web for educational content related to the query."""
         if not SEARCH_API_KEY:
             self.logger.warning("Search API key not available, using direct scraping")
@@ -78,7 +201,7 @@ class TeacherChatbot:
                 "engine": "google",
                 "num": 5
             }
-            response = requests.get(SEARCH_API_URL, params=params)
+            response = scrape_pool.get(SEARCH_API_URL, params=params, timeout=timeout)
             data = response.json()
             
             # Extract relevant URLs, prioritizing educational sites
@@ -119,89 +242,54 @@ class TeacherChatbot:
         except:
             return False
 
-    def scrape_content(self, url):
-        """Scrape educational content from a URL."""
+    def scrape_content(self, url, timeout=SCRAPE_TIMEOUT):
+        """Scrape educational content from a URL, reusing the cached page and text when still valid."""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=SCRAPE_TIMEOUT)
-            
-            # Check if the page exists and is accessible
-            if response.status_code != 200:
-                return None
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script, style, and navigation elements
-            for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header']):
-                element.decompose()
-            
-            # Extract title
-            title = soup.title.string if soup.title else ""
-            
-            # Try to get content based on website-specific selectors
-            domain = urlparse(url).netloc
-            content = ""
-            
-            # Special handling for Wikipedia
-            if 'wikipedia.org' in domain:
-                main_content = soup.find('div', {'id': 'mw-content-text'})
-                if main_content:
-                    paragraphs = main_content.find_all('p')
-                    content = ' '.join([p.get_text().strip() for p in paragraphs])
-            else:
-                # Get main content based on common article containers
-                main_elements = soup.find_all(
-                    ['article', 'main', 'div'], 
-                    class_=re.compile(r'content|article|main|body')
-                )
-                
-                if main_elements:
-                    # Use the largest content block
-                    main_element = max(main_elements, key=lambda x: len(x.get_text()))
-                    paragraphs = main_element.find_all('p')
-                    content = ' '.join([p.get_text().strip() for p in paragraphs])
-                else:
-                    # Fallback to all paragraphs
-                    paragraphs = soup.find_all('p')
-                    content = ' '.join([p.get_text().strip() for p in paragraphs])
-            
-            # Clean the content
-            content = re.sub(r'\s+', ' ', content).strip()
-            content = re.sub(r'\[\d+\]', '', content)  # Remove reference numbers like [1], [2], etc.
-            
-            # Trim to max length
-            if len(content) > MAX_CONTENT_LENGTH:
-                content = content[:MAX_CONTENT_LENGTH] + "..."
-                
-            return {
-                "title": title,
-                "content": content,
-                "url": url
-            }
+            return page_cache.fetch(
+                url, f"teacher:{EXTRACTOR_VERSION}:{MAX_CONTENT_LENGTH}", self._extract_content, timeout=timeout
+            )
         except Exception as e:
             self.logger.error(f"Error scraping {url}: {str(e)}")
             return None
 
-    def scrape_multiple_sources(self, urls):
-        """Scrape content from multiple URLs in parallel."""
-        sources = []
+    def _extract_content(self, html, url):
+        """Extract the title and main text of a page."""
+        page = extract_content(html, max_chars=MAX_CONTENT_LENGTH)
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_SOURCES) as executor:
-            future_to_url = {executor.submit(self.scrape_content, url): url for url in urls}
-            for future in concurrent.futures.as_completed(future_to_url):
-                result = future.result()
-                if result and result["content"]:
-                    sources.append(result)
+        # Remove reference numbers like [1], [2], etc.
+        content = re.sub(r'\[\d+\]', '', page["content"])
+        if page["truncated"]:
+            content += "..."
+            
+        return {
+            "title": page["title"],
+            "content": content,
+            "url": url
+        }
+
+    def scrape_multiple_sources(self, urls, timeout=SCRAPE_TIMEOUT):
+        """
+        Scrape content from multiple URLs in parallel on the shared scrape pool.
+
+        Returns the sources that finished within `timeout` seconds; scrapes
+        still queued are cancelled and running ones are left to time out on
+        their own without holding up the answer.
+
+        Returns:
+            tuple: (sources, number of URLs that missed the timeout)
+        """
+        request_timeout = min(timeout, SCRAPE_TIMEOUT)
+        results, pending = scrape_pool.fetch_all(lambda url: self.scrape_content(url, request_timeout), urls, timeout)
+        if pending:
+            self.logger.warning(f"{pending} of {len(urls)} sources missed the {timeout:.1f}s scrape budget")
         
-        return sources
+        sources = [result for result in results if result and result["content"]]
+        return sources, pending
 
-    def generate_response(self, query, context=None):
-        """Generate a response using the LLaMA model via Ollama."""
-        try:
-            if context:
-                prompt = f"""You are an educational assistant helping with a student query.
+    def _build_prompt(self, query, context=None):
+        """Build the user prompt for a query, with the retrieved context if any."""
+        if context:
+            return f"""You are an educational assistant helping with a student query.
                 
 Context information:
 {context}
@@ -210,141 +298,436 @@ Based on the above context and your knowledge, please answer the following stude
 {query}
 
 Explain the concepts clearly and in simple terms. If you're unsure, acknowledge this and provide your best educational guidance."""
-            else:
-                prompt = f"""You are an educational assistant helping with a student query.
+        return f"""You are an educational assistant helping with a student query.
                 
 Please answer the following student question in a helpful, educational manner:
 {query}
 
 Explain the concepts clearly and in simple terms. If you're unsure, acknowledge this and provide your best educational guidance."""
 
-            # Generate response using Ollama
+    def _build_messages(self, query, context=None):
+        """Build the chat messages sent to the model for a query."""
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": self._build_prompt(query, context)
+            }
+        ]
+
+    def generate_response(self, query, context=None):
+        """
+        Generate a response using the LLaMA model via Ollama.
+
+        Model errors are raised rather than answered, so answer_query never caches them as an answer.
+        """
+        model = model_router.choose("chat")
+        with admission.slot("interactive"), model_router.track(model, "chat"):
             response = ollama.chat(
-                model=MODEL_NAME,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful educational assistant that explains concepts clearly and accurately. Always provide accurate information and explain concepts in a way that's easy to understand."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                options={
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_predict": 1024
-                }
+                model=model,
+                messages=self._build_messages(query, context),
+                options=GENERATION_OPTIONS,
+                keep_alive=OLLAMA_KEEP_ALIVE
             )
-            
-            return response['message']['content']
         
-        except Exception as e:
-            self.logger.error(f"Error generating response: {str(e)}")
-            return "I'm having trouble generating a response right now. Please try again later."
+        return response['message']['content']
 
-    def answer_query(self, query):
-        """Main method to answer educational queries."""
-        # Check cache first
-        cache_key = query.lower().strip()
-        current_time = time.time()
+    def generate_response_stream(self, query, context=None):
+        """Generate a response token by token, yielding text chunks as Ollama emits them."""
+        model = model_router.choose("chat")
+        with admission.slot("interactive"), model_router.track(model, "chat"):
+            stream = ollama.chat(
+                model=model,
+                messages=self._build_messages(query, context),
+                options=GENERATION_OPTIONS,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                stream=True
+            )
+            for chunk in stream:
+                token = chunk['message']['content']
+                if token:
+                    yield token
+
+    def generate_session_stream(self, query, passages, session):
+        """
+        Generate the answer to a session turn token by token, reusing the session's model context.
+
+        Ollama's generate API returns the KV context of the prompt and answer;
+        sending it back with the next turn means only the new turn is
+        prefilled, and passages already in that context are not sent again.
+        Without a usable context (first turn, another model, or one that
+        would not fit MODEL_CONTEXT_TOKENS with the new prompt and answer)
+        the session's budgeted history goes into the system prompt instead
+        and a new context is started.
+        """
+        model = model_router.choose("chat")
+        passages = passages or []
+        reused, known_passages = session.reusable_context(model)
+        if reused:
+            new_passages = [passage for passage in passages if passage['content'] not in known_passages]
+            prompt = self._build_prompt(query, format_context(new_passages))
+            needed = len(reused) + estimate_tokens(prompt) + GENERATION_OPTIONS["num_predict"] + CONTEXT_SAFETY_TOKENS
+            if needed > MODEL_CONTEXT_TOKENS:
+                session.drop_context()
+                reused = None
+        if not reused:
+            new_passages = passages
+            prompt = self._build_prompt(query, format_context(passages))
+        
+        request = {
+            "model": model,
+            "prompt": prompt,
+            "options": GENERATION_OPTIONS,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "stream": True
+        }
+        if reused:
+            request["context"] = reused.tolist()
+        else:
+            request["system"] = self._session_system_prompt(session)
+        
+        first_token = None
+        final = None
+        with admission.slot("interactive"), model_router.track(model, "chat"):
+            start = time.time()
+            for chunk in ollama.generate(**request):
+                token = chunk.get('response')
+                if token:
+                    if first_token is None:
+                        first_token = time.time() - start
+                    yield token
+                if chunk.get('done'):
+                    final = chunk
+        
+        if final is not None and final.get('context'):
+            session.store_context(
+                model, final['context'], [passage['content'] for passage in new_passages],
+                extend=bool(reused), max_tokens=MODEL_CONTEXT_TOKENS
+            )
+        self._record_generation(reused, first_token, final)
+
+    @staticmethod
+    def _session_system_prompt(session):
+        """The system prompt followed by the session's summary and recent turns as text."""
+        lines = []
+        for message in session.history_messages():
+            if message["role"] == "system":
+                lines.append(message["content"])
+            else:
+                speaker = "Student" if message["role"] == "user" else "Teacher"
+                lines.append(f"{speaker}: {message['content']}")
+        if not lines:
+            return SYSTEM_PROMPT
+        return SYSTEM_PROMPT + "\n\nConversation so far:\n" + "\n\n".join(lines)
+
+    def _record_generation(self, reused, first_token, final):
+        kind = "reused" if reused else "rebuilt"
+        stats = self.context_reuse[kind]
+        stats["turns"] += 1
+        if first_token is not None:
+            stats["first_token_seconds"] += first_token
+            stats["timed_turns"] += 1
+        if final is not None:
+            stats["prompt_tokens"] += final.get('prompt_eval_count') or 0
+            stats["prefill_seconds"] += (final.get('prompt_eval_duration') or 0) / 1e9
+        if reused:
+            stats["context_tokens"] += len(reused)
+
+    def context_reuse_stats(self):
+        """
+        Time to first token and prefill work of session turns with and without a reused context.
+
+        The time saved is estimated as the reused context tokens times the
+        prefill time per token measured on turns that sent their history as text.
+        """
+        report = {"model_context_tokens": MODEL_CONTEXT_TOKENS}
+        for kind, stats in self.context_reuse.items():
+            timed = stats["timed_turns"]
+            report[kind] = {
+                "turns": stats["turns"],
+                "avg_first_token_ms": round(stats["first_token_seconds"] / timed * 1000, 1) if timed else None,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / stats["turns"]) if stats["turns"] else None
+            }
+        rebuilt = self.context_reuse["rebuilt"]
+        per_token = rebuilt["prefill_seconds"] / rebuilt["prompt_tokens"] if rebuilt["prompt_tokens"] else None
+        report["reused_context_tokens"] = self.context_reuse["reused"]["context_tokens"]
+        report["estimated_prefill_saved_ms"] = (
+            round(self.context_reuse["reused"]["context_tokens"] * per_token * 1000, 1) if per_token else None
+        )
+        return report
+
+    def _cached_response(self, query, cache_key):
+        """
+        Return the cached answer for this query or a near-duplicate.
+
+        Returns:
+            tuple: ({"answer", "sources"} dict, "hit" or "semantic"), or (None, None)
+        """
+        cached = answer_cache.get(cache_key)
         
-        if cache_key in query_cache and current_time - query_cache[cache_key]["timestamp"] < CACHE_EXPIRY:
+        # Entries written before answers were cached as dicts are ignored
+        if isinstance(cached, dict):
             self.logger.info(f"Returning cached response for: {query}")
-            return query_cache[cache_key]["response"]
+            return cached, "hit"
+        
+        cached, match = semantic_cache.lookup(cache_key, query)
+        if not isinstance(cached, dict):
+            return None, None
+        self.logger.info(
+            f"Returning cached response for similar query '{match['matched_query']}' "
+            f"(similarity {match['similarity']}, audit id {match['audit_id']}): {query}"
+        )
+        return cached, "semantic"
+
+    def retrieve_sources(self, query, budget=RETRIEVAL_BUDGET):
+        """
+        Search the web and scrape the results within an overall time budget.
+
+        Returns the sources with usable content that finished in time; an
+        empty list means the answer is generated without context.
+        """
+        deadline = time.monotonic() + budget
+        self.retrieval_runs += 1
+        
+        urls = self.search_web(query, timeout=min(SEARCH_TIMEOUT, budget))
+        if not urls:
+            return []
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.retrieval_missed += 1
+            self.logger.warning(f"Search used the whole {budget:.1f}s retrieval budget, answering without context")
+            return []
+        
+        sources, missed = self.scrape_multiple_sources(urls, timeout=remaining)
+        if missed:
+            self.retrieval_partial += 1
+            if not sources:
+                self.retrieval_missed += 1
+                self.logger.warning(f"No source finished within the {budget:.1f}s retrieval budget, answering without context")
+        return sources
+
+    def retrieval_stats(self):
+        """How often retrieval ran out of its time budget"""
+        return {
+            "budget_seconds": RETRIEVAL_BUDGET,
+            "runs": self.retrieval_runs,
+            "partial": self.retrieval_partial,
+            "missed": self.retrieval_missed,
+            "local_hits": self.local_hits
+        }
+
+    def gather_context(self, query):
+        """
+        Prompt context for a query from the passage index, fetching pages only when needed.
+
+        When the indexed passages (scraped pages, notes and the local corpus)
+        already cover the query, or in offline mode, nothing is fetched.
+        Otherwise the web results are scraped within the retrieval budget,
+        indexed, and the index is searched again. Either way the context is
+        the best BM25 passages that fit CONTEXT_TOKEN_BUDGET.
+
+        Returns:
+            tuple: (list of passages, list of {"title", "url"} sources)
+        """
+        corpus_passages = corpus_index.search(query, CONTEXT_TOKEN_BUDGET)
+        passages = pack_passages(merge_rankings(
+            passage_index.search(query, CONTEXT_TOKEN_BUDGET, max_age=LOCAL_KNOWLEDGE_MAX_AGE),
+            corpus_passages
+        ), CONTEXT_TOKEN_BUDGET)
+        if OFFLINE_MODE or passage_index.covers(query, passages, MIN_LOCAL_TOKENS):
+            self.local_hits += 1
+            self.logger.info(f"Answering from {len(passages)} indexed passages: {query}")
+        else:
+            pages = self.retrieve_sources(query)
+            for page in pages:
+                passage_index.add_document(page['url'], page['title'], page['content'])
+            # The fetched pages join the corpus passages found above rather than replacing them
+            passages = pack_passages(merge_rankings(
+                passage_index.search(query, CONTEXT_TOKEN_BUDGET, max_age=LOCAL_KNOWLEDGE_MAX_AGE),
+                corpus_passages
+            ), CONTEXT_TOKEN_BUDGET)
+            if not passages and pages:
+                # The query shares no words with the pages; keep the start of each page
+                share = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN // len(pages)
+                passages = [{"url": page['url'], "title": page['title'], "content": page['content'][:share]} for page in pages]
+        
+        sources = []
+        for passage in passages:
+            if all(source['url'] != passage['url'] for source in sources):
+                sources.append({"title": passage['title'], "url": passage['url']})
+        return passages, sources
+
+    def add_note(self, title, text, note_id=None):
+        """
+        Add teacher notes to the passage index, replacing earlier notes with the same id.
+
+        Returns:
+            tuple: (note id, number of passages indexed)
+        """
+        note_id = note_id or uuid.uuid4().hex[:12]
+        return note_id, passage_index.add_document(f"note:{note_id}", title, text, kind="note")
+
+    def remove_note(self, note_id):
+        return passage_index.remove_document(f"note:{note_id}")
+
+    def answer_query(self, query, session=None):
+        """
+        Main method to answer educational queries.
+
+        With a chat session, the answer continues the conversation (see
+        generate_session_stream) and the exchange is recorded. Follow-up
+        questions depend on that history, so they bypass the answer cache.
+
+        Returns:
+            dict: answer, sources (list of {"title", "url"}), cache ("hit",
+                  "semantic", "miss" or "bypass") and timings in milliseconds
+                  (retrieval, generation, total)
+
+        Raises:
+            AdmissionRejected: the model is too busy to take the request
+        """
+        start = time.time()
+        timings = {"retrieval_ms": 0.0, "generation_ms": 0.0}
+        
+        # Check cache first
+        cache_key = query.lower().strip()
+        use_cache = session is None or not session.has_history()
+        cached, cache_status = self._cached_response(query, cache_key) if use_cache else (None, "bypass")
+        if cached is not None:
+            if session is not None:
+                session.add_exchange(query, cached["answer"])
+            timings["total_ms"] = round((time.time() - start) * 1000, 1)
+            return {"answer": cached["answer"], "sources": cached["sources"], "cache": cache_status, "timings": timings}
         
         try:
             # Log the query
             self.logger.info(f"Received query: {query}")
             
-            # Try to get web content first
-            urls = self.search_web(query)
+            # Find relevant passages in local knowledge or on the web first
+            passages, sources = self.gather_context(self._retrieval_query(query, session))
+            generation_start = time.time()
+            timings["retrieval_ms"] = round((generation_start - start) * 1000, 1)
             
-            if urls:
-                # Scrape content from the URLs
-                sources = self.scrape_multiple_sources(urls)
-                
-                if sources:
-                    # Prepare context from scraped content
-                    context = "\n\n".join([
-                        f"Source: {source['title']} ({source['url']})\n{source['content']}"
-                        for source in sources
-                    ])
-                    
-                    # Generate response with context
-                    response = self.generate_response(query, context)
-                    
-                    # Add sources to the response
-                    source_urls = [f"- {source['title']}: {source['url']}" for source in sources]
-                    response += "\n\nSources:\n" + "\n".join(source_urls)
-                else:
-                    # No useful content scraped, fall back to model
-                    response = self.generate_response(query)
+            # Without context (no URLs found or no useful content scraped) the model answers alone
+            if session is not None:
+                answer = "".join(self.generate_session_stream(query, passages, session))
             else:
-                # No URLs found, fall back to model
-                response = self.generate_response(query)
+                answer = self.generate_response(query, format_context(passages))
+            timings["generation_ms"] = round((time.time() - generation_start) * 1000, 1)
             
-            # Cache the response
-            query_cache[cache_key] = {
-                "response": response,
-                "timestamp": current_time
-            }
+            if session is not None:
+                session.add_exchange(query, answer)
             
-            # If cache is too large, remove oldest entries
-            if len(query_cache) > 100:
-                oldest_key = min(query_cache.keys(), key=lambda k: query_cache[k]["timestamp"])
-                del query_cache[oldest_key]
-                
-            return response
+            # Cache the answer with its sources; failed generations raised above and are never cached
+            if use_cache and answer.strip():
+                answer_cache.set(cache_key, {"answer": answer, "sources": sources})
+                semantic_cache.add(cache_key, query)
             
+            timings["total_ms"] = round((time.time() - start) * 1000, 1)
+            return {"answer": answer, "sources": sources, "cache": cache_status or "miss", "timings": timings}
+            
+        except AdmissionRejected:
+            # The model is saturated; the caller answers 429
+            raise
         except Exception as e:
             self.logger.error(f"Error answering query: {str(e)}")
-            return "I apologize, but I'm experiencing technical difficulties right now. Please try again later."
+            timings["total_ms"] = round((time.time() - start) * 1000, 1)
+            return {
+                "answer": "I apologize, but I'm experiencing technical difficulties right now. Please try again later.",
+                "sources": [],
+                "cache": "miss",
+                "timings": timings
+            }
+
+    @staticmethod
+    def _retrieval_query(query, session):
+        """Search with the previous question too, so short follow-ups ("what about its uses?") find their topic."""
+        if session is None:
+            return query
+        previous = session.last_question()
+        return f"{previous} {query}" if previous else query
 
-    def print_response(self, response):
-        """Print the response in a formatted way."""
+    def stream_answer(self, query, session=None):
+        """
+        Answer a query as a stream of (event, data) pairs.
+
+        Yields "token" events with text as the model produces it, then one
+        "sources" event with the cited sources and a final "done" event. A
+        cached answer is sent as a single token. Failures end the stream with
+        an "error" event, which has "retry_after" when the model was too busy.
+        Sessions are handled as in answer_query.
+        """
+        cache_key = query.lower().strip()
+        use_cache = session is None or not session.has_history()
+        cached = self._cached_response(query, cache_key)[0] if use_cache else None
+        if cached is not None:
+            if session is not None:
+                session.add_exchange(query, cached["answer"])
+            yield "token", {"text": cached["answer"]}
+            yield "sources", {"sources": cached["sources"]}
+            yield "done", {"cached": True}
+            return
+        
+        try:
+            self.logger.info(f"Received streaming query: {query}")
+            passages, sources = self.gather_context(self._retrieval_query(query, session))
+            if session is not None:
+                stream = self.generate_session_stream(query, passages, session)
+            else:
+                stream = self.generate_response_stream(query, format_context(passages))
+            
+            tokens = []
+            for token in stream:
+                tokens.append(token)
+                yield "token", {"text": token}
+            
+            yield "sources", {"sources": sources}
+            
+            # Cache the complete answer in the same form answer_query uses
+            answer = "".join(tokens)
+            if tokens:
+                if session is not None:
+                    session.add_exchange(query, answer)
+                if use_cache:
+                    answer_cache.set(cache_key, {"answer": answer, "sources": sources})
+                    semantic_cache.add(cache_key, query)
+            yield "done", {"cached": False}
+            
+        except AdmissionRejected as e:
+            yield "error", {"error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            self.logger.error(f"Error streaming answer: {str(e)}")
+            yield "error", {"error": "I apologize, but I'm experiencing technical difficulties right now. Please try again later."}
+
+    def print_response(self, result):
+        """Print an answer_query result in a formatted way."""
         print("\n" + "="*80)
         print("AI Teacher Response:")
         print("-"*80)
-        
-        # Split response into answer and sources if present
-        if "Sources:" in response:
-            answer, sources = response.split("Sources:", 1)
-            print(answer.strip())
-            print("\nSources:")
-            print(sources.strip())
-        else:
-            print(response.strip())
+        print(format_response(result).strip())
         print("="*80 + "\n")
 
+
 def initialize_ollama():
     """Initialize Ollama with the best available model."""
     global MODEL_NAME
     
-    try:
-        models = ollama.list()
-        available_models = [model.get('name') for model in models.get('models', [])]
-        
-        # Try to use the best available model
-        if PRIMARY_MODEL in available_models:
-            MODEL_NAME = PRIMARY_MODEL
-            logger.info(f"Using primary model: {MODEL_NAME}")
-            return True
-        elif any(fallback in available_models for fallback in FALLBACK_MODELS):
-            # Use the first available fallback model
-            for fallback in FALLBACK_MODELS:
-                if fallback in available_models:
-                    MODEL_NAME = fallback
-                    logger.info(f"Using fallback model: {MODEL_NAME}")
-                    return True
-        else:
-            logger.warning(f"No preferred models available. Available models: {available_models}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Failed to initialize Ollama: {str(e)}")
+    if model_router.refresh() is None:
+        logger.error("Failed to initialize Ollama: it cannot be reached")
+        return False
+    
+    if not model_router.is_available("chat"):
+        logger.warning(f"No preferred models available. Available models: {sorted(model_router.available)}")
         return False
+    
+    # The preferred model that is installed; without latency samples yet, that is the first one found
+    MODEL_NAME = model_router.choose("chat")
+    logger.info(f"Using model: {MODEL_NAME}")
+    return True
 
 def print_welcome_message():
     """Print welcome message for the chatbot."""
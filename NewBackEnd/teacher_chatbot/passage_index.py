@@ -0,0 +1,320 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from semantic_cache import content_terms
+
+# Passage size in words; consecutive passages share a few words so no sentence is cut off from its context
+PASSAGE_WORDS = 120
+PASSAGE_OVERLAP = 20
+
+# Rough size of a token for budgeting prompt context
+CHARS_PER_TOKEN = 4
+
+# Web pages kept in the index; the oldest are dropped first. Notes are never dropped.
+MAX_WEB_DOCUMENTS = 5000
+
+# How often a read-only index checks whether it was rebuilt
+RELOAD_INTERVAL = 60
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def chunk_text(text, passage_words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    """Split text into passages of about passage_words words, breaking between sentences where possible."""
+    passages = []
+    current = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        words = sentence.split()
+        while words:
+            room = passage_words - len(current)
+            if len(words) <= room:
+                current.extend(words)
+                words = []
+            elif current and len(words) <= passage_words:
+                # Start the next passage with this sentence instead of splitting it
+                passages.append(' '.join(current))
+                current = current[-overlap:] if overlap else []
+            else:
+                current.extend(words[:room])
+                words = words[room:]
+                passages.append(' '.join(current))
+                current = current[-overlap:] if overlap else []
+    if current and (not passages or len(current) > overlap):
+        passages.append(' '.join(current))
+    return passages
+
+
+def pack_passages(passages, token_budget):
+    """Keep the best-ranked passages (lowest score first) that together fit within token_budget."""
+    packed = []
+    used = 0
+    for passage in sorted(passages, key=lambda passage: passage["score"]):
+        tokens = estimate_tokens(passage["content"])
+        if used + tokens > token_budget:
+            continue
+        used += tokens
+        packed.append(passage)
+    return packed
+
+
+def merge_rankings(*rankings):
+    """
+    Merge passage lists ranked by different indexes into one list comparable by score.
+
+    BM25 scores depend on each index's own statistics, so each list is
+    scaled by its best score first: the best passage of every list scores
+    -1.0 and the others keep their relative distance from it.
+    """
+    merged = []
+    for passages in rankings:
+        best = min((passage["score"] for passage in passages), default=0)
+        scale = abs(best) or 1.0
+        merged.extend({**passage, "score": round(passage["score"] / scale, 4)} for passage in passages)
+    return merged
+
+
+def fts_query(query):
+    """FTS5 MATCH expression for a free-text query: any of its content words, each quoted."""
+    terms = []
+    for term in content_terms(query):
+        if term not in terms:
+            terms.append(term)
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+
+class PassageIndex:
+    """
+    BM25 passage index over scraped pages and uploaded notes, stored in SQLite FTS5.
+
+    Documents are split into overlapping passages of about PASSAGE_WORDS
+    words. search() returns the best-ranked passages that fit a token budget,
+    so prompts carry a few relevant paragraphs instead of whole pages.
+    covers() tells whether the local passages already answer a query, in
+    which case no web search or scrape is needed.
+
+    With `read_only`, an index built ahead of time (see build_corpus_index.py)
+    is opened lazily on the first search and read through a memory map of
+    `mmap_size` bytes; a missing file simply returns no passages.
+    """
+
+    def __init__(self, path, max_web_documents=MAX_WEB_DOCUMENTS, read_only=False, mmap_size=0):
+        self.path = path
+        self.max_web_documents = max_web_documents
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._generation = 0  # bumped when a read-only index file is replaced
+        self._mtime = None
+        self._checked_at = 0.0
+        if read_only:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, title TEXT NOT NULL, "
+                "kind TEXT NOT NULL, indexed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_indexed ON documents (kind, indexed_at)")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5("
+                "content, title, document_id UNINDEXED, tokenize = 'porter unicode61')"
+            )
+            # FTS5 cannot index document_id, so the passages of a document are found through this table
+            mapped = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passage_documents'"
+            ).fetchone()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS passage_documents ("
+                "passage_id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS passage_documents_document ON passage_documents (document_id)")
+            if not mapped:
+                # Index files from before the table existed: map their passages once
+                conn.execute("INSERT INTO passage_documents SELECT rowid, document_id FROM passages")
+
+    def _connection(self):
+        if self.read_only:
+            self._maybe_reload()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'generation', None) != self._generation:
+            conn.close()
+            conn = None
+        if conn is None:
+            if self.read_only:
+                conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.path, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            if self.mmap_size:
+                conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def _maybe_reload(self):
+        now = time.time()
+        if now - self._checked_at < RELOAD_INTERVAL:
+            return
+        with self._write_lock:
+            if now - self._checked_at < RELOAD_INTERVAL:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._generation += 1
+
+    def add_document(self, url, title, text, kind="web"):
+        """
+        Index a document, replacing any earlier version with the same url.
+
+        Returns:
+            int: number of passages indexed
+        """
+        passages = chunk_text(text)
+        if not passages:
+            return 0
+        conn = self._connection()
+        with self._write_lock, conn:
+            row = conn.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                self._delete_documents(conn, [row[0]])
+            document_id = conn.execute(
+                "INSERT INTO documents (url, title, kind, indexed_at) VALUES (?, ?, ?, ?)",
+                (url, title, kind, time.time())
+            ).lastrowid
+            for passage in passages:
+                passage_id = conn.execute(
+                    "INSERT INTO passages (content, title, document_id) VALUES (?, ?, ?)",
+                    (passage, title, document_id)
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO passage_documents (passage_id, document_id) VALUES (?, ?)",
+                    (passage_id, document_id)
+                )
+            if kind == "web":
+                self._evict_web_documents(conn)
+        return len(passages)
+
+    def _evict_web_documents(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM documents WHERE kind = 'web'").fetchone()[0]
+        if count <= self.max_web_documents:
+            return
+        stale = conn.execute(
+            "SELECT id FROM documents WHERE kind = 'web' ORDER BY indexed_at LIMIT ?",
+            (count - self.max_web_documents,)
+        ).fetchall()
+        self._delete_documents(conn, [row[0] for row in stale])
+
+    @staticmethod
+    def _delete_documents(conn, document_ids):
+        # Passages are deleted by rowid, which FTS5 looks up directly instead of scanning document_id
+        for document_id in document_ids:
+            conn.execute(
+                "DELETE FROM passages WHERE rowid IN "
+                "(SELECT passage_id FROM passage_documents WHERE document_id = ?)",
+                (document_id,)
+            )
+            conn.execute("DELETE FROM passage_documents WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def optimize(self):
+        """Merge the FTS segments and compact the file; used after a bulk build."""
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("INSERT INTO passages (passages) VALUES ('optimize')")
+            conn.commit()
+            # Fold the WAL back into the file so it can be opened read-only
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("VACUUM")
+            conn.close()
+            self._local.conn = None
+
+    def remove_document(self, url):
+        conn = self._connection()
+        with self._write_lock, conn:
+            row = conn.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return False
+            self._delete_documents(conn, [row[0]])
+            return True
+
+    def search(self, query, token_budget, max_age=None, limit=50):
+        """
+        Best BM25 passages for a query that together fit within token_budget.
+
+        Args:
+            query: Free-text question
+            token_budget: Estimated prompt tokens the passages may use
+            max_age: Ignore web pages indexed more than this many seconds ago
+            limit: Passages ranked before packing
+
+        Returns:
+            list: dicts with url, title, kind, content and score (lower is better), best first
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        # Stale web pages are filtered out before ranking, so they cannot crowd fresh passages out of the top
+        fresh = ""
+        params = [match]
+        if max_age:
+            fresh = "AND document_id IN (SELECT id FROM documents WHERE kind != 'web' OR indexed_at >= ?) "
+            params.append(time.time() - max_age)
+        try:
+            rows = self._connection().execute(
+                # Rank inside FTS5 first and join only the top passages
+                "SELECT ranked.content, documents.url, documents.title, documents.kind, ranked.score FROM ("
+                f"SELECT content, document_id, rank AS score FROM passages WHERE passages MATCH ? {fresh}"
+                "ORDER BY rank LIMIT ?) AS ranked "
+                "JOIN documents ON documents.id = ranked.document_id "
+                "ORDER BY ranked.score",
+                (*params, limit)
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+
+        return pack_passages([
+            {"url": url, "title": title, "kind": kind, "content": content, "score": round(score, 4)}
+            for content, url, title, kind, score in rows
+        ], token_budget)
+
+    @staticmethod
+    def covers(query, passages, min_tokens):
+        """Whether passages mention every content word of the query and add up to at least min_tokens."""
+        terms = set(content_terms(query))
+        if not terms or not passages:
+            return False
+        if sum(estimate_tokens(passage["content"]) for passage in passages) < min_tokens:
+            return False
+        found = set()
+        for passage in passages:
+            found.update(content_terms(passage["content"]))
+        return terms <= found
+
+    def stats(self):
+        try:
+            conn = self._connection()
+            documents = dict(conn.execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind").fetchall())
+            passages = conn.execute("SELECT COUNT(*) FROM passages_docsize").fetchone()[0]
+        except sqlite3.Error:
+            documents, passages = {}, None
+        return {
+            "web_documents": documents.get("web", 0),
+            "notes": documents.get("note", 0),
+            "corpus_documents": documents.get("corpus", 0),
+            "passages": passages
+        }
@@ -0,0 +1,246 @@
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+# Hashing vectorizer settings
+HASH_BUCKETS = 1 << 20
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.25  # character trigrams make typos and plurals still overlap
+
+# Phrasing words that do not change what is being asked
+FILLER_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did', 'of', 'to', 'in', 'on',
+    'for', 'and', 'or', 'what', 'whats', 'how', 'why', 'explain', 'describe', 'define', 'definition',
+    'tell', 'me', 'about', 'please', 'can', 'could', 'you', 'i', 'understand', 'mean', 'meaning',
+    'work', 'works', 'give', 'overview', 'introduction', 'intro', 'simple', 'terms', 'basics', 'it'
+}
+
+# What a question asks for; queries asking different things never match ("why is the sky blue"
+# vs "what is the sky blue"). Checked in order, so "explain how X works" asks how; asking for
+# an explanation or definition, or no question word at all, asks what.
+QUESTION_KINDS = [
+    ('why', {'why'}),
+    ('how', {'how'}),
+    ('when', {'when'}),
+    ('where', {'where'}),
+    ('who', {'who', 'whom', 'whose'}),
+    ('which', {'which'}),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+AUDIT_LOG_SIZE = 200
+
+
+def content_terms(text):
+    """Lowercase a query and keep the words that carry its meaning."""
+    terms = []
+    for token in TOKEN_PATTERN.findall(str(text).lower()):
+        if token in FILLER_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def question_kind(text):
+    """What kind of answer a query asks for: why, how, when, where, who, which or what."""
+    tokens = set(TOKEN_PATTERN.findall(str(text).lower()))
+    for kind, words in QUESTION_KINDS:
+        if tokens & words:
+            return kind
+    return 'what'
+
+
+def _bucket(feature):
+    return zlib.crc32(feature.encode('utf-8')) % HASH_BUCKETS
+
+
+def vectorize(text):
+    """
+    Sparse, L2-normalized hashed feature vector of a query.
+
+    Features are content words, adjacent word pairs and character trigrams,
+    hashed into a fixed number of buckets so no vocabulary is stored.
+    """
+    terms = content_terms(text)
+    vector = {}
+    for term in terms:
+        bucket = _bucket('w:' + term)
+        vector[bucket] = vector.get(bucket, 0.0) + WORD_WEIGHT
+        padded = f" {term} "
+        for i in range(len(padded) - 2):
+            bucket = _bucket('c:' + padded[i:i + 3])
+            vector[bucket] = vector.get(bucket, 0.0) + TRIGRAM_WEIGHT
+    for first, second in zip(terms, terms[1:]):
+        bucket = _bucket(f'b:{first} {second}')
+        vector[bucket] = vector.get(bucket, 0.0) + BIGRAM_WEIGHT
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {bucket: weight / norm for bucket, weight in vector.items()}
+
+
+class SemanticQueryCache:
+    """
+    Near-duplicate query lookup in front of an answer cache.
+
+    Every cached query is embedded with a hashing vectorizer and added to an
+    inverted index (bucket -> query keys). A new query is compared by cosine
+    similarity with the cached queries that share at least one word, and
+    reuses the best one's answer when the similarity reaches `threshold`.
+    Queries that mention different numbers ("python 2" vs "python 3") or
+    ask a different question ("why" vs "how", see QUESTION_KINDS) never match.
+
+    Every semantic hit is recorded in an audit log; hits reported as wrong
+    are counted and the pair is never matched again.
+    """
+
+    def __init__(self, answer_cache, threshold=0.85, max_entries=500, audit_path=None):
+        self.answer_cache = answer_cache
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.audit_path = audit_path
+        self._vectors = OrderedDict()  # key -> (query, vector, word buckets, numbers, question kind)
+        self._postings = {}  # word bucket -> set of keys
+        self._blocked = set()  # (query key, matched key) pairs reported as false hits
+        self._audit = deque(maxlen=AUDIT_LOG_SIZE)
+        self._next_audit_id = 1
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+        self.false_hits = 0
+
+    @staticmethod
+    def _word_buckets(text):
+        return {_bucket('w:' + term) for term in content_terms(text)}
+
+    @staticmethod
+    def _numbers(text):
+        return frozenset(re.findall(r'\d+', str(text)))
+
+    def add(self, key, query):
+        """Index a query whose answer was just stored under key in the answer cache."""
+        vector = vectorize(query)
+        if not vector:
+            return
+        words = self._word_buckets(query)
+        with self._lock:
+            self._remove(key)
+            self._vectors[key] = (query, vector, words, self._numbers(query), question_kind(query))
+            for bucket in words:
+                self._postings.setdefault(bucket, set()).add(key)
+            while len(self._vectors) > self.max_entries:
+                self._remove(next(iter(self._vectors)))
+
+    def _remove(self, key):
+        entry = self._vectors.pop(key, None)
+        if entry is None:
+            return
+        for bucket in entry[2]:
+            keys = self._postings.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[bucket]
+
+    def lookup(self, key, query):
+        """
+        Find a cached answer for a query that is close enough to this one.
+
+        Returns:
+            tuple: (answer, match info) or (None, None)
+        """
+        vector = vectorize(query)
+        if not vector:
+            return None, None
+        numbers = self._numbers(query)
+        kind = question_kind(query)
+
+        with self._lock:
+            candidates = set()
+            for bucket in self._word_buckets(query):
+                candidates |= self._postings.get(bucket, set())
+
+            best_key, best_similarity = None, 0.0
+            for candidate in candidates:
+                if candidate == key or (key, candidate) in self._blocked:
+                    continue
+                _, candidate_vector, _, candidate_numbers, candidate_kind = self._vectors[candidate]
+                if candidate_numbers != numbers or candidate_kind != kind:
+                    continue
+                similarity = sum(weight * candidate_vector.get(bucket, 0.0) for bucket, weight in vector.items())
+                if similarity > best_similarity:
+                    best_key, best_similarity = candidate, similarity
+
+        if best_key is None or best_similarity < self.threshold:
+            return None, None
+
+        answer = self.answer_cache.get(best_key)
+        if answer is None:
+            # The answer expired or was evicted; forget the stale query too
+            with self._lock:
+                self._remove(best_key)
+            return None, None
+
+        with self._lock:
+            self.semantic_hits += 1
+            match = {
+                "audit_id": self._next_audit_id,
+                "timestamp": time.time(),
+                "query": query,
+                "query_key": key,
+                "matched_query": self._vectors[best_key][0] if best_key in self._vectors else best_key,
+                "matched_key": best_key,
+                "similarity": round(best_similarity, 4),
+                "false_hit": False
+            }
+            self._next_audit_id += 1
+            self._audit.append(match)
+        self._write_audit(match)
+        return answer, match
+
+    def report_false_hit(self, audit_id):
+        """Mark a semantic hit as wrong so the same pair is not matched again. Returns False if unknown."""
+        with self._lock:
+            for match in self._audit:
+                if match["audit_id"] == audit_id:
+                    if not match["false_hit"]:
+                        match["false_hit"] = True
+                        self.false_hits += 1
+                        self._blocked.add((match["query_key"], match["matched_key"]))
+                    break
+            else:
+                return False
+        self._write_audit({"audit_id": audit_id, "timestamp": time.time(), "false_hit": True})
+        return True
+
+    def _write_audit(self, record):
+        if not self.audit_path:
+            return
+        try:
+            with open(self.audit_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+    def audit_log(self, limit=50):
+        """Most recent semantic hits, newest first"""
+        with self._lock:
+            return list(reversed(self._audit))[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "indexed_queries": len(self._vectors),
+                "threshold": self.threshold,
+                "semantic_hits": self.semantic_hits,
+                "false_hits": self.false_hits,
+                "false_hit_rate": round(self.false_hits / self.semantic_hits, 4) if self.semantic_hits else 0.0
+            }
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the current directory to the path so we can import the service modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from passage_index import PassageIndex, merge_rankings
+
+PHOTOSYNTHESIS = (
+    "Photosynthesis converts light energy into chemical energy. Chlorophyll in the chloroplasts absorbs "
+    "light, and the plant uses it to turn carbon dioxide and water into glucose and oxygen."
+)
+RECURSION = (
+    "Recursion is when a function calls itself. Every recursive function needs a base case, otherwise "
+    "the calls never stop and the program runs out of stack space."
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PassageIndex(str(tmp_path / "passages.sqlite3"))
+
+
+def urls(passages):
+    return [passage["url"] for passage in passages]
+
+
+def age(index, url, seconds):
+    """Pretend a document was indexed `seconds` ago."""
+    conn = index._connection()
+    with conn:
+        conn.execute("UPDATE documents SET indexed_at = ? WHERE url = ?", (time.time() - seconds, url))
+
+
+def test_search_finds_matching_passages(index):
+    index.add_document("https://a", "Photosynthesis", PHOTOSYNTHESIS)
+    index.add_document("https://b", "Recursion", RECURSION)
+    assert urls(index.search("how does chlorophyll absorb light", 500)) == ["https://a"]
+    assert index.search("", 500) == []
+
+
+def test_removed_documents_leave_no_passages(index):
+    index.add_document("https://a", "Photosynthesis", PHOTOSYNTHESIS)
+    index.add_document("https://b", "Recursion", RECURSION)
+    assert index.remove_document("https://a")
+    assert not index.remove_document("https://a")
+    assert index.search("chlorophyll", 500) == []
+    assert urls(index.search("recursive base case", 500)) == ["https://b"]
+    conn = index._connection()
+    assert conn.execute("SELECT COUNT(*) FROM passage_documents").fetchone()[0] == 1
+    assert index.stats()["passages"] == 1
+
+
+def test_reindexing_a_url_replaces_its_passages(index):
+    index.add_document("https://a", "Photosynthesis", PHOTOSYNTHESIS)
+    index.add_document("https://a", "Photosynthesis", PHOTOSYNTHESIS + " Light reactions happen first.")
+    assert index.stats() == {"web_documents": 1, "notes": 0, "corpus_documents": 0, "passages": 1}
+    assert len(index.search("chlorophyll", 500)) == 1
+
+
+def test_oldest_web_documents_are_evicted(tmp_path):
+    index = PassageIndex(str(tmp_path / "passages.sqlite3"), max_web_documents=1)
+    index.add_document("https://a", "Photosynthesis", PHOTOSYNTHESIS)
+    age(index, "https://a", 10)
+    index.add_document("https://b", "Recursion", RECURSION)
+    assert index.search("chlorophyll", 500) == []
+    assert index.stats()["web_documents"] == 1
+
+
+def test_max_age_skips_stale_web_pages_but_not_notes(index):
+    index.add_document("https://old", "Photosynthesis", PHOTOSYNTHESIS)
+    index.add_document("note://mine", "My notes", PHOTOSYNTHESIS, kind="note")
+    index.add_document("https://new", "Photosynthesis today", PHOTOSYNTHESIS + " Plants release oxygen.")
+    age(index, "https://old", 3600)
+    age(index, "note://mine", 3600)
+
+    fresh = urls(index.search("chlorophyll", 1000, max_age=600))
+    assert sorted(fresh) == ["https://new", "note://mine"]
+    assert "https://old" in urls(index.search("chlorophyll", 1000))
+
+
+def test_max_age_filter_applies_before_limit(index):
+    # Stale pages that would outrank the fresh one must not use up the ranked limit
+    for i in range(5):
+        index.add_document(f"https://old/{i}", "Photosynthesis", PHOTOSYNTHESIS + " chlorophyll" * 3)
+        age(index, f"https://old/{i}", 3600)
+    index.add_document("https://new", "Photosynthesis", PHOTOSYNTHESIS)
+    assert urls(index.search("chlorophyll", 1000, max_age=600, limit=1)) == ["https://new"]
+
+
+def test_merge_rankings_scales_each_index_by_its_best():
+    web = [{"url": "w1", "score": -9.0}, {"url": "w2", "score": -3.0}]
+    corpus = [{"url": "c1", "score": -0.5}]
+    scores = {passage["url"]: passage["score"] for passage in merge_rankings(web, corpus)}
+    assert scores == {"w1": -1.0, "w2": -0.3333, "c1": -1.0}
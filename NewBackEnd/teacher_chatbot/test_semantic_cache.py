@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Add the current directory to the path so we can import the service modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from semantic_cache import SemanticQueryCache, question_kind
+
+
+def make_cache(*queries):
+    answers = {}
+    cache = SemanticQueryCache(answers)
+    for index, query in enumerate(queries):
+        key = f"key-{index}"
+        answers[key] = f"answer to {query}"
+        cache.add(key, query)
+    return cache
+
+
+def test_rephrased_question_hits():
+    cache = make_cache("what are python decorators")
+    answer, match = cache.lookup("new", "explain python decorators")
+    assert answer == "answer to what are python decorators"
+    assert match["matched_key"] == "key-0"
+
+
+def test_different_question_words_do_not_hit():
+    pairs = [
+        ("what is the sky blue", "why is the sky blue"),
+        ("how does python work", "why does python work"),
+        ("explain how recursion works", "explain recursion"),
+    ]
+    for cached, asked in pairs:
+        cache = make_cache(cached)
+        assert cache.lookup("new", asked) == (None, None), (cached, asked)
+
+
+def test_different_numbers_do_not_hit():
+    cache = make_cache("what is new in python 3")
+    assert cache.lookup("new", "what is new in python 2") == (None, None)
+
+
+def test_reported_false_hit_is_not_repeated():
+    cache = make_cache("what are python decorators")
+    _, match = cache.lookup("new", "define python decorators")
+    assert cache.report_false_hit(match["audit_id"])
+    assert cache.lookup("new", "define python decorators") == (None, None)
+    assert cache.stats()["false_hits"] == 1
+
+
+def test_question_kind():
+    assert question_kind("Why is the sky blue?") == "why"
+    assert question_kind("explain how a compiler works") == "how"
+    assert question_kind("python decorators") == "what"
@@ -47,6 +47,8 @@ const AITeacher = () => {
   const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
   const [topics, setTopics] = useState<Topic[]>([]);
   const [isLoading, setIsLoading] = useState(false);
+  // The server keeps the conversation history for follow-up questions
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
   const { toast } = useToast();
 
@@ -122,37 +124,82 @@ const AITeacher = () => {
     setIsLoading(true);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/api/chat`, {
+      const response = await fetch(`${API_BASE_URL}/api/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           message: text.trim(),
-          user_id: 'user123' // In real app, get from auth
+          user_id: 'user123', // In real app, get from auth
+          session_id: sessionId,
+          new_session: true // continue the session if the server still has it, otherwise start one
         }),
       });
 
-      if (response.ok) {
-        const data = await response.json();
-        
-        const aiResponse: Message = {
-          id: Date.now() + 1,
-          text: data.response.answer,
-          sender: 'ai',
-          timestamp: new Date(),
-          sources: data.response.sources || []
-        };
-        
-        setMessages(prev => [...prev, aiResponse]);
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || 'Failed to get response');
+      }
 
-        // Track chat activity
-        trackChatActivity(text.substring(0, 50) + (text.length > 50 ? '...' : ''));
+      // Render the answer as tokens arrive; the message is created on the first token
+      const aiMessageId = Date.now() + 1;
+      let answer = '';
+      const updateAiMessage = (changes: Partial<Message>) => {
+        setMessages(prev => {
+          if (prev.some(message => message.id === aiMessageId)) {
+            return prev.map(message => message.id === aiMessageId ? { ...message, ...changes } : message);
+          }
+          return [...prev, { id: aiMessageId, text: '', sender: 'ai', timestamp: new Date(), sources: [], ...changes }];
+        });
+      };
 
-      } else {
-        const errorData = await response.json();
-        throw new Error(errorData.error || 'Failed to get response');
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let finished = false;
+
+      while (!finished) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-sent events are separated by a blank line
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+
+          let event = 'message';
+          let data = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+          }
+          const payload = data ? JSON.parse(data) : {};
+
+          if (event === 'token') {
+            answer += payload.text;
+            setIsTyping(false);
+            updateAiMessage({ text: answer });
+          } else if (event === 'sources' && answer) {
+            updateAiMessage({ text: answer, sources: payload.sources || [] });
+          } else if (event === 'error') {
+            throw new Error(payload.error || 'Failed to get response');
+          } else if (event === 'done') {
+            if (payload.session_id) setSessionId(payload.session_id);
+            finished = true;
+          }
+        }
       }
+
+      if (!answer) {
+        throw new Error('Empty response');
+      }
+
+      // Track chat activity
+      trackChatActivity(text.substring(0, 50) + (text.length > 50 ? '...' : ''));
     } catch (error) {
       console.error('Error sending message:', error);
       
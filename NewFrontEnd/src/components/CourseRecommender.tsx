@@ -27,6 +27,12 @@ interface Course {
   url?: string;
 }
 
+interface Suggestion {
+  text: string;
+  kind: 'topic' | 'course' | 'query';
+  distance: number;
+}
+
 const CourseRecommender = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [category, setCategory] = useState('all');
@@ -37,6 +43,8 @@ const CourseRecommender = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [isLoadingRecommendations, setIsLoadingRecommendations] = useState(false);
   const [availableTopics, setAvailableTopics] = useState<string[]>([]);
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
   const { toast } = useToast();
 
   const API_BASE_URL = 'http://localhost:5001';
@@ -46,6 +54,38 @@ const CourseRecommender = () => {
     fetchAvailableTopics();
   }, []);
 
+  // Autocomplete while typing; the (slow) external search only runs on submit
+  useEffect(() => {
+    const prefix = searchTerm.trim();
+    if (prefix.length < 2) {
+      setSuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          `${API_BASE_URL}/api/autocomplete?q=${encodeURIComponent(prefix)}`,
+          { signal: controller.signal }
+        );
+        const data = await response.json();
+        if (data.success) {
+          setSuggestions(data.suggestions);
+        }
+      } catch (error) {
+        if ((error as Error).name !== 'AbortError') {
+          console.error('Error fetching suggestions:', error);
+        }
+      }
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchTerm]);
+
   const fetchAvailableTopics = async () => {
     try {
       const response = await fetch(`${API_BASE_URL}/api/topics`);
@@ -58,19 +98,20 @@ const CourseRecommender = () => {
     }
   };
 
-  const searchCourses = async () => {
-    if (!searchTerm.trim()) return;
+  const searchCourses = async (query: string = searchTerm) => {
+    if (!query.trim()) return;
 
+    setShowSuggestions(false);
     setIsLoading(true);
     try {
-      const response = await fetch(`${API_BASE_URL}/api/search?q=${encodeURIComponent(searchTerm)}`);
+      const response = await fetch(`${API_BASE_URL}/api/search?q=${encodeURIComponent(query)}`);
       const data = await response.json();
       
       if (data.success) {
         setCourses(data.results);
         toast({
           title: "Search completed!",
-          description: `Found ${data.count} courses for "${searchTerm}"`,
+          description: `Found ${data.count} courses for "${query}"`,
         });
       } else {
         toast({
@@ -154,6 +195,11 @@ const CourseRecommender = () => {
     searchCourses();
   };
 
+  const handleSelectSuggestion = (suggestion: Suggestion) => {
+    setSearchTerm(suggestion.text);
+    searchCourses(suggestion.text);
+  };
+
   const handleGetRecommendations = (e: React.FormEvent) => {
     e.preventDefault();
     getRecommendations();
@@ -287,9 +333,34 @@ const CourseRecommender = () => {
                 <Input
                   placeholder="Search courses, skills, or topics..."
                   value={searchTerm}
-                  onChange={(e) => setSearchTerm(e.target.value)}
+                  onChange={(e) => {
+                    setSearchTerm(e.target.value);
+                    setShowSuggestions(true);
+                  }}
+                  onFocus={() => setShowSuggestions(true)}
+                  onBlur={() => setShowSuggestions(false)}
                   className="pl-10"
+                  autoComplete="off"
                 />
+                {showSuggestions && suggestions.length > 0 && (
+                  <div className="absolute z-10 mt-1 w-full rounded-md border bg-popover shadow-md">
+                    {suggestions.map((suggestion) => (
+                      <button
+                        key={`${suggestion.kind}-${suggestion.text}`}
+                        type="button"
+                        className="flex w-full items-center justify-between px-3 py-2 text-left text-sm hover:bg-accent"
+                        // Select before the input's blur hides the list
+                        onMouseDown={(e) => {
+                          e.preventDefault();
+                          handleSelectSuggestion(suggestion);
+                        }}
+                      >
+                        <span>{suggestion.text}</span>
+                        <span className="text-xs text-muted-foreground capitalize">{suggestion.kind}</span>
+                      </button>
+                    ))}
+                  </div>
+                )}
               </div>
               <Select value={category} onValueChange={setCategory}>
                 <SelectTrigger className="w-full md:w-[180px]">
@@ -28,6 +28,13 @@ interface Roadmap {
   learning_tips?: string[];
 }
 
+interface RoadmapStreamEvent {
+  event: 'outline' | 'step' | 'complete' | 'error';
+  roadmap?: Roadmap;
+  step?: RoadmapStep;
+  error?: string;
+}
+
 interface Template {
   id: string;
   title: string;
@@ -95,7 +102,8 @@ const RoadmapGenerator = () => {
 
     setIsLoading(true);
     try {
-      const response = await fetch(`${API_BASE_URL}/api/generate`, {
+      // Stream the roadmap: the outline arrives first, then each level as it is generated
+      const response = await fetch(`${API_BASE_URL}/api/generate/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -103,26 +111,33 @@ const RoadmapGenerator = () => {
         body: JSON.stringify({ topic: goal }),
       });
       
-      const data = await response.json();
-      
-      if (data.success) {
-        setRoadmap(data.roadmap);
-        setShowRoadmap(true);
-        setCompletedSteps([]);
-        
-        // Reset completion tracking for new roadmap
-        resetCompletionTracking();
-        
-        toast({
-          title: "Roadmap generated!",
-          description: `Your personalized ${goal} roadmap is ready`,
-        });
-      } else {
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
         toast({
           title: "Generation failed",
           description: data.error || "Failed to generate roadmap",
           variant: "destructive",
         });
+        return;
+      }
+      
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        
+        for (const line of lines) {
+          if (line.trim()) {
+            handleStreamEvent(JSON.parse(line));
+          }
+        }
       }
     } catch (error) {
       console.error('Error generating roadmap:', error);
@@ -136,6 +151,36 @@ const RoadmapGenerator = () => {
     }
   };
 
+  const handleStreamEvent = (event: RoadmapStreamEvent) => {
+    if (event.event === 'outline' && event.roadmap) {
+      setRoadmap(event.roadmap);
+      setShowRoadmap(true);
+      setCompletedSteps([]);
+      
+      // Reset completion tracking for new roadmap
+      resetCompletionTracking();
+    } else if (event.event === 'step' && event.step) {
+      const step = event.step;
+      setRoadmap(prev => prev ? {
+        ...prev,
+        steps: prev.steps.map(existing => existing.level === step.level ? step : existing),
+      } : prev);
+    } else if (event.event === 'complete' && event.roadmap) {
+      setRoadmap(event.roadmap);
+      
+      toast({
+        title: "Roadmap generated!",
+        description: `Your personalized ${goal} roadmap is ready`,
+      });
+    } else if (event.event === 'error') {
+      toast({
+        title: "Generation failed",
+        description: event.error || "Failed to generate roadmap",
+        variant: "destructive",
+      });
+    }
+  };
+
   const loadTemplate = async (templateId: string) => {
     setIsLoading(true);
     try {
@@ -284,12 +329,12 @@ const RoadmapGenerator = () => {
     }
   };
 
-  // Load completed steps when roadmap changes
+  // Load completed steps when roadmap changes (streamed level updates keep the same title)
   useEffect(() => {
     if (roadmap) {
       loadCompletedSteps();
     }
-  }, [roadmap]);
+  }, [roadmap?.title]);
 
   const downloadRoadmap = () => {
     if (!roadmap) return;
@@ -641,6 +686,12 @@ ${step.resources.map(r => `• ${r}`).join('\n')}
               <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
                 <div>
                   <h4 className="font-semibold mb-2">Topics to Learn</h4>
+                  {isLoading && step.topics.length === 0 && (
+                    <div className="flex items-center text-sm text-muted-foreground">
+                      <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+                      Generating this level...
+                    </div>
+                  )}
                   <div className="flex flex-wrap gap-2">
                     {step.topics.map((topic, topicIndex) => (
                       <Badge key={topicIndex} variant="outline">